@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+帧解码的微基准：手写eval脚本、struct单帧解码、批量解码（NumPy或struct.iter_unpack）
+
+    python bench/bench_decoder.py
+"""
+
+import os
+import sys
+import time
+import struct
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scommcore.decoder import FrameLayout, numpy
+from scommcore.unpack import UnpackScript, LayoutScript, run_scripts_batch
+
+LAYOUT = {
+    'byteorder': 'big',
+    'size': 16,
+    'fields': [
+        {'name': 'id', 'offset': 0, 'type': 'u8'},
+        {'name': 'ax', 'offset': 2, 'type': 'i16', 'scale': 0.001},
+        {'name': 'ay', 'offset': 4, 'type': 'i16', 'scale': 0.001},
+        {'name': 'az', 'offset': 6, 'type': 'i16', 'scale': 0.001},
+        {'name': 'temp', 'offset': 8, 'type': 'f32'},
+        {'name': 'counter', 'offset': 12, 'type': 'u32'},
+    ],
+}
+
+# 与LAYOUT大致等价的手写脚本（原来的写法，不含浮点字段temp）
+SCRIPT = ("' id=%d ax=%g ay=%g az=%g counter=%d' % (data[0], int16(data[2:4]) * 0.001, "
+          "int16(data[4:6]) * 0.001, int16(data[6:8]) * 0.001, "
+          "(data[12] << 24) | (data[13] << 16) | (data[14] << 8) | data[15])")
+
+
+def bench(name: str, func, count: int):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f'  {name:28s} {elapsed * 1000:9.1f} ms  {count / elapsed:14,.0f} 帧/秒')
+
+
+def main():
+    count = 100000
+    pack = struct.Struct('>BxhhhfI').pack
+    frames = [pack(i & 0xFF, i % 1000, -i % 1000, 7, 25.5, i) for i in range(count)]
+
+    layout = FrameLayout.from_config(LAYOUT)
+    script = UnpackScript('script', SCRIPT)
+    layout_script = LayoutScript('layout', str(LAYOUT).replace("'", '"'))
+
+    print(f'{count} 帧，每帧 {layout.size} 字节' + ('' if numpy is not None else '（未安装NumPy）'))
+    bench('eval脚本', lambda: [script(f) for f in frames], count)
+    bench('LayoutScript（含格式化输出）', lambda: [layout_script(f) for f in frames], count)
+    bench('FrameLayout.decode', lambda: [layout.decode(f) for f in frames], count)
+    bench('FrameLayout.unpack', lambda: [layout.unpack(f) for f in frames], count)
+    bench('FrameLayout.decode_batch', lambda: layout.decode_batch(frames), count)
+    bench('run_scripts_batch（含格式化输出）', lambda: run_scripts_batch([layout_script], frames), count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+十六进制格式化的微基准：
+
+    python bench/bench_hexfmt.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scommcore.hexfmt import tohex, hex_preview, hexdump
+
+
+def legacy_tohex(data: bytes) -> str:
+    """原实现：逐字节f-string拼接"""
+    return ' '.join(f'{x:02X}' for x in data)
+
+
+def bench(name: str, func, data: bytes):
+    number, total = timeit.Timer(lambda: func(data)).autorange()
+    per_call = total / number
+    print(f'  {name:14s} {per_call * 1e6:12.1f} us  {len(data) / per_call / 1e6:10.1f} MB/s')
+
+
+def main():
+    for size in (1024, 64 * 1024, 1024 * 1024):
+        data = os.urandom(size)
+        assert tohex(data) == legacy_tohex(data)
+        print(f'{size // 1024} KB')
+        bench('legacy tohex', legacy_tohex, data)
+        bench('tohex', tohex, data)
+        bench('tohex group=4', lambda d: tohex(d, group=4), data)
+        bench('hex_preview', hex_preview, data)
+        bench('hexdump', hexdump, data)
+
+
+if __name__ == '__main__':
+    main()
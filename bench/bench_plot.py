@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+波形数据的微基准：不同采样率下追加采样和取出一屏列数据的耗时
+
+    python bench/bench_plot.py
+"""
+
+import os
+import sys
+import math
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scommcore.plot import PlotData
+
+WINDOW = 10.0  # 秒
+WIDTH = 800  # 像素
+
+
+def main():
+    for rate in (100, 1000, 10000):
+        data = PlotData(capacity=int(rate * WINDOW * 2))
+        samples = int(rate * WINDOW * 2)
+        start = timeit.default_timer()
+        for i in range(samples):
+            data.add(i / rate, {'a': math.sin(i / 50), 'b': i % 7})
+        add = (timeit.default_timer() - start) / samples
+        first = timeit.timeit(lambda: data.columns(WINDOW, WIDTH), number=1)
+        number, total = timeit.Timer(lambda: data.columns(WINDOW, WIDTH)).autorange()
+        print(f'{rate:6d} 采样/秒  追加 {add * 1e6:6.2f} us/帧  '
+              f'首次取列 {first * 1000:8.2f} ms  之后每次 {total / number * 1000:6.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+预置数据编码的微基准：每次求值+编码 与 PresetCache 命中
+
+    python bench/bench_preset.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scommcore.preset import PresetCache, build_packet
+from scommcore.settings import Settings
+
+PRESETS = {
+    'HEX文本': {'value': '01 03 00 00 00 0A C5 CD', 'hex': 1},
+    '表达式': {'value': '"55 AA 03 F8 5A %02X EE" % int(data[0])', 'hex': 1},
+    '字典': {'value': '{"rts": 0, "text": "AT+CSQ\\r\\n"}'},
+}
+
+
+def main():
+    settings = Settings()
+    user_vars = ['1', '3']
+    cache = PresetCache()
+    for name, config in PRESETS.items():
+        assert cache.get(name, config, user_vars, settings)[1] == build_packet(config, user_vars, settings)
+        number, total = timeit.Timer(lambda: build_packet(config, user_vars, settings)).autorange()
+        uncached = total / number
+        number, total = timeit.Timer(lambda: cache.get(name, config, user_vars, settings)).autorange()
+        cached = total / number
+        print(f'  {name:8s} 求值+编码 {uncached * 1e6:8.2f} us   缓存命中 {cached * 1e6:6.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+对比逐条插入的旧文本处理器与批量写入存储、虚拟化渲染的处理器在大量小帧下的表现：
+
+    python bench/bench_text_handler.py [帧数] [每帧字节数]
+
+需要图形环境（Tk）。
+"""
+
+import os
+import sys
+import time
+import queue
+import tkinter
+import tkinter.scrolledtext
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scomm import ThreadSafeTextHandler
+from scommcore.store import FrameStore, RECV
+from scommcore.utils import strtime
+
+
+class LegacyTextHandler:
+    """原实现：每条消息单独插入、裁剪、滚动"""
+
+    def __init__(self, text_widget):
+        self.text_widget = text_widget
+        self.message_queue = queue.Queue()
+        self.max_lines = 10000
+
+    def _update_text(self):
+        while True:
+            try:
+                self._safe_insert(self.message_queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def _safe_insert(self, message: str):
+        lines = int(self.text_widget.index('end-1c').split('.')[0])
+        if lines > self.max_lines:
+            self.text_widget.delete('1.0', f'{lines - self.max_lines // 2}.0')
+        self.text_widget.insert('end', message)
+        self.text_widget.see('end')
+
+    def put_frame(self, direction: int, data: bytes):
+        self.message_queue.put(f'\n[{strtime(time.time())}] < {data.decode()}')
+
+
+def format_frames(frames):
+    return [f'[{strtime(f.ts)}] < {f.data.decode()}' for f in frames]
+
+
+def run(root, make_handler, frames: int, size: int):
+    """灌入frames条消息，统计处理完所需的时间和单个周期的最长耗时"""
+    text = tkinter.scrolledtext.ScrolledText(root)
+    text.pack()
+    handler = make_handler(text)
+    payload = b'A' * size
+
+    # 模拟10个100ms周期内到达的数据
+    per_tick = frames // 10
+    total = 0.0
+    worst = 0.0
+    for _ in range(10):
+        for _ in range(per_tick):
+            handler.put_frame(RECV, payload)
+        start = time.perf_counter()
+        handler._update_text()
+        root.update_idletasks()
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        worst = max(worst, elapsed)
+
+    text.destroy()
+    return total, worst
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    root = tkinter.Tk()
+    root.withdraw()
+
+    handlers = (
+        ('legacy', LegacyTextHandler),
+        ('batched', lambda text: ThreadSafeTextHandler(text, FrameStore(), format_frames)),
+    )
+
+    print(f'{frames} 帧 x {size} 字节')
+    for name, make_handler in handlers:
+        total, worst = run(root, make_handler, frames, size)
+        print(f'{name:8s} 总耗时 {total * 1000:9.1f} ms  单周期最长 {worst * 1000:8.1f} ms  '
+              f'{frames / total:10.0f} 帧/秒')
+
+    root.destroy()
+
+
+if __name__ == '__main__':
+    main()
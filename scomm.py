@@ -1,9 +1,7 @@
 #!/usr/bin/env python3
 
-import os
 import sys
 import json
-import string
 import serial
 import serial.tools.list_ports
 
@@ -11,13 +9,27 @@ import tkinter
 import tkgen.gengui
 import tkinter.scrolledtext
 import tkinter.filedialog
+import tkinter.font
 
 import threading
+import multiprocessing
 import time
-import datetime
 import queue
 import logging
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List
+
+from scommcore import SerialEngine, Packet
+from scommcore.utils import tsnow, strtime, human_string
+from scommcore.store import FrameStore, Frame, RECV, SEND
+from scommcore.unpack import ScriptCache, ScriptBudget, run_scripts
+from scommcore.pool import UnpackPool, parse_pool_config
+from scommcore.settings import Settings, parse_ms
+from scommcore.framing import framing_for_port
+from scommcore.metrics import Metrics, MetricsExporter, format_status
+from scommcore.latency import RttMeter
+from scommcore.config import ConfigStore
+from scommcore.plot import PlotData
+from scommcore.preset import PresetCache, encode_text
 
 # 设置中文环境
 import _locale
@@ -27,41 +39,122 @@ _locale._getdefaultlocale = (lambda *args: ['zh_CN', 'utf8'])
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# 工具函数
-def tsnow() -> int:
-    """获取当前时间戳（毫秒）"""
-    return int(time.time() * 1000)
 
-def strnow() -> str:
-    """获取当前时间字符串"""
-    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+class FrameView:
+    """虚拟化的收发显示
 
-def tohex(data: bytes) -> str:
-    """将字节数据转换为十六进制字符串"""
-    return ' '.join(f'{x:02X}' for x in data)
+    历史数据保存在FrameStore中，Text控件里只渲染当前可见的若干帧，
+    滚动条位置按帧序号计算，翻阅再多的历史也只需渲染一屏内容。
+    """
 
-def human_string(data: bytes, is_hex: bool = False, encoding: str = 'utf-8') -> str:
-    """将字节数据转换为可读字符串"""
-    return tohex(data) if is_hex else data.decode('utf-8', 'backslashreplace').replace('\x00', '\\x00')
+    def __init__(self, text_widget, store: FrameStore, formatter):
+        self.text_widget = text_widget
+        self.store = store
+        self.formatter = formatter  # (frames: List[Frame]) -> List[str]
+        self.rows = 40  # 可见行数，随控件大小更新
+        self.max_line_chars = 4096  # 单行最多显示的字符数
+        self.follow = True  # 是否跟随最新数据
+        self.top_seq = 0  # 第一条可见帧的绝对序号
+        self._version = -1
+
+        self.vbar = getattr(text_widget, 'vbar', None)
+        if self.vbar is not None:
+            self.vbar.config(command=self._on_scrollbar)
+        self.text_widget.config(yscrollcommand='', wrap='none')
+
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>', '<Prior>', '<Next>'):
+            self.text_widget.bind(sequence, self._on_scroll_event)
+        self.text_widget.bind('<Configure>', self._on_configure)
+
+    def _on_configure(self, event=None):
+        """控件大小变化时重新计算可见行数"""
+        linespace = tkinter.font.Font(font=self.text_widget.cget('font')).metrics('linespace')
+        self.rows = max(1, self.text_widget.winfo_height() // max(1, linespace))
+        self.refresh(force=True)
+
+    def _on_scroll_event(self, event):
+        """鼠标滚轮与翻页键"""
+        if event.keysym == 'Prior':
+            delta = -self.rows
+        elif event.keysym == 'Next':
+            delta = self.rows
+        elif event.num == 4:
+            delta = -3
+        elif event.num == 5:
+            delta = 3
+        else:
+            step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+            delta = -3 * step
+        self.scroll_to(self._top_index() + delta)
+        return 'break'
+
+    def _on_scrollbar(self, *args):
+        """滚动条拖动/点击"""
+        if args[0] == 'moveto':
+            index = int(float(args[1]) * len(self.store))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            index = self._top_index() + (step * self.rows if args[2] == 'pages' else step)
+        else:
+            return
+        self.scroll_to(index)
+
+    def _top_index(self) -> int:
+        return max(0, self.top_seq - self.store.first_seq)
+
+    def scroll_to(self, index: int):
+        """滚动到指定下标，滚动到底部时恢复跟随"""
+        total = len(self.store)
+        index = max(0, min(index, total - self.rows))
+        self.follow = index + self.rows >= total
+        self.top_seq = self.store.first_seq + index
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        """重新渲染可见部分"""
+        if not force and self._version == self.store.version:
+            return
+        self._version = self.store.version
 
-def uint16(b: bytes) -> int:
-    """从字节读取无符号16位整数"""
-    return b[0] * 256 + b[1]
+        total = len(self.store)
+        if self.follow:
+            index = max(0, total - self.rows)
+            self.top_seq = self.store.first_seq + index
+        else:
+            index = min(self._top_index(), max(0, total - self.rows))
 
-def int16(b: bytes) -> int:
-    """从字节读取有符号16位整数"""
-    d = b[0] * 256 + b[1]
-    return d - 0x10000 if d >= 0x8000 else d
+        lines = self.formatter(self.store.slice(index, index + self.rows))
+        limit = self.max_line_chars
+        text = '\n'.join(line if len(line) <= limit else line[:limit] + ' ...' for line in lines)
+
+        self.text_widget.delete('1.0', 'end')
+        self.text_widget.insert('1.0', text)
+        if self.follow:
+            self.text_widget.see('end')
+
+        if self.vbar is not None:
+            if total:
+                self.vbar.set(index / total, min(1.0, (index + self.rows) / total))
+            else:
+                self.vbar.set(0.0, 1.0)
 
 
 class ThreadSafeTextHandler:
-    """线程安全的文本处理器"""
+    """线程安全的文本处理器
 
-    def __init__(self, text_widget):
+    工作线程只把收发帧放入队列，Tk主线程每个周期把积压的帧批量写入FrameStore，
+    再由FrameView渲染一次可见部分，避免每帧都产生多次Tcl调用。
+    """
+
+    def __init__(self, text_widget, store: FrameStore, formatter):
         self.text_widget = text_widget
+        self.store = store
+        self.view = FrameView(text_widget, store, formatter)
         self.message_queue = queue.Queue()
         self.update_interval = 100  # 毫秒
-        self.max_lines = 10000  # 最大行数限制
+        self.max_batch = 50000  # 每个周期最多从队列取出的帧数
+        self.metrics: Optional[Metrics] = None  # 设置后记录入队到显示的延迟
+        self._oldest_ts = 0.0  # 本批次中最早入队的时间
         self._start_updater()
 
     def _start_updater(self):
@@ -69,39 +162,110 @@ class ThreadSafeTextHandler:
         self._update_text()
 
     def _update_text(self):
-        """从队列中获取消息并更新UI"""
+        """从队列中批量取出帧写入存储并刷新显示"""
         try:
-            while True:
-                try:
-                    message = self.message_queue.get_nowait()
-                    self._safe_insert(message)
-                except queue.Empty:
-                    break
+            count = self._drain()
+            self.view.refresh()
+            if count and self.metrics is not None:
+                self.metrics.observe_render(time.time() - self._oldest_ts)
         except Exception as e:
             logger.error(f"更新文本时出错: {e}")
 
         # 继续定时更新
         self.text_widget.after(self.update_interval, self._update_text)
 
-    def _safe_insert(self, message: str):
-        """安全插入文本"""
+    def _drain(self) -> int:
+        """把积压的帧写入存储，返回处理的帧数"""
+        count = 0
+        get = self.message_queue.get_nowait
+        append = self.store.append
         try:
-            # 检查并限制文本长度
-            lines = int(self.text_widget.index('end-1c').split('.')[0])
-            if lines > self.max_lines:
-                self.text_widget.delete('1.0', f'{lines - self.max_lines // 2}.0')
-
-            self.text_widget.insert('end', message)
-            self.text_widget.see('end')
+            while count < self.max_batch:
+                direction, data, note, ts = get()
+                if not count:
+                    self._oldest_ts = ts
+                append(direction, data, note, ts)
+                count += 1
+        except queue.Empty:
+            pass
+        return count
+
+    def put_frame(self, direction: int, data: bytes, note: str = '', ts: Optional[float] = None):
+        """向队列中添加一帧，ts为收发时间，默认为当前时间"""
+        try:
+            self.message_queue.put((direction, data, note, time.time() if ts is None else ts))
         except Exception as e:
-            logger.error(f"插入文本时出错: {e}")
+            logger.error(f"添加消息到队列时出错: {e}")
 
-    def put_message(self, message: str):
-        """向队列中添加消息"""
+
+class PlotView:
+    """波形窗口的绘制
+
+    每个周期按画布宽度从 PlotData 取出各通道的最小/最大值列，每个通道一条折线，
+    每列依次连接最小值和最大值两点，点数不超过画布宽度的两倍，与采样率无关。
+    """
+
+    COLORS = ('#1f77b4', '#d62728', '#2ca02c', '#ff7f0e', '#9467bd', '#8c564b', '#e377c2', '#17becf')
+
+    def __init__(self, canvas, label, data: PlotData, window: float = 10.0):
+        self.canvas = canvas
+        self.label = label
+        self.data = data
+        self.window = window  # 横轴显示的秒数
+        self.update_interval = 100  # 毫秒
+        self.margin = 4
+        self._lines: Dict[str, int] = {}
+        self._job = None
+        self._update_plot()
+
+    def close(self):
+        """停止定时刷新"""
+        if self._job is not None:
+            self.canvas.after_cancel(self._job)
+            self._job = None
+
+    def _update_plot(self):
         try:
-            self.message_queue.put(message)
+            self.draw()
         except Exception as e:
-            logger.error(f"添加消息到队列时出错: {e}")
+            logger.error(f"绘制波形时出错: {e}")
+        self._job = self.canvas.after(self.update_interval, self._update_plot)
+
+    def draw(self):
+        """重绘各通道，纵轴按可见范围自动缩放"""
+        canvas = self.canvas
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        if width < 2 or height < 2:
+            return
+        columns = self.data.columns(self.window, width)
+        lows = [low for cols in columns.values() for _, low, _ in cols]
+        highs = [high for cols in columns.values() for _, _, high in cols]
+        if not lows:
+            return
+        bottom, top = min(lows), max(highs)
+        if top == bottom:
+            top, bottom = top + 1, bottom - 1
+        margin = self.margin
+        scale = (height - 2 * margin) / (top - bottom)
+        base = height - margin
+
+        for name, cols in columns.items():
+            points = []
+            for x, low, high in cols:
+                points += (x, base - (low - bottom) * scale, x, base - (high - bottom) * scale)
+            if not points:
+                points = [-1, -1, -1, -1]
+            line = self._lines.get(name)
+            if line is None:
+                color = self.COLORS[len(self._lines) % len(self.COLORS)]
+                self._lines[name] = canvas.create_line(*points, fill=color)
+            else:
+                canvas.coords(line, *points)
+
+        channels = self.data.channels
+        legend = '  '.join(f'{name}={channels[name].last:g}' for name in columns)
+        self.label.configure(text=f'{legend}    范围 [{bottom:g}, {top:g}]  {self.window:g}s')
 
 
 class UIProcessor:
@@ -113,8 +277,28 @@ class UIProcessor:
         self._setup_variables()
         self._bind_events()
 
-        # 初始化文本处理器
-        self.text_handler = ThreadSafeTextHandler(self.text_recv)
+        # 初始化收发记录存储与显示
+        budget = int(self.root.usercfg.get('history', 64 * 1024 * 1024))
+        self.frame_store = FrameStore(budget)
+        self.text_handler = ThreadSafeTextHandler(self.text_recv, self.frame_store, self.format_frames)
+        self.plot_data: Optional[PlotData] = None  # 波形窗口打开时提取解析结果中的数值
+        self.presets = PresetCache()  # 预置数据编码好的数据包
+
+        # 解析脚本每帧的耗时预算，如 "unpack_budget": {"ms": 2, "action": "disable"}
+        try:
+            self.script_budget = ScriptBudget.from_config(self.root.usercfg.get('unpack_budget'))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"解析脚本预算配置错误: {e}")
+            self.script_budget = None
+
+        # 解析脚本执行池，如 "unpack_pool": {"mode": "process", "workers": 4}；未配置时在接收线程中执行
+        self.unpack_pool: Optional[UnpackPool] = None
+        try:
+            pool_config = parse_pool_config(self.root.usercfg.get('unpack_pool'))
+            if pool_config is not None:
+                self.unpack_pool = UnpackPool(self.show_recv, budget=self.script_budget, **pool_config)
+        except (TypeError, ValueError, OSError) as e:
+            logger.error(f"解析脚本执行池配置错误: {e}")
 
         logger.info("UI处理器初始化完成")
 
@@ -129,6 +313,7 @@ class UIProcessor:
         # 数据显示相关
         self.text_recv = self.root.get('text-recv')
         self.label_status = self.root.get('label-status')
+        self.label_metrics = self.root.get('label-metrics')
 
         # 复选框
         self.ckbtn_shex = self.root.get('ckbtn-shex')
@@ -151,10 +336,13 @@ class UIProcessor:
         self.last_recv_ticks = 0
         self.last_recv_data = b''
         self.wait_send_data = {'text': b'', 'rts': None, 'dtr': None}
+        self.settings = Settings()  # 设置快照，工作线程只读取这一个属性
 
         # 状态标签变量
         self.status_var = tkinter.StringVar()
         self.label_status.config(textvariable=self.status_var)
+        self.metrics_var = tkinter.StringVar()
+        self.label_metrics.config(textvariable=self.metrics_var)
 
     def _bind_events(self):
         """绑定事件"""
@@ -177,61 +365,111 @@ class UIProcessor:
             'dtr': dtr
         })
 
+    def preset_packet(self, btn_name: str) -> Optional[tuple]:
+        """预置数据的 (求值结果, 编码好的数据包)，结果按内容、用户变量和发送设置缓存"""
+        config = self.root.usercfg.get(btn_name)
+        if not config:
+            return None
+        user_vars = self.root.get('entry-uservar').var.get().split(',')
+        return self.presets.get(btn_name, config, user_vars, self.settings)
+
     def get_send_data(self, cache: bool = True) -> Dict[str, Any]:
         """获取发送数据"""
         if not cache and self.root.pack:
-            logger.info(f"发送数据包: {self.root.pack}")
-            self.set_send_data(**self.root.pack)
+            pack, packet = self.root.pack
             self.root.pack = None
+            logger.info(f"发送数据包: {pack}")
+            # 预置数据显示到发送框，直接发送编码好的数据包
+            self.set_send_data(**pack)
+            self.wait_send_data['text'] = packet.data
+            return self.wait_send_data
 
         try:
-            data = self.entry_sendText.var.get()
-            encoding = self.entry_encoding.var.get()
-
-            # 处理十六进制数据
-            if self.ckbtn_shex.var.get():
-                dat = bytes.fromhex(data) if data.strip() else b''
-            else:
-                dat = data.encode(encoding, 'ignore')
-
-            # 添加行结束符
-            if self.ckbtn_0d.var.get():
-                dat += b'\r'
-            if self.ckbtn_0a.var.get():
-                dat += b'\n'
-
-            self.wait_send_data['text'] = dat
+            settings = self.settings
+            self.wait_send_data['text'] = encode_text(self.entry_sendText.var.get(), settings.send_hex,
+                                                      settings.encoding, settings.append_cr, settings.append_lf)
         except Exception as e:
             logger.error(f"处理发送数据时出错: {e}")
             self.wait_send_data['text'] = b''
         return self.wait_send_data
 
     def dmesg(self, category: str, data: bytes):
-        """显示消息（线程安全）"""
+        """记录收发数据（线程安全）"""
         try:
-            if category == 'send' and not self.ckbtn_sendshow.var.get():
-                return
-
-            timestamp = f"[{strnow()}] " if self.ckbtn_time.var.get() else ""
-            encoding = self.entry_encoding.var.get()
-
             if category == 'send':
-                prefix = "> " if self.ckbtn_time.var.get() else ""
-                content = human_string(data, self.ckbtn_shex.var.get(), encoding)
+                if not self.settings.show_send:
+                    return
+                self.text_handler.put_frame(SEND, data)
+            elif self.unpack_pool is not None:  # recv，交给执行池，按接收顺序显示
+                self.unpack_pool.submit(data, tuple(self.root.unpack.values()), time.time())
             else:  # recv
-                prefix = "< " if self.ckbtn_time.var.get() else ""
-                content = human_string(data, self.ckbtn_rhex.var.get(), encoding)
-                for cb in self.root.unpack.values():
-                    try:
-                        if cb: content += eval(cb['value'],{'data':data, 'uint16':uint16,'int16':int16}) or ''
-                    except: pass
-
-            message = f"\n{timestamp}{prefix}{content}"
-            self.text_handler.put_message(message)
+                note = run_scripts(tuple(self.root.unpack.values()), data, self.script_budget)
+                self.show_recv(data, note, time.time())
 
         except Exception as e:
             logger.error(f"显示消息时出错: {e}")
 
+    def show_recv(self, data: bytes, note: str, ts: float):
+        """显示一帧接收数据及解析结果，波形窗口打开时同时记录其中的数值"""
+        plot_data = self.plot_data
+        if plot_data is not None:
+            plot_data.add_note(ts, note)
+        self.text_handler.put_frame(RECV, data, note, ts)
+
+    def format_frames(self, frames: List[Frame]) -> List[str]:
+        """按当前显示设置格式化收发帧（在Tk主线程中调用）"""
+        if not frames:
+            return []
+
+        settings = self.settings
+        show_time = settings.show_time
+        encoding = settings.encoding
+        hex_flags = {SEND: settings.send_hex, RECV: settings.recv_hex}
+        prefixes = {SEND: "> ", RECV: "< "} if show_time else {SEND: "", RECV: ""}
+
+        lines = []
+        for frame in frames:
+            timestamp = f"[{strtime(frame.ts)}] " if show_time else ""
+            content = human_string(frame.data, hex_flags[frame.direction], encoding)
+            lines.append(f"{timestamp}{prefixes[frame.direction]}{content}{frame.note}")
+        return lines
+
+    def read_settings(self) -> Settings:
+        """从界面控件生成设置快照（在Tk主线程中调用）"""
+        return Settings(
+            split_interval=parse_ms(self.entry_split.var.get(), 0.1),  # 默认100ms
+            max_frame_size=self.get_max_frame_size(),
+            cycle=bool(self.ckbtn_cycle.var.get()),
+            cycle_interval=parse_ms(self.entry_cycle.var.get(), 1.0, 0.001),  # 最小间隔1ms
+            send_hex=bool(self.ckbtn_shex.var.get()),
+            recv_hex=bool(self.ckbtn_rhex.var.get()),
+            show_send=bool(self.ckbtn_sendshow.var.get()),
+            show_time=bool(self.ckbtn_time.var.get()),
+            encoding=self.entry_encoding.var.get(),
+            append_cr=bool(self.ckbtn_0d.var.get()),
+            append_lf=bool(self.ckbtn_0a.var.get()),
+            tx_gap=parse_ms(self.root.usercfg.get('tx_gap', 0), 0.0),  # 如 "tx_gap": "2ms"
+        )
+
+    def bind_settings(self, callback):
+        """监听设置控件，值变化时重建快照并调用callback(settings)"""
+        def update(*args):
+            settings = self.read_settings()
+            if settings == self.settings:
+                return
+            self.settings = settings
+            self.text_handler.view.refresh(force=True)
+            callback(settings)
+
+        widgets = (self.entry_split, self.ckbtn_cycle, self.entry_cycle, self.ckbtn_shex,
+                   self.ckbtn_rhex, self.ckbtn_sendshow, self.ckbtn_time, self.entry_encoding,
+                   self.ckbtn_0d, self.ckbtn_0a)
+        for widget in widgets:
+            widget.var.trace_add('write', update)
+
+        self.settings = self.read_settings()
+        callback(self.settings)
+
     def save_current_config(self):
         """保存当前配置"""
         try:
@@ -288,34 +526,33 @@ class UIProcessor:
 
     def clear_recv_text(self):
         """清空接收文本"""
-        self.text_recv.delete('1.0', 'end')
+        self.frame_store.clear()
+        self.text_handler.view.scroll_to(0)
 
     def save_recv_text(self):
-        """保存接收文本"""
+        """保存全部收发记录"""
         try:
-            filename = filedialog.asksaveasfilename(
+            filename = tkinter.filedialog.asksaveasfilename(
                 defaultextension='.txt',
                 initialfile=f'scommlog-{tsnow()}'
             )
             if filename:
                 with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(self.text_recv.get('1.0', 'end'))
+                    chunk = 10000
+                    for start in range(0, len(self.frame_store), chunk):
+                        lines = self.format_frames(self.frame_store.slice(start, start + chunk))
+                        f.write('\n'.join(lines) + '\n')
                 self.log(f"文件已保存: {filename}")
         except Exception as e:
             logger.error(f"保存文件时出错: {e}")
             self.log(f"保存失败: {e}")
 
-    def should_send_cycle(self) -> bool:
-        """检查是否应该循环发送"""
-        return self.ckbtn_cycle.var.get()
-
-    def get_cycle_interval(self) -> float:
-        """获取循环发送间隔（秒）"""
+    def get_max_frame_size(self) -> int:
+        """获取最大帧长（字节）"""
         try:
-            cycle_text = self.entry_cycle.var.get().replace('ms', '')
-            return max(0.01, float(cycle_text) / 1000.0)  # 最小间隔10ms
-        except ValueError:
-            return 1.0
+            return max(1, int(self.root.usercfg.get('maxframe', 1024)))
+        except (TypeError, ValueError):
+            return 1024
 
     def log(self, message: str):
         """记录状态消息"""
@@ -333,35 +570,156 @@ class UIProcessor:
             else:
                 config_key, value = key, value
 
-            if self.root.usercfg.get(config_key) == value:
-                return
-
-            self.root.usercfg[config_key] = value
-
-            with open('usercfg.json', 'w', encoding='utf-8') as f:
-                json.dump(self.root.usercfg, f, indent=4, ensure_ascii=False)
+            # 只修改内存中的配置，文件由后台线程稍后合并写入
+            if self.root.config_store.set(config_key, value):
+                self.presets.invalidate(config_key)
 
         except Exception as e:
             logger.error(f"保存配置时出错: {e}")
 
 
 class SerialCommunicator:
-    """串口通信器"""
+    """串口通信器，将SerialEngine的事件转发给Tk界面"""
 
     def __init__(self, app):
         self.ui = UIProcessor(app)
-        self.com = serial.Serial()
+        self.engine = SerialEngine()
         self.threads = []
-        self.running = threading.Event()
-        self.data_ready = threading.Event()  # 用于发送线程
-        self.shutdown_event = threading.Event()
 
-        # 统计信息
-        self.send_count = 0
-        self.recv_count = 0
+        # 界面只是引擎的一个订阅者
+        self.engine.subscribe('recv', lambda data: self.ui.dmesg('recv', data))
+        self.engine.subscribe('send', lambda data: self.ui.dmesg('send', data))
+        self.engine.subscribe('log', self.ui.log)
+        self.engine.subscribe('open', self.ui.serial_open)
+        self.engine.subscribe('close', self.ui.serial_close)
+
+        # 收发统计，每秒在状态栏刷新一次，usercfg 中配置 metrics 文件时同时导出
+        self.metrics = Metrics(self.engine)
+        self.metrics.add_gauge('queue_depth', self.ui.text_handler.message_queue.qsize)
+        self.metrics.add_gauge('evicted_bytes', lambda: self.ui.frame_store.evicted_bytes)
+        if self.ui.unpack_pool is not None:
+            self.metrics.add_gauge('unpack_backlog', lambda: self.ui.unpack_pool.backlog)
+        self.metrics.add_gauge('tx_queue', lambda: self.engine.send_backlog)
+        self.metrics.add_gauge('schedule', self.engine.scheduler.stats)
+        self.ui.text_handler.metrics = self.metrics
+        self.rtt_meter: Optional[RttMeter] = None
+        self.rtt_export: Optional[str] = None
+        self._create_rtt_meter(app.usercfg.get('rtt'))
+        self.metrics_exporter: Optional[MetricsExporter] = None
+        export = app.usercfg.get('metrics')
+        if export:
+            try:
+                self.metrics_exporter = MetricsExporter(self.metrics, export)
+            except OSError as e:
+                logger.error(f"打开统计文件出错: {e}")
+        self._update_metrics()
+
+        # 波形窗口
+        self.win_plot = None
+        self.plot_view: Optional[PlotView] = None
 
         logger.info("串口通信器初始化完成")
 
+    def _create_rtt_meter(self, config):
+        """按 usercfg 中的 rtt 统计请求/应答往返时间，显示在状态栏并随收发统计导出
+
+        如 "rtt": "address" 或 "rtt": {"match": "address:0", "timeout": "500ms", "export": "rtt.json"}，
+        配置了 export 时退出程序时把完整的直方图写入该文件。
+        """
+        if not config:
+            return
+        if isinstance(config, str):
+            config = {'match': config}
+        try:
+            self.rtt_meter = RttMeter(self.engine, config.get('match', 'next'),
+                                      parse_ms(config.get('timeout', 1000), 1.0, 0.001))
+        except ValueError as e:
+            logger.error(f"往返时间统计配置错误: {e}")
+            return
+        self.rtt_export = config.get('export')
+        self.metrics.add_gauge('rtt', self.rtt_meter.as_dict)
+
+    def bind_settings(self):
+        """监听界面设置变化并同步给引擎（在Tk主线程中执行）"""
+        self.ui.bind_settings(self._update_settings)
+        self.ui.entry_sendText.var.trace_add('write', lambda *args: self._update_cycle())
+        self.ui.root.get('entry-uservar').var.trace_add('write', lambda *args: self.update_schedules())
+
+    def _update_settings(self, settings: Settings):
+        """设置快照变化时整体替换引擎的设置"""
+        self.engine.settings = settings
+        self._update_cycle()
+        self.update_schedules()
+
+    def _update_cycle(self):
+        """同步循环发送设置"""
+        settings = self.ui.settings
+        if settings.cycle:
+            packet = Packet(self.ui.get_send_data()['text'])
+            self.engine.set_cycle(packet, settings.cycle_interval)
+        else:
+            self.engine.set_cycle(None)
+
+    def update_schedules(self):
+        """按 usercfg 中的 schedule 同步各预置数据的周期发送任务
+
+        如 "schedule": {"btn-data01": "5ms", "btn-data02": "20ms"}，每个预置数据按各自的周期发送。
+        预置数据、用户变量或编码设置变化时重新生成数据包，周期不变时保持原来的节拍。
+        """
+        schedule = self.ui.root.usercfg.get('schedule') or {}
+        for name in list(self.engine.scheduler.jobs):
+            if name != 'cycle' and name not in schedule:
+                self.engine.remove_schedule(name)
+        for btn_name, period in schedule.items():
+            try:
+                preset = self.ui.preset_packet(btn_name)
+                if preset is None:
+                    continue
+                packet = preset[1]
+                self.engine.add_schedule(btn_name, packet, parse_ms(period, 1.0, 0.001))
+            except Exception as e:
+                logger.error(f"设置 {btn_name} 的周期发送出错: {e}")
+                self.engine.remove_schedule(btn_name)
+
+    def _update_metrics(self):
+        """生成统计快照，刷新状态栏并导出（在Tk主线程中定时执行）"""
+        try:
+            snap = self.metrics.snapshot()
+            self.ui.metrics_var.set(format_status(snap))
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.write(snap)
+        except Exception as e:
+            logger.error(f"更新统计信息时出错: {e}")
+        self.ui.text_recv.after(1000, self._update_metrics)
+
+    def show_plot_window(self):
+        """打开波形窗口，显示解析结果中的数值字段"""
+        if self.win_plot is not None:
+            self.win_plot.lift()
+            return
+        try:
+            # 如 "plot": {"window": 10, "capacity": 100000}
+            config = self.ui.root.usercfg.get('plot', {})
+            data = PlotData(int(config.get('capacity', 100000)))
+            self.win_plot = self.ui.root.toplevel('plot.ui', title='波形')
+            self.plot_view = PlotView(self.ui.root.get('canvas-plot'), self.ui.root.get('label-plot'),
+                                      data, float(config.get('window', 10.0)))
+            self.win_plot.protocol("WM_DELETE_WINDOW", self._close_plot_window)
+            self.ui.plot_data = data
+        except Exception as e:
+            logger.error(f"打开波形窗口时出错: {e}")
+            self._close_plot_window()
+
+    def _close_plot_window(self):
+        """关闭波形窗口并停止记录"""
+        self.ui.plot_data = None
+        if self.plot_view is not None:
+            self.plot_view.close()
+            self.plot_view = None
+        if self.win_plot is not None:
+            self.win_plot.destroy()
+            self.win_plot = None
+
     def detect_serial_ports(self):
         """检测串口"""
         if not hasattr(self, '_detecting') or not self._detecting:
@@ -385,206 +743,83 @@ class SerialCommunicator:
     def open_close_serial(self):
         """打开/关闭串口"""
         self.ui.log('串口操作中...')
-        thread = threading.Thread(target=self._open_close_process, daemon=True)
+        port = self.ui.read_serial_port()
+        baudrate = self.ui.read_serial_baud()
+        framing = framing_for_port(self.ui.root.usercfg.get('framing'), port)
+        thread = threading.Thread(target=self._open_close_process, args=(port, baudrate, framing), daemon=True)
         thread.start()
         self.threads.append(thread)
 
-    def _open_close_process(self):
+    def _open_close_process(self, port: str, baudrate: int, framing: Optional[Dict[str, Any]]):
         """打开/关闭串口进程"""
         try:
-            if self.com.is_open:
-                # 关闭串口
-                self._stop_communication()
-                self.com.close()
-                self.ui.serial_close()
-                self.ui.log(f'{self.com.port}: 已关闭')
-            else:
-                # 打开串口
-                if self._open_serial():
-                    self._start_communication()
-                    self.ui.save_current_config()
+            if self.engine.is_open:
+                self.engine.close()
+            elif self.engine.open(port, baudrate, framing=framing):
+                self.ui.save_current_config()
         except Exception as e:
             logger.error(f"串口操作出错: {e}")
             self.ui.log(f'串口操作失败: {e}')
 
-    def _open_serial(self) -> bool:
-        """打开串口"""
-        try:
-            self.com.port = self.ui.read_serial_port()
-            self.com.baudrate = self.ui.read_serial_baud()
-            self.com.bytesize = 8
-            self.com.parity = 'N'
-            self.com.stopbits = 1
-            self.com.timeout = 0.1  # 设置超时避免阻塞
-            self.com.write_timeout = 1
-
-            self.com.open()
-            self.ui.serial_open()
-            self.ui.log(f'{self.com.port}: 打开成功')
-            return True
-
-        except Exception as e:
-            logger.error(f"打开串口失败: {e}")
-            self.com.close()
-            self.ui.serial_close()
-            self.ui.log(f'{self.com.port}: 打开失败 - {e}')
-            return False
-
-    def _start_communication(self):
-        """启动通信线程"""
-        self.running.set()
-        self.shutdown_event.clear()
-        self.data_ready.clear()
-
-        # 启动接收线程
-        recv_thread = threading.Thread(target=self._receive_loop, daemon=True)
-        recv_thread.start()
-        self.threads.append(recv_thread)
-
-        # 启动发送线程
-        send_thread = threading.Thread(target=self._send_loop, daemon=True)
-        send_thread.start()
-        self.threads.append(send_thread)
-
-    def _stop_communication(self):
-        """停止通信线程"""
-        self.running.clear()
-        self.shutdown_event.set()
-        self.data_ready.set()  # 唤醒发送线程
-
-        # 等待线程结束
-        for thread in self.threads[:]:
-            if thread.is_alive():
-                thread.join(timeout=1.0)
-
-        self.threads.clear()
-
-    def _receive_loop(self):
-        """接收数据循环"""
-        buffer = b''
-        last_data_time = time.time()  # 记录最后接收数据的时间
-
-        while self.running.is_set():
-            try:
-                if self.com.is_open:
-                    # 使用带超时的读取，避免阻塞
-                    data = self.com.read(self.com.in_waiting or 1)
-                    if data:
-                        buffer += data
-                        self.recv_count += len(data)
-                        last_data_time = time.time()  # 更新最后接收时间
-
-                    # 检查是否需要分帧
-                    current_time = time.time()
-                    time_since_last_data = (current_time - last_data_time) * 1000  # 转换为毫秒
-
-                    # 获取分帧间隔设置
-                    try:
-                        split_interval = float(self.ui.entry_split.var.get().replace('ms', ''))
-                    except ValueError:
-                        split_interval = 100  # 默认100ms
-
-                    # 如果缓冲区有数据且超过分帧间隔，或者缓冲区数据量很大
-                    if buffer and (time_since_last_data >= split_interval or len(buffer) > 1024):
-                        self.ui.dmesg('recv', buffer)
-                        self.ui.log(f'{self.com.port}: 接收 {len(buffer)} 字节: {tohex(buffer)}')
-                        buffer = b''  # 清空缓冲区
-
-                # 使用 Event.wait 代替 sleep，可以及时响应停止事件
-                self.running.wait(0.01)  # 等待10ms或直到running被清除
-
-            except Exception as e:
-                logger.error(f"接收数据错误: {e}")
-                # 出错时等待100ms，但可以响应停止事件
-                self.running.wait(0.1)
-
-    def _send_loop(self):
-        """发送数据循环"""
-        while self.running.is_set():
-            try:
-                if self.com.is_open and self.ui.should_send_cycle():
-                    cycle_interval = self.ui.get_cycle_interval()
-
-                    # 使用 Event.wait 代替 sleep，可以及时响应停止事件
-                    self.data_ready.wait(cycle_interval)
-                    self._send_data()
-                    if self.data_ready.is_set():
-                        self.data_ready.clear()
-                else:
-                    # 等待数据准备好或停止事件，最多等待100ms
-                    self.data_ready.wait(0.1)
-                    if self.data_ready.is_set():
-                        self._send_data()
-                        self.data_ready.clear()
-
-            except Exception as e:
-                logger.error(f"发送循环错误: {e}")
-                self.running.wait(0.1)  # 出错时等待，但可以响应停止事件
-
     def send_data(self):
         """发送数据"""
-        if not self.com.is_open:
+        if not self.engine.is_open:
             self.ui.log('串口未打开')
             return
 
-        # 设置数据准备事件，唤醒发送线程
-        self.data_ready.set()
+        data_info = self.ui.get_send_data(cache=False)
+        self.engine.send(data_info['text'], data_info['rts'], data_info['dtr'])
         # 手动发送时不操作dtr/rts
         self.ui.set_send_data(rts=None, dtr=None)
 
-    def _send_data(self):
-        """实际发送数据"""
-        try:
-            data_info = self.ui.get_send_data(cache=False)
-
-            # 设置RTS/DTR
-            if data_info['rts'] is not None:
-                self.com.rts = data_info['rts']
-                self.ui.log(f'{self.com.port}: RTS = {data_info["rts"]}')
-
-            if data_info['dtr'] is not None:
-                self.com.dtr = data_info['dtr']
-                self.ui.log(f'{self.com.port}: DTR = {data_info["dtr"]}')
-
-            # 发送数据
-            data = data_info['text']
-            if data:
-                self.com.write(data)
-                self.send_count += len(data)
-                self.ui.log(f'{self.com.port}: 发送 {len(data)} 字节')
-                self.ui.dmesg('send', data)
-
-        except Exception as e:
-            logger.error(f"发送数据错误: {e}")
-            self.ui.log(f'发送失败: {e}')
-
     def clear_window(self):
         """清空窗口"""
         self.ui.clear_recv_text()
+        if self.ui.plot_data is not None:
+            self.ui.plot_data.clear()
 
     def save_file(self):
         """保存文件"""
         self.ui.save_recv_text()
 
+    def toggle_capture(self):
+        """开始/停止录制原始收发数据"""
+        try:
+            if self.engine.capture is not None:
+                self.engine.stop_capture()
+                self.ui.root.get('btn-capture').configure(text='开始录制')
+                return
+
+            filename = tkinter.filedialog.asksaveasfilename(
+                defaultextension='.scap',
+                initialfile=f'scommcap-{tsnow()}'
+            )
+            if filename:
+                self.engine.start_capture(filename)
+                self.ui.root.get('btn-capture').configure(text='停止录制')
+        except Exception as e:
+            logger.error(f"录制操作出错: {e}")
+            self.ui.log(f'录制失败: {e}')
+
     def safe_exit(self):
         """安全退出"""
         logger.info("正在退出应用程序...")
 
-        # 停止所有线程
-        self.running.clear()
-        self.shutdown_event.set()
-        self.data_ready.set()  # 唤醒可能等待的发送线程
-
-        # 关闭串口
-        if self.com.is_open:
+        # 停止收发线程并关闭串口
+        if self.engine.is_open:
+            self.engine.close()
+            logger.info("串口已关闭")
+        self.engine.stop_capture()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.close()
+        if self.rtt_meter is not None and self.rtt_export:
             try:
-                self.com.close()
-                logger.info("串口已关闭")
-            except Exception as e:
-                logger.error(f"关闭串口时出错: {e}")
-
-        # 等待一段时间让线程结束
-        self.shutdown_event.wait(1.0)
+                self.rtt_meter.write(self.rtt_export)
+            except OSError as e:
+                logger.error(f"写入往返时间统计出错: {e}")
+        if self.ui.unpack_pool is not None:
+            self.ui.unpack_pool.close(wait=False)
+        self.ui.root.config_store.close()  # 写入尚未保存的配置
 
         # 强制退出
         sys.exit(0)
@@ -597,12 +832,37 @@ class TopWindow:
         self.root = root
         self.root.unpack = {}
         self.root.pack = None
+        self.scripts = ScriptCache()
 
         self.win_data = None
         self.win_unpack = None
 
         logger.info("顶层窗口管理器初始化完成")
 
+    def refresh_script_stats(self):
+        """在解析脚本按钮上显示执行耗时p99、错误次数和是否超出预算（每秒刷新）"""
+        for i in range(20):
+            btn_name = f'btn-unpack{i+1:02d}'
+            config = self.root.usercfg.get(btn_name)
+            script = self.scripts.cached(btn_name)
+            if not config or script is None:
+                continue
+            text = config.get('title', btn_name)
+            summary = script.stats.summary()
+            if summary:
+                text += f' {summary}'
+            if script.disabled:
+                text += ' [停用]'
+            elif script.slow:
+                text += ' [慢]'
+            try:
+                button = self.root.get(btn_name)
+                if button.cget('text') != text:
+                    button.configure(text=text)
+            except KeyError:
+                pass
+        self.root.after(1000, self.refresh_script_stats)
+
     def set_send_data(self, btn_name: str):
         """设置发送数据"""
         config = self.root.usercfg.get(btn_name, {})
@@ -610,29 +870,8 @@ class TopWindow:
             return
 
         try:
-            value = config.get('value', '')
-
-            # 尝试评估表达式
-            try:
-                user_vars = self.root.get('entry-uservar').var.get().split(',')
-                value = eval(value, {"data": user_vars})
-            except:
-                pass
-
-            # 准备发送数据包
-            if isinstance(value, dict):
-                self.root.pack = {
-                    'text': value.get('text', ''),
-                    'encoding': value.get('encoding'),
-                    'hex_flag': value.get('hex'),
-                    'rts': value.get('rts'),
-                    'dtr': value.get('dtr')
-                }
-            else:
-                self.root.pack = {
-                    'text': str(value),
-                    'hex_flag': config.get('hex')
-                }
+            # 准备发送数据包（按内容缓存，不重复求值和编码）
+            self.root.pack = self.root.preset_packet(btn_name)
 
             # 触发发送
             self.root.get('btn-send').invoke()
@@ -641,17 +880,20 @@ class TopWindow:
             logger.error(f"设置发送数据时出错: {e}")
 
     def set_unpack(self, btn_name: str):
-        """设置解析脚本"""
-        self.root.unpack[btn_name] = (
-            self.root.get(btn_name).var.get()
-            and self.root.usercfg.get(btn_name)
-            or None
-        )
+        """设置解析脚本（选中时编译并缓存）"""
+        if self.root.get(btn_name).var.get():
+            script = self.scripts.get(btn_name, self.root.usercfg.get(btn_name))
+            if script is not None and script.disabled:
+                script.reset()  # 重新选中时恢复因超出预算停用的脚本
+            self.root.unpack[btn_name] = script
+        else:
+            self.root.unpack[btn_name] = None
 
     def save_config(self, btn_name: str, data: Dict[str, Any]):
         """保存配置"""
         self.root.save_cfg(btn_name, data)
         self.root.get(btn_name).configure(text=data.get('title', btn_name))
+        self.root.update_schedules()
 
     def show_data_window(self, event):
         """显示数据配置窗口"""
@@ -706,21 +948,45 @@ class TopWindow:
         # 设置控件值
         self.root.entry('entry-ufile').set(config.get('title', btn_name))
         self.root.get('text-usetting').delete('1.0', 'end')
-        self.root.get('text-usetting').insert('end', config.get('value', ''))
+        if 'layout' in config:
+            source = json.dumps(config['layout'], ensure_ascii=False, indent=2)
+        else:
+            source = config.get('value', '')
+        self.root.get('text-usetting').insert('end', source)
+        self.root.get('label-ustats').configure(text=self._script_report(btn_name))
 
         # 绑定保存按钮
         self.root.button('btn-usave',
                         cmd=lambda: self._save_unpack_config(btn_name),
                         focus=True)
 
+    def _script_report(self, btn_name: str) -> str:
+        """解析脚本的执行统计与最近一次异常"""
+        script = self.scripts.cached(btn_name)
+        if script is None or not script.stats.calls:
+            return ''
+        stats = script.stats
+        text = (f'调用 {stats.calls} 次  平均 {stats.mean * 1000:.3f}ms  p99 {stats.p99 * 1000:.3f}ms  '
+                f'错误 {stats.errors} 次  超出预算 {stats.over_budget} 次')
+        if stats.last_error:
+            text += '\n' + '\n'.join(stats.last_error.strip().splitlines()[-3:])
+        return text
+
     def _save_unpack_config(self, btn_name: str):
         """保存解析脚本配置"""
         try:
-            data = {
-                'title': self.root.get('entry-ufile').var.get(),
-                'value': self.root.get('text-usetting').get('1.0', 'end-1c')
-            }
+            title = self.root.get('entry-ufile').var.get()
+            source = self.root.get('text-usetting').get('1.0', 'end-1c')
+            data = {'title': title, 'value': source}
+            # 内容为含 fields 的JSON对象时按帧结构保存
+            try:
+                layout = json.loads(source)
+            except ValueError:
+                layout = None
+            if isinstance(layout, dict) and 'fields' in layout:
+                data = {'title': title, 'layout': layout}
             self.save_config(btn_name, data)
+            self.scripts.invalidate(btn_name)
             self.set_unpack(btn_name)
 
             if self.win_unpack:
@@ -738,24 +1004,24 @@ def main():
         tkinter.ScrolledText = tkinter.scrolledtext.ScrolledText
         root = tkgen.gengui.TkJson('app.ui', title='scomm串口调试助手')
 
+        # 加载用户配置
+        root.config_store = ConfigStore.load('usercfg.json')
+        root.usercfg = root.config_store.data
+
         # 初始化通信器
         comm = SerialCommunicator(root)
         window_manager = TopWindow(root)
 
-        # 加载用户配置
-        if os.path.isfile('usercfg.json'):
-            with open('usercfg.json', 'r', encoding='utf-8') as f:
-                root.usercfg = json.load(f)
-        else:
-            root.usercfg = {}
-
         root.save_cfg = comm.ui.save_config
+        root.update_schedules = comm.update_schedules
+        root.preset_packet = comm.ui.preset_packet
 
         # 设置预置数据按钮
         _setup_data_buttons(root, window_manager)
 
         # 设置解析脚本按钮
         _setup_unpack_buttons(root, window_manager)
+        window_manager.refresh_script_stats()
 
         # 设置UI控件
         _setup_ui_controls(root, comm)
@@ -855,10 +1121,17 @@ def _setup_ui_controls(root, comm):
     root.button('btn-send', cmd=lambda: comm.send_data())
     root.button('btn-clear', cmd=lambda: comm.clear_window())
     root.button('btn-savefile', cmd=lambda: comm.save_file())
+    root.button('btn-capture', cmd=lambda: comm.toggle_capture())
+    root.button('btn-plot', cmd=lambda: comm.show_plot_window())
 
     # 绑定发送文本框回车事件
     root.entry('entry-sendText', key='<Return>', cmd=lambda e: comm.send_data()).set('')
 
+    # 设置变化时同步给通信引擎
+    comm.bind_settings()
+
 
 if __name__ == '__main__':
+    # 打包为可执行文件时，进程池的子进程也从这里启动
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,9 @@
+"""
+scomm串口通信核心，与Tk界面无关，可在无显示环境下运行。
+"""
+
+from .engine import SerialEngine, Packet
+from .multiport import PortHub, PortSession
+from .settings import Settings
+
+__all__ = ['SerialEngine', 'Packet', 'PortHub', 'PortSession', 'Settings']
@@ -0,0 +1,143 @@
+"""
+无界面运行scomm：
+
+    python -m scommcore /dev/ttyUSB0 -b 115200 --hex
+"""
+
+import sys
+import json
+import time
+import argparse
+import logging
+
+from .engine import SerialEngine, Packet
+from .utils import strnow, human_string
+from .hexfmt import hexdump
+from .bridge import TcpBridge, parse_address, POLICIES
+from .metrics import Metrics, MetricsExporter
+from .latency import RttMeter
+from .settings import parse_ms
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog='scommcore', description='scomm串口调试助手（无界面模式）')
+    parser.add_argument('port', help='串口设备')
+    parser.add_argument('-b', '--baud', type=int, default=9600, help='波特率')
+    parser.add_argument('--split', type=float, default=99, help='分帧间隔（毫秒）')
+    parser.add_argument('--max-frame', type=int, default=1024, help='最大帧长（字节）')
+    parser.add_argument('--framing', type=json.loads, default=None,
+                        help='协议分帧配置（JSON），例如 \'{"type": "delimiter", "delimiter": "0D 0A"}\'')
+    parser.add_argument('--receive-mode', choices=('auto', 'select', 'poll'), default='auto',
+                        help='接收方式：select阻塞等待数据并精确分帧，poll每10ms轮询')
+    parser.add_argument('--hex', action='store_true', help='HEX显示')
+    parser.add_argument('--hexdump', action='store_true', help='以偏移量+HEX+ASCII形式显示')
+    parser.add_argument('--encoding', default='utf-8', help='数据编码')
+    parser.add_argument('--capture', metavar='FILE', help='把收发的原始数据写入抓包文件')
+    parser.add_argument('--listen', metavar='[HOST:]PORT', help='通过TCP共享串口，例如 0.0.0.0:7000')
+    parser.add_argument('--client-buffer', type=int, default=1024 * 1024, help='每个TCP客户端的缓冲区上限（字节）')
+    parser.add_argument('--slow-client', choices=POLICIES, default='drop',
+                        help='客户端缓冲区满时丢弃数据（drop）或断开连接（disconnect）')
+    parser.add_argument('--metrics', metavar='FILE', help='定期把收发统计追加写入JSON Lines文件')
+    parser.add_argument('--metrics-interval', type=float, default=1.0, help='统计导出间隔（秒）')
+    parser.add_argument('--gap', type=float, default=0.0,
+                        help='发送帧间隔（毫秒），每行数据发出后至少间隔这么久再发下一行；为0时相邻数据合并写入')
+    parser.add_argument('--every', metavar='PERIOD:HEX', action='append', default=[],
+                        help='按固定周期发送，可重复，例如 5ms:0103000000 0AC5CD；退出时输出周期延迟统计')
+    parser.add_argument('--spin', type=float, default=0.0,
+                        help='周期发送在计划时刻前忙等的毫秒数，降低唤醒延迟但占用CPU')
+    parser.add_argument('--rtt', metavar='RULE',
+                        help='统计请求/应答往返时间：next（任意下一帧为应答）或 address[:N]（第N字节相同），退出时输出p50/p95/p99')
+    parser.add_argument('--rtt-timeout', type=float, default=1000, help='超过这么久（毫秒）没有应答的请求计为丢失')
+    parser.add_argument('--rtt-out', metavar='FILE', help='把往返时间统计（含直方图）写入JSON文件')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出状态消息')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    engine = SerialEngine()
+    engine.configure(split_interval=args.split / 1000.0, max_frame_size=args.max_frame,
+                     tx_gap=args.gap / 1000.0)
+    engine.receive_mode = args.receive_mode
+
+    def on_recv(data: bytes):
+        if args.hexdump:
+            sys.stdout.write(f"[{strnow()}] < {len(data)} 字节\n{hexdump(data)}\n")
+        else:
+            sys.stdout.write(f"[{strnow()}] < {human_string(data, args.hex, args.encoding)}\n")
+        sys.stdout.flush()
+
+    engine.subscribe('recv', on_recv)
+    if args.verbose:
+        engine.subscribe('log', logging.getLogger('scommcore').info)
+
+    rtt = None
+    if args.rtt:
+        try:
+            rtt = RttMeter(engine, args.rtt, args.rtt_timeout / 1000.0)
+        except ValueError as e:
+            parser.error(str(e))
+    schedules = []  # (周期, 数据包)，串口打开后再添加
+    for spec in args.every:
+        period, _, payload = spec.partition(':')
+        seconds = parse_ms(period, None, 0.001)
+        if seconds is None:
+            parser.error(f'--every {spec}: 无效的周期 {period!r}')
+        try:
+            data = bytes.fromhex(payload)
+        except ValueError as e:
+            parser.error(f'--every {spec}: 无效的HEX数据 - {e}')
+        if not data:
+            parser.error(f'--every {spec}: 缺少要发送的HEX数据')
+        schedules.append((seconds, Packet(data)))
+    if not engine.open(args.port, args.baud, framing=args.framing):
+        return 1
+    if args.capture:
+        engine.start_capture(args.capture)
+    engine.scheduler.spin = args.spin / 1000.0
+    for i, (period, packet) in enumerate(schedules):
+        engine.add_schedule(f'every{i + 1}', packet, period)
+    exporter = None
+    if args.metrics:
+        metrics = Metrics(engine)
+        if args.every:
+            metrics.add_gauge('schedule', engine.scheduler.stats)
+        if rtt is not None:
+            metrics.add_gauge('rtt', rtt.as_dict)
+        exporter = MetricsExporter(metrics, args.metrics, args.metrics_interval).start()
+    bridge = None
+    if args.listen:
+        host, port = parse_address(args.listen)
+        bridge = TcpBridge(engine, host, port, args.client_buffer, args.slow_client).start()
+
+    try:
+        # 标准输入的每一行作为一次发送
+        for line in sys.stdin:
+            engine.send(line.encode(args.encoding, 'ignore'))
+        # 关闭串口前等待已读入的数据全部发出
+        engine.flush()
+        # 有周期发送、TCP共享、抓包或统计任务时，标准输入结束后继续运行，直到串口关闭或按下Ctrl-C
+        if args.every or args.listen or args.capture or args.rtt or args.metrics:
+            while engine.is_open:
+                time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if bridge is not None:
+            bridge.stop()
+        engine.close()
+        engine.stop_capture()
+        if exporter is not None:
+            exporter.close()
+        if args.every:
+            sys.stderr.write(json.dumps(engine.scheduler.stats(), ensure_ascii=False, indent=2) + '\n')
+        if rtt is not None:
+            sys.stderr.write(rtt.report() + '\n')
+            if args.rtt_out:
+                rtt.write(args.rtt_out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
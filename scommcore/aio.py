@@ -0,0 +1,290 @@
+"""
+asyncio 接口：串口描述符直接注册到事件循环，不需要额外的线程
+
+    async with AsyncSerialPort('/dev/ttyUSB0', 115200) as port:
+        await port.write(b'\\x55\\xAA')
+        reply = await port.request(b'AT\\r\\n', until=b'OK', timeout=1.0)
+        async for frame in port.frames():
+            ...
+
+分帧方式与 SerialEngine 相同：配置了协议分帧时由分帧器切分，否则按分帧间隔和最大帧长分帧，
+分帧时刻由事件循环的定时器触发。仅支持可以取得文件描述符的平台（Mac/Linux）。
+"""
+
+import os
+import re
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Callable, Union, AsyncIterator
+
+import serial
+
+from .hexfmt import hex_preview
+from .settings import Settings
+from .receiver import FrameReceiver
+from .capture import CaptureWriter
+from .events import EventSource
+from .store import SEND
+
+logger = logging.getLogger(__name__)
+
+# request 的 until 参数：bytes 表示帧中包含该内容，也可以是正则或判断函数
+Until = Union[None, bytes, 're.Pattern', Callable[[bytes], bool]]
+
+
+def _matcher(until: Until) -> Callable[[bytes], bool]:
+    """把 until 参数转换为判断函数"""
+    if until is None:
+        return lambda frame: True
+    if isinstance(until, (bytes, bytearray)):
+        return lambda frame: until in frame
+    if isinstance(until, re.Pattern):
+        return lambda frame: until.search(frame) is not None
+    if callable(until):
+        return until
+    raise TypeError(f'不支持的until参数: {until!r}')
+
+
+class AsyncSerialPort(EventSource):
+    """基于asyncio的串口
+
+    事件与 SerialEngine 相同，回调在事件循环中同步执行；
+    也可以通过 frames() 以异步迭代的方式逐帧读取。
+    """
+
+    EVENTS = ('recv', 'send', 'log', 'open', 'close', 'rx')
+
+    def __init__(self, port: str, baudrate: int, framing: Optional[Dict[str, Any]] = None,
+                 settings: Settings = Settings(), **kwargs):
+        super().__init__()
+        self.com = serial.Serial()
+        self.com.port = port
+        self.com.baudrate = baudrate
+        self.com.bytesize = kwargs.get('bytesize', 8)
+        self.com.parity = kwargs.get('parity', 'N')
+        self.com.stopbits = kwargs.get('stopbits', 1)
+        self.com.timeout = 0
+
+        self.settings = settings
+        self.framing = framing
+        self.capture: Optional[CaptureWriter] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fd = -1
+        self._receiver: Optional[FrameReceiver] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._queues: List[asyncio.Queue] = []  # 每个 frames() 迭代器一个队列
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._write_waiter: Optional[asyncio.Future] = None  # write() 等待描述符可写
+
+        # 统计信息
+        self.send_count = 0
+        self.recv_count = 0
+        self.dropped_frames = 0  # 迭代器队列满时丢弃的帧数
+
+    @property
+    def port(self) -> str:
+        return self.com.port
+
+    @property
+    def is_open(self) -> bool:
+        return self.com.is_open
+
+    @property
+    def framing_dropped(self) -> int:
+        """分帧器因超长或格式错误丢弃的字节数"""
+        return self._receiver.dropped if self._receiver is not None else 0
+
+    def configure(self, **changes):
+        """修改部分设置，生成新的设置快照"""
+        self.settings = self.settings._replace(**changes)
+
+    async def open(self) -> 'AsyncSerialPort':
+        """打开串口并把描述符注册到当前事件循环，失败时抛出 serial.SerialException"""
+        self._loop = asyncio.get_running_loop()
+        try:
+            self.com.open()
+            self._fd = self.com.fileno()
+            os.set_blocking(self._fd, False)
+        except Exception as e:
+            self.com.close()
+            self.emit('close')
+            self.log(f'{self.port}: 打开失败 - {e}')
+            raise
+
+        self._receiver = FrameReceiver(self, self.framing, clock=self._loop.time)
+        self._write_lock = asyncio.Lock()
+        self._loop.add_reader(self._fd, self._on_readable)
+        self.emit('open')
+        self.log(f'{self.port}: 打开成功')
+        return self
+
+    async def close(self):
+        """关闭串口，结束所有 frames() 迭代"""
+        if not self.is_open:
+            return
+        self._loop.remove_reader(self._fd)
+        self._loop.remove_writer(self._fd)
+        waiter, self._write_waiter = self._write_waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(serial.SerialException('串口已关闭'))
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._expire()
+        try:
+            self.com.close()
+        except Exception as e:
+            logger.error(f"关闭串口时出错: {e}")
+        for q in self._queues:
+            if q.full():  # 有界队列满时丢弃最旧的帧，保证结束标记能放入
+                q.get_nowait()
+                self.dropped_frames += 1
+            q.put_nowait(None)
+        self.emit('close')
+        self.log(f'{self.port}: 已关闭')
+
+    async def __aenter__(self) -> 'AsyncSerialPort':
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def write(self, data: bytes, rts: Optional[bool] = None, dtr: Optional[bool] = None):
+        """发送数据，全部写入驱动后返回；多个协程同时调用时按调用顺序发送
+
+        串口未打开，或在等待发送期间被关闭时抛出 serial.SerialException。
+        """
+        if not self.is_open:
+            raise serial.SerialException('串口未打开')
+        async with self._write_lock:
+            if not self.is_open:
+                raise serial.SerialException('串口已关闭')
+            if rts is not None:
+                self.com.rts = rts
+                self.log(f'{self.port}: RTS = {rts}')
+            if dtr is not None:
+                self.com.dtr = dtr
+                self.log(f'{self.port}: DTR = {dtr}')
+            if not data:
+                return
+
+            view = memoryview(data)
+            while view:
+                try:
+                    n = os.write(self._fd, view)
+                except BlockingIOError:
+                    n = 0
+                view = view[n:]
+                if view:
+                    await self._writable()
+
+            self.send_count += len(data)
+            if self.capture is not None:
+                self.capture.record(SEND, data, self.port)
+            self.log(f'{self.port}: 发送 {len(data)} 字节')
+            self.emit('send', data)
+
+    async def frames(self, maxsize: int = 0) -> AsyncIterator[bytes]:
+        """逐帧读取接收数据，串口关闭时结束
+
+        maxsize 大于0时队列有界，消费过慢时丢弃最旧的帧（计入 dropped_frames）。
+        只能收到开始迭代之后的帧。
+        """
+        q: asyncio.Queue = asyncio.Queue(maxsize)
+        self._queues.append(q)
+        try:
+            while True:
+                frame = await q.get()
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            self._queues.remove(q)
+
+    async def request(self, data: bytes, until: Until = None, timeout: Optional[float] = 1.0) -> bytes:
+        """发送数据并等待第一帧满足 until 的应答，超时抛出 asyncio.TimeoutError"""
+        match = _matcher(until)
+        q: asyncio.Queue = asyncio.Queue()
+        self._queues.append(q)  # 发送前开始收集，避免漏掉很快到达的应答
+        try:
+            await self.write(data)
+
+            async def wait_reply() -> bytes:
+                while True:
+                    frame = await q.get()
+                    if frame is None:
+                        raise serial.SerialException('串口已关闭')
+                    if match(frame):
+                        return frame
+
+            return await asyncio.wait_for(wait_reply(), timeout)
+        finally:
+            self._queues.remove(q)
+
+    def _writable(self) -> 'asyncio.Future':
+        """等待描述符可写，期间串口关闭时抛出 serial.SerialException"""
+        future = self._write_waiter = self._loop.create_future()
+
+        def ready():
+            self._loop.remove_writer(self._fd)
+            if not future.done():
+                future.set_result(None)
+
+        def done(_):
+            if self._write_waiter is future:
+                self._write_waiter = None
+
+        future.add_done_callback(done)
+        self._loop.add_writer(self._fd, ready)
+        return future
+
+    def _flush_frame(self, data: bytes):
+        """输出一帧接收数据"""
+        for q in self._queues:
+            if q.full():
+                q.get_nowait()
+                self.dropped_frames += 1
+            q.put_nowait(data)
+        self.emit('recv', data)
+        self.log(f'{self.port}: 接收 {len(data)} 字节: {hex_preview(data)}')
+
+    def _on_readable(self):
+        """描述符可读（事件循环回调）"""
+        receiver = self._receiver
+        fd = self._fd
+        try:
+            n = receiver.read(lambda view: os.readv(fd, [view]))
+        except OSError as e:
+            n = 0
+            logger.error(f"接收数据错误: {e}")
+        if n is None:
+            return
+        if not n:
+            self.log(f'{self.port}: 串口已断开')
+            self._loop.create_task(self.close())
+            return
+
+        if len(receiver) and self._timer is None:
+            self._timer = self._loop.call_at(receiver.deadline, self._on_timer)
+
+    def _on_timer(self):
+        """分帧定时器：期间又收到数据时推迟到新的分帧时刻"""
+        self._timer = None
+        receiver = self._receiver
+        if not len(receiver):
+            return
+        if receiver.deadline > self._loop.time():
+            self._timer = self._loop.call_at(receiver.deadline, self._on_timer)
+        else:
+            receiver.expire()
+
+    def _expire(self):
+        """输出缓冲区中的数据"""
+        if self._receiver is not None:
+            self._receiver.expire()
+
+
+async def open_serial(port: str, baudrate: int, **kwargs) -> AsyncSerialPort:
+    """创建并打开 AsyncSerialPort"""
+    return await AsyncSerialPort(port, baudrate, **kwargs).open()
@@ -0,0 +1,233 @@
+"""
+TCP转发：把已打开的串口共享给多个TCP客户端
+
+    python -m scommcore /dev/ttyUSB0 -b 115200 --listen 0.0.0.0:7000
+
+每个客户端都收到完整的接收数据流，客户端发来的数据放入串口的发送队列。
+转发在独立线程中进行，接收线程只把数据追加到各客户端的缓冲区，不会被慢速客户端阻塞。
+客户端缓冲区有上限，超出时按策略丢弃数据（'drop'）或断开该客户端（'disconnect'）。
+"""
+
+import socket
+import logging
+import selectors
+import threading
+from typing import Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('drop', 'disconnect')
+
+
+class BridgeClient:
+    """一个TCP客户端连接"""
+
+    def __init__(self, sock: socket.socket, address: Tuple):
+        self.sock = sock
+        self.address = address
+        self.out = bytearray()  # 待发送给客户端的接收数据
+        self.closing = False
+        self.sent_bytes = 0  # 转发给客户端的字节数
+        self.recv_bytes = 0  # 客户端发来的字节数
+        self.dropped_bytes = 0  # 缓冲区满时丢弃的字节数
+
+    @property
+    def name(self) -> str:
+        return '%s:%s' % self.address[:2]
+
+
+class TcpBridge:
+    """TCP转发服务
+
+    engine 可以是 SerialEngine、PortSession 等提供 subscribe/unsubscribe/send 的对象，
+    转发的是 'rx' 事件中的原始数据块，与分帧配置无关。
+    """
+
+    def __init__(self, engine, host: str = '127.0.0.1', port: int = 0,
+                 max_buffer: int = 1024 * 1024, policy: str = 'drop'):
+        if policy not in POLICIES:
+            raise ValueError(f'未知的慢速客户端策略: {policy}')
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.policy = policy
+        self.clients: List[BridgeClient] = []
+        self.running = threading.Event()
+
+        self._server: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # 保护 clients 和各客户端的 out
+        self._wakeup: Optional[Tuple[socket.socket, socket.socket]] = None
+        self._signaled = False
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """实际监听的地址（port为0时由系统分配端口）"""
+        return self._server.getsockname()[:2]
+
+    def start(self) -> 'TcpBridge':
+        """开始监听并转发"""
+        server = socket.create_server((self.host, self.port))
+        server.setblocking(False)
+        self._server = server
+        self._wakeup = socket.socketpair()
+        for sock in self._wakeup:
+            sock.setblocking(False)
+
+        self.running.set()
+        self.engine.subscribe('rx', self._on_recv)
+        self._thread = threading.Thread(target=self._serve_loop, daemon=True)
+        self._thread.start()
+        self.engine.log('TCP转发: 监听 %s:%s' % self.address)
+        return self
+
+    def stop(self):
+        """断开所有客户端并停止监听"""
+        if self._thread is None:
+            return
+        self.engine.unsubscribe('rx', self._on_recv)
+        self.running.clear()
+        self._wake()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+        for sock in self._wakeup:
+            sock.close()
+        self._server.close()
+
+    def __enter__(self) -> 'TcpBridge':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _on_recv(self, data: bytes):
+        """接收线程回调：只追加到各客户端缓冲区，不做网络I/O"""
+        with self._lock:
+            for client in self.clients:
+                if client.closing:
+                    continue
+                if len(client.out) + len(data) > self.max_buffer:
+                    client.dropped_bytes += len(data)
+                    if self.policy == 'disconnect':
+                        client.closing = True
+                    continue
+                client.out += data
+        self._wake()
+
+    def _wake(self):
+        """唤醒转发线程，已有未处理的唤醒时不再重复写入"""
+        if not self._signaled:
+            self._signaled = True
+            try:
+                self._wakeup[1].send(b'\0')
+            except (BlockingIOError, OSError):
+                pass
+
+    def _serve_loop(self):
+        """转发线程：接受连接、读取客户端数据、把接收数据写给客户端"""
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._server, selectors.EVENT_READ)
+            selector.register(self._wakeup[0], selectors.EVENT_READ)
+
+            while self.running.is_set():
+                try:
+                    for key, mask in selector.select():
+                        if key.fileobj is self._server:
+                            self._accept(selector)
+                        elif key.fileobj is self._wakeup[0]:
+                            try:
+                                while self._wakeup[0].recv(4096):
+                                    pass
+                            except BlockingIOError:
+                                pass
+                            # 读空之后再清除标志：此后的 _wake 会重新写入，之前追加的数据由下面的 _flush_clients 发出
+                            self._signaled = False
+                        elif mask & selectors.EVENT_READ:
+                            self._read_client(selector, key.data)
+                    self._flush_clients(selector)
+                except Exception as e:
+                    logger.error(f"TCP转发错误: {e}")
+                    self.running.wait(0.1)
+
+            for client in list(self.clients):
+                self._drop_client(selector, client, '服务停止')
+
+    def _accept(self, selector: selectors.BaseSelector):
+        """接受新连接"""
+        try:
+            sock, address = self._server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = BridgeClient(sock, address)
+        with self._lock:
+            self.clients.append(client)
+        selector.register(sock, selectors.EVENT_READ, client)
+        self.engine.log(f'TCP转发: {client.name} 已连接')
+
+    def _read_client(self, selector: selectors.BaseSelector, client: BridgeClient):
+        """客户端发来的数据放入串口发送队列"""
+        try:
+            data = client.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._drop_client(selector, client, str(e))
+            return
+        if not data:
+            self._drop_client(selector, client, '已断开')
+            return
+        client.recv_bytes += len(data)
+        self.engine.send(data)
+
+    def _flush_clients(self, selector: selectors.BaseSelector):
+        """把缓冲区中的接收数据写给各客户端，写不完的等待可写事件"""
+        with self._lock:
+            clients = list(self.clients)
+        for client in clients:
+            if client.closing:
+                self._drop_client(selector, client, f'缓冲区超过 {self.max_buffer} 字节')
+                continue
+            with self._lock:
+                if not client.out:
+                    continue
+                try:
+                    n = client.sock.send(client.out)
+                except BlockingIOError:
+                    n = 0
+                except OSError as e:
+                    n = -1
+                    error = str(e)
+                else:
+                    del client.out[:n]
+                    client.sent_bytes += n
+                pending = bool(client.out)
+            if n < 0:
+                self._drop_client(selector, client, error)
+                continue
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0)
+            if selector.get_key(client.sock).events != events:
+                selector.modify(client.sock, events, client)
+
+    def _drop_client(self, selector: selectors.BaseSelector, client: BridgeClient, reason: str):
+        """断开客户端"""
+        with self._lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        try:
+            selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+        message = f'TCP转发: {client.name} {reason}'
+        if client.dropped_bytes:
+            message += f'，丢弃 {client.dropped_bytes} 字节'
+        self.engine.log(message)
+
+
+def parse_address(text: str, default_host: str = '127.0.0.1') -> Tuple[str, int]:
+    """解析 HOST:PORT 或 PORT"""
+    host, _, port = text.rpartition(':')
+    return host or default_host, int(port)
@@ -0,0 +1,77 @@
+from typing import Callable
+
+
+class ReceiveBuffer:
+    """预分配的接收缓冲区
+
+    数据通过 readinto 直接写入预先分配的 bytearray，凑满一帧时才复制一次，
+    避免 bytes 逐段拼接带来的平方级复制开销。
+    """
+
+    def __init__(self, size: int = 1024):
+        self._size = 0
+        self._buffer = bytearray()
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+        self.resize(size)
+
+    @property
+    def size(self) -> int:
+        """最大帧长"""
+        return self._size
+
+    def resize(self, size: int):
+        """修改最大帧长，已缓存的数据保留"""
+        size = max(1, int(size))
+        if size == self._size and len(self._buffer) == size:
+            return
+        buffer = bytearray(max(size, self._filled))
+        buffer[:self._filled] = self._view[:self._filled]
+        self._view.release()
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._filled
+
+    @property
+    def full(self) -> bool:
+        return self._filled >= self._size
+
+    @property
+    def free(self) -> int:
+        """剩余可写入的字节数"""
+        return max(0, self._size - self._filled)
+
+    def fill(self, readinto: Callable[[memoryview], int], count: int) -> int:
+        """调用readinto把最多count字节直接读入缓冲区，返回实际读到的字节数"""
+        count = min(count, self.free)
+        if count <= 0:
+            return 0
+        n = readinto(self._view[self._filled:self._filled + count]) or 0
+        self._filled += n
+        return n
+
+    def extend(self, data) -> int:
+        """写入已有数据，返回写入的字节数（超出最大帧长的部分不写入）"""
+        n = min(len(data), self.free)
+        self._view[self._filled:self._filled + n] = data[:n]
+        self._filled += n
+        return n
+
+    def peek(self) -> memoryview:
+        """已缓存数据的只读视图（不复制）"""
+        return self._view[:self._filled].toreadonly()
+
+    def clear(self):
+        """清空缓冲区（不复制数据）"""
+        self._filled = 0
+
+    def take(self) -> bytes:
+        """取出已缓存的数据并清空缓冲区"""
+        data = bytes(self._view[:self._filled])
+        self._filled = 0
+        if len(self._buffer) > self._size:
+            self.resize(self._size)
+        return data
@@ -0,0 +1,159 @@
+"""
+二进制抓包文件
+
+记录每次读写的原始数据块，格式为文件头 + 若干记录，全部小端序：
+
+    文件头  magic 'SCAP' | version u16 | reserved u16 | 起始时刻 wall f64（秒） | 起始时刻 monotonic u64（纳秒）
+    记录头  monotonic u64（纳秒） | direction u8 | port u16 | length u32，之后为 length 字节数据
+
+direction 为 0 接收、1 发送、2 串口名称（数据为UTF-8编码的串口名，定义 port 编号）。
+文件只追加写入，异常中断时最多丢失最后一条不完整的记录。
+"""
+
+import time
+import queue
+import struct
+import logging
+import threading
+from typing import Optional, Dict, Iterator, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SCAP'
+VERSION = 1
+PORT_NAME = 2
+
+FILE_HEADER = struct.Struct('<4sHHdQ')
+RECORD_HEADER = struct.Struct('<QBHI')
+
+
+class CaptureRecord(NamedTuple):
+    """抓包记录"""
+    ts: float  # 墙上时间（秒），由文件头中的起始时刻换算
+    mono_ns: int  # 单调时钟（纳秒）
+    direction: int
+    port: str
+    data: bytes
+
+
+class CaptureWriter:
+    """后台线程写入的抓包文件
+
+    record 只把数据放入队列，磁盘写入在专用线程中以大块缓冲进行，
+    不会阻塞接收线程。队列中待写入的数据超过 max_pending 字节时丢弃新数据并计数。
+    """
+
+    def __init__(self, path: str, max_pending: int = 64 * 1024 * 1024,
+                 buffer_size: int = 1024 * 1024, flush_interval: float = 1.0):
+        self.path = path
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.written_bytes = 0
+        self.dropped_bytes = 0
+
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._ports: Dict[str, int] = {}
+        self._queue: 'queue.SimpleQueue[Optional[tuple]]' = queue.SimpleQueue()
+        self._file = open(path, 'wb', buffering=buffer_size)
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0, time.time(), time.monotonic_ns()))
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def port_id(self, port: str) -> int:
+        """获取串口编号，首次出现时写入一条串口名称记录"""
+        with self._lock:
+            pid = self._ports.get(port)
+            if pid is None:
+                pid = self._ports[port] = len(self._ports)
+                self._queue.put((time.monotonic_ns(), PORT_NAME, pid, str(port).encode('utf-8')))
+            return pid
+
+    def record(self, direction: int, data: bytes, port: str = '', mono_ns: Optional[int] = None):
+        """记录一个数据块（线程安全，不阻塞）"""
+        size = len(data)
+        if self._pending + size > self.max_pending:
+            self.dropped_bytes += size
+            return
+        pid = self.port_id(port)
+        with self._lock:
+            self._pending += size
+        self._queue.put((mono_ns or time.monotonic_ns(), direction, pid, bytes(data)))
+
+    def _write_loop(self):
+        """写入线程"""
+        write = self._file.write
+        pack = RECORD_HEADER.pack
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+            try:
+                if item:
+                    mono_ns, direction, pid, data = item
+                    write(pack(mono_ns, direction, pid, len(data)))
+                    write(data)
+                    self.records += 1
+                    self.written_bytes += len(data)
+                    with self._lock:
+                        self._pending -= len(data)
+
+                now = time.monotonic()
+                if now - last_flush >= self.flush_interval:
+                    self._file.flush()
+                    last_flush = now
+            except Exception as e:
+                logger.error(f"写入抓包文件出错: {e}")
+
+        self._file.flush()
+
+    def close(self):
+        """写完队列中剩余的数据后关闭文件"""
+        if self._file.closed:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+class CaptureReader:
+    """读取抓包文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise ValueError(f'{path}: 文件不完整')
+        magic, version, _, self.start_wall, self.start_mono_ns = FILE_HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: 不是scomm抓包文件')
+        if version > VERSION:
+            raise ValueError(f'{path}: 不支持的版本 {version}')
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        ports: Dict[int, str] = {}
+        size = RECORD_HEADER.size
+        with open(self.path, 'rb', buffering=1024 * 1024) as f:
+            f.seek(FILE_HEADER.size)
+            while True:
+                header = f.read(size)
+                if len(header) < size:
+                    break
+                mono_ns, direction, pid, length = RECORD_HEADER.unpack(header)
+                data = f.read(length)
+                if len(data) < length:
+                    break  # 最后一条记录不完整
+                if direction == PORT_NAME:
+                    ports[pid] = data.decode('utf-8', 'replace')
+                    continue
+                ts = self.start_wall + (mono_ns - self.start_mono_ns) / 1e9
+                yield CaptureRecord(ts, mono_ns, direction, ports.get(pid, str(pid)), data)
+
@@ -0,0 +1,127 @@
+"""
+用户配置（usercfg.json）的保存
+
+内存中的字典是配置的唯一来源，修改后只标记为待保存，由后台线程在 delay 秒后把这段时间内的
+所有修改一次写入文件。写入先写临时文件并同步到磁盘，再改名替换原文件，中途崩溃或断电时
+原文件保持完整。调用方（打开串口、保存预置数据）不会等待磁盘：
+
+    store = ConfigStore.load('usercfg.json')
+    store.set('baud', '115200')  # 立即返回
+    store.close()  # 退出前写入尚未保存的修改
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigStore:
+    """延迟合并、后台原子写入的配置文件
+
+    data 中的值应整体替换（通过 set），不要原地修改嵌套的字典或列表，
+    否则后台线程序列化时可能读到修改到一半的内容。
+    """
+
+    def __init__(self, path: str, data: Optional[Dict[str, Any]] = None, delay: float = 0.5):
+        self.path = path
+        self.data: Dict[str, Any] = data if data is not None else {}
+        self.delay = delay
+        self.writes = 0  # 实际写入文件的次数
+        self._version = 0  # 每次修改加1
+        self._saved = 0  # 已写入文件的版本
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # 保证同一时刻只有一个线程写文件
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def load(cls, path: str, delay: float = 0.5) -> 'ConfigStore':
+        """读取配置文件，文件不存在时为空配置"""
+        data = {}
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        return cls(path, data, delay)
+
+    @property
+    def dirty(self) -> bool:
+        """是否有尚未写入文件的修改"""
+        return self._version != self._saved
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def set(self, key: str, value: Any) -> bool:
+        """修改一项配置，值不变时返回False；文件在后台稍后写入"""
+        with self._lock:
+            if key in self.data and self.data[key] == value:
+                return False
+            self.data[key] = value
+            self._version += 1
+        self._schedule()
+        return True
+
+    def _schedule(self):
+        """通知后台线程有待保存的修改，线程在第一次修改时启动"""
+        if self._stop.is_set():
+            self.flush()
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='config-writer', daemon=True)
+                self._thread.start()
+        self._changed.set()
+
+    def _run(self):
+        """后台写入：收到修改通知后再等 delay 秒，把这段时间内的修改合并为一次写入"""
+        while not self._stop.is_set():
+            self._changed.wait()
+            self._stop.wait(self.delay)
+            self._changed.clear()
+            self.flush()
+
+    def flush(self) -> bool:
+        """立即写入尚未保存的修改，成功或无需写入时返回True"""
+        with self._write_lock:
+            with self._lock:
+                version = self._version
+                if version == self._saved:
+                    return True
+                text = json.dumps(self.data, indent=4, ensure_ascii=False)
+            try:
+                self._write(text)
+            except OSError as e:
+                logger.error(f"保存配置文件 {self.path} 出错: {e}")
+                return False
+            self._saved = version
+            self.writes += 1
+            return True
+
+    def _write(self, text: str):
+        """写临时文件并同步到磁盘，再改名替换原文件"""
+        tmp = f'{self.path}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def close(self):
+        """停止后台线程并写入尚未保存的修改"""
+        self._stop.set()
+        self._changed.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self.flush()
@@ -0,0 +1,199 @@
+"""
+声明式的帧结构解码
+
+在 usercfg.json 中描述帧内各字段的偏移、类型、字节序和比例系数，不需要手写解析脚本：
+
+    "btn-unpack03": {
+        "title": "传感器",
+        "layout": {
+            "byteorder": "little",
+            "size": 12,
+            "fields": [
+                {"name": "id", "offset": 0, "type": "u8"},
+                {"name": "temp", "offset": 2, "type": "i16", "scale": 0.1},
+                {"name": "pressure", "offset": 4, "type": "f32"},
+                {"name": "counter", "offset": 8, "type": "u32", "byteorder": "big"}
+            ]
+        }
+    }
+
+单帧解码编译为一个 struct.Struct；同一结构的一批帧可以一次性解码为 NumPy 结构化数组，
+未安装 NumPy 时退回 struct.iter_unpack。
+"""
+
+import json
+import struct
+from typing import Optional, Dict, Any, List, NamedTuple, Sequence, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # NumPy 是可选依赖
+    numpy = None
+
+# 字段类型 -> (struct格式字符, NumPy类型, 字节数)
+TYPES: Dict[str, Tuple[str, str, int]] = {
+    'u8': ('B', 'u1', 1), 'i8': ('b', 'i1', 1),
+    'u16': ('H', 'u2', 2), 'i16': ('h', 'i2', 2),
+    'u32': ('I', 'u4', 4), 'i32': ('i', 'i4', 4),
+    'u64': ('Q', 'u8', 8), 'i64': ('q', 'i8', 8),
+    'f32': ('f', 'f4', 4), 'f64': ('d', 'f8', 8),
+}
+
+_ORDER = {'little': '<', 'big': '>'}
+
+
+class Field(NamedTuple):
+    """帧中的一个字段"""
+    name: str
+    offset: int
+    type: str
+    byteorder: str = 'little'
+    scale: Optional[float] = None
+
+    @property
+    def size(self) -> int:
+        return TYPES[self.type][2]
+
+
+class FrameLayout:
+    """编译好的帧结构"""
+
+    def __init__(self, fields: Sequence[Field], size: Optional[int] = None):
+        if not fields:
+            raise ValueError('帧结构至少需要一个字段')
+        names = [field.name for field in fields]
+        if len(set(names)) != len(names):
+            raise ValueError('字段名重复')
+        for field in fields:
+            if field.type not in TYPES:
+                raise ValueError(f'不支持的字段类型: {field.type}')
+            if field.byteorder not in _ORDER:
+                raise ValueError(f'不支持的字节序: {field.byteorder}')
+
+        self.fields = sorted(fields, key=lambda field: field.offset)
+        end = max(field.offset + field.size for field in self.fields)
+        self.size = int(size) if size else end
+        if self.size < end:
+            raise ValueError(f'帧长 {self.size} 小于字段结束位置 {end}')
+
+        self.names = [field.name for field in self.fields]
+        self.scales = [field.scale for field in self.fields]
+        self._scaled = [(i, scale) for i, scale in enumerate(self.scales) if scale is not None]
+        # 解析脚本输出的格式串：整数字段 %d，浮点或带比例系数的字段 %g
+        self._note_format = ''.join(
+            f' {field.name}=%g' if field.scale is not None or field.type[0] == 'f' else f' {field.name}=%d'
+            for field in self.fields)
+        self.struct = self._compile_struct()
+        self._singles = [struct.Struct(_ORDER[field.byteorder] + TYPES[field.type][0]) for field in self.fields]
+        self._dtype = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'FrameLayout':
+        """从usercfg中的 layout 字段创建"""
+        byteorder = config.get('byteorder', 'little')
+        fields = [Field(str(item['name']), int(item.get('offset', 0)), item.get('type', 'u8'),
+                        item.get('byteorder', byteorder),
+                        float(item['scale']) if item.get('scale') is not None else None)
+                  for item in config.get('fields', ())]
+        return cls(fields, config.get('size'))
+
+    def _compile_struct(self) -> Optional[struct.Struct]:
+        """编译为单个 struct.Struct，字段之间的空隙用填充字节跳过
+
+        字段有重叠或字节序不一致时无法用一个格式串表示，返回None，由 unpack 逐个字段解码。
+        """
+        orders = {field.byteorder for field in self.fields}
+        overlapping = any(a.offset + a.size > b.offset for a, b in zip(self.fields, self.fields[1:]))
+        if len(orders) != 1 or overlapping:
+            return None
+
+        fmt = _ORDER[self.fields[0].byteorder]
+        pos = 0
+        for field in self.fields:
+            if field.offset > pos:
+                fmt += f'{field.offset - pos}x'
+            fmt += TYPES[field.type][0]
+            pos = field.offset + field.size
+        if self.size > pos:
+            fmt += f'{self.size - pos}x'
+        return struct.Struct(fmt)
+
+    def unpack(self, data) -> Tuple:
+        """解码一帧，返回按偏移排序的字段原始值（未乘比例系数），帧长不足时抛出 struct.error"""
+        if self.struct is not None:
+            return self.struct.unpack_from(data)
+        return tuple(single.unpack_from(data, field.offset)[0]
+                     for single, field in zip(self._singles, self.fields))
+
+    def values(self, data) -> Tuple:
+        """解码一帧，返回按偏移排序的字段值，已乘比例系数"""
+        values = self.unpack(data)
+        if not self._scaled:
+            return values
+        values = list(values)
+        for index, scale in self._scaled:
+            values[index] *= scale
+        return tuple(values)
+
+    def decode(self, data) -> Dict[str, Union[int, float]]:
+        """解码一帧，返回 {字段名: 值}，已乘比例系数"""
+        return dict(zip(self.names, self.values(data)))
+
+    def note(self, data) -> str:
+        """解码一帧并格式化为解析脚本输出的形式：' name=value ...'"""
+        return self._note_format % self.values(data)
+
+    @property
+    def dtype(self):
+        """对应的 NumPy 结构化类型（需要NumPy）"""
+        if numpy is None:
+            raise RuntimeError('未安装NumPy')
+        if self._dtype is None:
+            self._dtype = numpy.dtype({
+                'names': self.names,
+                'formats': [_ORDER[f.byteorder] + TYPES[f.type][1] for f in self.fields],
+                'offsets': [f.offset for f in self.fields],
+                'itemsize': self.size,
+            })
+        return self._dtype
+
+    def decode_batch(self, frames: Sequence[bytes]) -> Dict[str, Any]:
+        """一次解码一批帧，返回 {字段名: 各帧的值}
+
+        长度与帧结构不符的帧被跳过。安装了NumPy时每列为已乘比例系数的 numpy 数组，
+        整批只做一次向量化转换；否则每列为列表。
+        """
+        size = self.size
+        frames = [frame for frame in frames if len(frame) == size]
+        buffer = b''.join(frames)
+
+        if numpy is not None:
+            records = numpy.frombuffer(buffer, dtype=self.dtype)
+            return {name: records[name] if scale is None else records[name] * scale
+                    for name, scale in zip(self.names, self.scales)}
+
+        if self.struct is not None:
+            rows = list(self.struct.iter_unpack(buffer))
+        else:
+            rows = [self.unpack(frame) for frame in frames]
+        columns = list(zip(*rows)) if rows else [()] * len(self.names)
+        return {name: list(column) if scale is None else [value * scale for value in column]
+                for name, column, scale in zip(self.names, columns, self.scales)}
+
+    def notes(self, frames: Sequence[bytes]) -> List[Optional[str]]:
+        """一批帧的 note 输出，整批用 decode_batch 解码
+
+        长度与帧结构不符的帧对应None，由调用方逐帧调用 note（较长的帧只解码前 size 字节）。
+        """
+        columns = [column.tolist() if numpy is not None else column
+                   for column in self.decode_batch(frames).values()]
+        rows = zip(*columns)
+        size = self.size
+        fmt = self._note_format
+        return [fmt % next(rows) if len(frame) == size else None for frame in frames]
+
+
+def parse_layout(source: Union[str, Dict[str, Any]]) -> FrameLayout:
+    """从JSON文本或字典创建帧结构"""
+    config = json.loads(source) if isinstance(source, str) else source
+    return FrameLayout.from_config(config)
@@ -0,0 +1,431 @@
+import os
+import time
+import queue
+import selectors
+import logging
+import threading
+from typing import Optional, Dict, Any, List, NamedTuple, Union
+
+import serial
+
+from .hexfmt import hex_preview
+from .settings import Settings
+from .receiver import FrameReceiver
+from .capture import CaptureWriter
+from .events import EventSource
+from .schedule import Scheduler
+from .store import SEND
+
+logger = logging.getLogger(__name__)
+
+
+class Packet(NamedTuple):
+    """待发送的数据包"""
+    data: bytes
+    rts: Optional[bool] = None
+    dtr: Optional[bool] = None
+
+
+# 放入发送队列用于唤醒发送线程重新计算等待时间，不发送任何数据
+_WAKE = Packet(b'')
+
+# 合并写入的最大字节数
+_COALESCE_LIMIT = 4096
+
+
+class SerialEngine(EventSource):
+    """串口通信引擎
+
+    负责串口的打开关闭、接收分帧、发送队列和收发统计，不依赖任何界面。
+    界面或其他使用者通过 subscribe 订阅事件：
+
+    - 'recv'  (data: bytes)   收到一帧数据
+    - 'send'  (data: bytes)   已发送的数据
+    - 'log'   (message: str)  状态消息
+    - 'open'  ()              串口已打开
+    - 'close' ()              串口已关闭
+    - 'rx'    (data: bytes)   从串口读到的原始数据块（分帧前），没有订阅者时不产生开销
+
+    回调在引擎的工作线程中执行，订阅者需自行保证线程安全。
+    """
+
+    EVENTS = ('recv', 'send', 'log', 'open', 'close', 'rx')
+
+    def __init__(self, com: Optional[serial.Serial] = None):
+        super().__init__()
+        self.com = com if com is not None else serial.Serial()
+        self.threads: List[threading.Thread] = []
+        self.running = threading.Event()
+
+        # 收发设置快照，修改时整体替换（见 configure）
+        self.settings = Settings()
+        # 接收方式：'select' 阻塞等待串口描述符可读，按分帧间隔精确超时；
+        # 'poll' 每10ms轮询一次；'auto' 在支持的平台上使用 select
+        self.receive_mode = 'auto'
+        self._wakeup: Optional[tuple] = None  # 用于唤醒接收线程的管道
+        # 协议分帧配置（见 framing.create_framer），None 表示按时间间隔分帧
+        self.framing: Optional[Dict[str, Any]] = None
+
+        # 发送队列与周期发送（循环发送是名为 'cycle' 的周期任务）
+        self._send_queue: 'queue.Queue[Optional[Packet]]' = queue.Queue()
+        self.scheduler = Scheduler()
+        self._gap_until = 0.0  # 设置了发送帧间隔时，下一次可以开始发送的时刻
+        # send 放入的数据包数与发送线程已处理的数据包数，用于 flush 等待队列排空
+        self._queued = 0
+        self._written = 0
+        self._drained = threading.Condition()
+
+        self._receiver: Optional[FrameReceiver] = None  # 当前接收线程的接收缓冲与分帧器
+
+        # 原始数据抓包（见 start_capture）
+        self.capture: Optional[CaptureWriter] = None
+
+        # 统计信息
+        self.send_count = 0
+        self.recv_count = 0
+
+    @property
+    def port(self) -> Optional[str]:
+        return self.com.port
+
+    @property
+    def is_open(self) -> bool:
+        return self.com.is_open
+
+    @property
+    def send_backlog(self) -> int:
+        """发送队列中等待发送的数据包数"""
+        return self._send_queue.qsize()
+
+    @property
+    def framing_dropped(self) -> int:
+        """分帧器因超长或格式错误丢弃的字节数"""
+        return self._receiver.dropped if self._receiver is not None else 0
+
+    def configure(self, **changes):
+        """修改部分设置，生成新的设置快照"""
+        self.settings = self.settings._replace(**changes)
+
+    def open(self, port: str, baudrate: int, **kwargs) -> bool:
+        """打开串口并启动收发线程
+
+        kwargs 中的 framing 为协议分帧配置，不提供时沿用之前的设置。
+        """
+        if 'framing' in kwargs:
+            self.framing = kwargs['framing']
+
+        try:
+            self.com.port = port
+            self.com.baudrate = baudrate
+            self.com.bytesize = kwargs.get('bytesize', 8)
+            self.com.parity = kwargs.get('parity', 'N')
+            self.com.stopbits = kwargs.get('stopbits', 1)
+            self.com.timeout = 0.1  # 设置超时避免阻塞
+            self.com.write_timeout = kwargs.get('write_timeout', 1)
+
+            self.com.open()
+        except Exception as e:
+            logger.error(f"打开串口失败: {e}")
+            self.com.close()
+            self.emit('close')
+            self.log(f'{self.com.port}: 打开失败 - {e}')
+            return False
+
+        self._start()
+        self.emit('open')
+        self.log(f'{self.com.port}: 打开成功')
+        return True
+
+    def close(self):
+        """停止收发线程并关闭串口"""
+        self._stop()
+        if self.com.is_open:
+            try:
+                self.com.close()
+            except Exception as e:
+                logger.error(f"关闭串口时出错: {e}")
+        self.emit('close')
+        self.log(f'{self.com.port}: 已关闭')
+
+    def send(self, data: bytes, rts: Optional[bool] = None, dtr: Optional[bool] = None):
+        """将数据放入发送队列，按放入的顺序全部发送，RTS/DTR在该包的数据之前设置"""
+        if not self.com.is_open:
+            self.log('串口未打开')
+            return
+        with self._drained:
+            self._queued += 1
+        self._send_queue.put(Packet(data, rts, dtr))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待此前 send 放入队列的数据全部写入串口并发送完成
+
+        超时或串口在等待期间关闭时返回False。在 close 之前调用，避免丢弃队列中尚未发送的数据。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._drained:
+            target = self._queued
+            while self._written < target:
+                if not self.running.is_set():
+                    return False
+                wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+                self._drained.wait(wait)
+        try:
+            self.com.flush()  # 等待驱动缓冲区中的数据发出
+        except Exception as e:
+            logger.error(f"等待发送完成时出错: {e}")
+        return True
+
+    def set_cycle(self, packet: Optional[Packet], interval: float = 1.0):
+        """设置循环发送的数据包，packet为None时停止循环发送"""
+        if packet is None:
+            self.remove_schedule('cycle')
+        else:
+            self.add_schedule('cycle', packet, interval, phase=interval)
+
+    def add_schedule(self, name: str, packet: Packet, period: float, phase: float = 0.0):
+        """添加周期发送任务，按绝对时刻每 period 秒发送一次，首次在 phase 秒之后"""
+        self.scheduler.add(name, packet, period, phase)
+        self._send_queue.put(_WAKE)  # 发送线程按新的任务重新计算等待时间
+
+    def remove_schedule(self, name: str):
+        """删除周期发送任务"""
+        self.scheduler.remove(name)
+
+    def _use_select(self) -> bool:
+        """是否使用描述符事件驱动的接收方式"""
+        if self.receive_mode == 'poll':
+            return False
+        if os.name != 'posix' or not hasattr(os, 'readv'):
+            return False
+        try:
+            self.com.fileno()
+        except Exception:
+            return False
+        return True
+
+    def start_capture(self, target: Union[str, CaptureWriter]) -> CaptureWriter:
+        """开始把收发的原始数据块写入抓包文件，target为文件路径或共享的CaptureWriter"""
+        self.stop_capture()
+        writer = target if isinstance(target, CaptureWriter) else CaptureWriter(target)
+        self.capture = writer
+        self.log(f'开始录制: {writer.path}')
+        return writer
+
+    def stop_capture(self):
+        """停止抓包并关闭文件"""
+        writer, self.capture = self.capture, None
+        if writer is not None:
+            writer.close()
+            self.log(f'录制结束: {writer.path}，{writer.records} 条记录')
+
+    def _start(self):
+        """启动通信线程"""
+        self.running.set()
+        self._send_queue = queue.Queue()
+        with self._drained:
+            self._queued = self._written = 0
+        self.scheduler.restart()
+        if self._use_select():
+            self._wakeup = os.pipe()
+
+        for target in (self._receive_loop, self._send_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _stop(self):
+        """停止通信线程"""
+        self.running.clear()
+        self._send_queue.put(None)  # 唤醒发送线程
+        if self._wakeup is not None:
+            os.write(self._wakeup[1], b'\0')  # 唤醒接收线程
+
+        for thread in self.threads:
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+        self.threads.clear()
+
+        if self._wakeup is not None:
+            for fd in self._wakeup:
+                os.close(fd)
+            self._wakeup = None
+
+    def _flush_frame(self, buffer: bytes):
+        """输出一帧接收数据"""
+        self.emit('recv', buffer)
+        self.log(f'{self.com.port}: 接收 {len(buffer)} 字节: {hex_preview(buffer)}')
+
+    def _receive_loop(self):
+        """接收数据循环"""
+        self._receiver = FrameReceiver(self, self.framing)
+        if self._wakeup is not None:
+            self._receive_loop_select()
+        else:
+            self._receive_loop_poll()
+
+    def _receive_loop_select(self):
+        """事件驱动的接收循环
+
+        空闲时阻塞在串口描述符上，不占用CPU；收到数据后以距离最后一个字节
+        满分帧间隔的时刻作为超时，到点立即分帧。配置了协议分帧时由分帧器切分。
+        """
+        receiver = self._receiver
+        fd = self.com.fileno()
+        readinto = lambda view: os.readv(fd, [view])
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            selector.register(self._wakeup[0], selectors.EVENT_READ)
+
+            while self.running.is_set():
+                try:
+                    if len(receiver):
+                        timeout = receiver.deadline - time.monotonic()
+                        if timeout <= 0:
+                            receiver.expire()
+                            continue
+                    else:
+                        timeout = None
+
+                    events = selector.select(timeout)
+                    if not self.running.is_set():
+                        break
+
+                    if any(key.fd == fd for key, mask in events):
+                        if not receiver.read(readinto):
+                            raise serial.SerialException('串口已断开或无数据可读')
+
+                except Exception as e:
+                    logger.error(f"接收数据错误: {e}")
+                    # 出错时等待100ms，但可以响应停止事件
+                    self.running.wait(0.1)
+
+            # 关闭前输出尚未分帧的数据
+            receiver.expire()
+
+    def _receive_loop_poll(self):
+        """轮询方式的接收循环（不支持描述符等待的平台）"""
+        receiver = self._receiver
+
+        while self.running.is_set():
+            try:
+                if self.com.is_open:
+                    # 使用带超时的读取，避免阻塞；数据直接读入预分配的缓冲区
+                    receiver.read(self.com.readinto, self.com.in_waiting or 1)
+
+                    # 如果缓冲区有数据且超过分帧间隔
+                    if len(receiver) and time.monotonic() >= receiver.deadline:
+                        receiver.expire()
+
+                # 使用 Event.wait 代替 sleep，可以及时响应停止事件
+                self.running.wait(0.01)  # 等待10ms或直到running被清除
+
+            except Exception as e:
+                logger.error(f"接收数据错误: {e}")
+                # 出错时等待100ms，但可以响应停止事件
+                self.running.wait(0.1)
+
+    def _send_loop(self):
+        """发送数据循环
+
+        到期的周期任务优先于队列中的数据发送，队列持续有数据时周期任务也能按时触发。
+        队列中相邻、中间没有RTS/DTR动作的数据包合并为一次写入（设置了发送帧间隔时不合并）。
+        """
+        scheduler = self.scheduler
+        get_nowait = self._send_queue.get_nowait
+        pending: Optional[Packet] = None  # 合并时取出、但不能并入本次写入的数据包
+        while self.running.is_set():
+            try:
+                for job in scheduler.due():
+                    self._write_packets([job.packet])
+
+                if pending is not None:
+                    packet, pending = pending, None
+                else:
+                    deadline = scheduler.next_deadline()
+                    if deadline is None:
+                        timeout = 0.1
+                    else:
+                        timeout = max(0.0, deadline - scheduler.spin - time.monotonic())
+                    try:
+                        packet = self._send_queue.get(timeout=timeout)
+                    except queue.Empty:
+                        if deadline is not None and scheduler.spin:
+                            scheduler.spin_until(deadline)
+                        continue
+
+                if packet is None or packet is _WAKE or not self.running.is_set():
+                    continue
+
+                packets = [packet]
+                if self.settings.tx_gap <= 0 and packet.rts is None and packet.dtr is None:
+                    size = len(packet.data)
+                    while size < _COALESCE_LIMIT:
+                        try:
+                            packet = get_nowait()
+                        except queue.Empty:
+                            break
+                        if packet is _WAKE:
+                            continue
+                        if packet is None or packet.rts is not None or packet.dtr is not None:
+                            pending = packet
+                            break
+                        packets.append(packet)
+                        size += len(packet.data)
+                self._write_packets(packets)
+                with self._drained:
+                    self._written += len(packets)
+                    self._drained.notify_all()
+
+            except Exception as e:
+                logger.error(f"发送循环错误: {e}")
+                self.running.wait(0.1)  # 出错时等待，但可以响应停止事件
+
+    def _write_packets(self, packets: List[Packet]):
+        """实际发送数据，多个数据包合并为一次写入（带RTS/DTR动作的包单独写入）
+
+        'send' 事件和抓包记录仍按数据包逐个产生。
+        """
+        try:
+            first = packets[0]
+            gap = self.settings.tx_gap
+            if gap > 0:
+                # 与上一次发送完成的时刻保持帧间隔
+                delay = self._gap_until - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            # 设置RTS/DTR
+            if first.rts is not None:
+                self.com.rts = first.rts
+                self.log(f'{self.com.port}: RTS = {first.rts}')
+
+            if first.dtr is not None:
+                self.com.dtr = first.dtr
+                self.log(f'{self.com.port}: DTR = {first.dtr}')
+
+            # 发送数据
+            data = first.data if len(packets) == 1 else b''.join(packet.data for packet in packets)
+            if data:
+                self.com.write(data)
+                # 写入后立即通知，'send' 事件的时刻尽量接近实际发出的时刻（往返时间统计以此为起点）
+                capture = self.capture
+                for packet in packets:
+                    if packet.data:
+                        if capture is not None:
+                            capture.record(SEND, packet.data, self.com.port)
+                        self.emit('send', packet.data)
+                if gap > 0:
+                    self.com.flush()  # 等待数据实际发出后再开始计算帧间隔
+                    self._gap_until = time.monotonic() + gap
+                self.send_count += len(data)
+                if len(packets) == 1:
+                    self.log(f'{self.com.port}: 发送 {len(data)} 字节')
+                else:
+                    self.log(f'{self.com.port}: 发送 {len(data)} 字节（{len(packets)} 包合并写入）')
+
+        except Exception as e:
+            logger.error(f"发送数据错误: {e}")
+            self.log(f'发送失败: {e}')
@@ -0,0 +1,41 @@
+import logging
+from typing import Dict, List, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EventSource:
+    """事件订阅与通知
+
+    子类在 EVENTS 中声明支持的事件名，回调在触发事件的线程中执行。
+    """
+
+    EVENTS: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self._listeners: Dict[str, List[Callable]] = {e: [] for e in self.EVENTS}
+
+    def subscribe(self, event: str, callback: Callable):
+        """订阅事件"""
+        if event not in self._listeners:
+            raise ValueError(f"未知事件: {event}")
+        self._listeners[event].append(callback)
+
+    def unsubscribe(self, event: str, callback: Callable):
+        """取消订阅"""
+        try:
+            self._listeners[event].remove(callback)
+        except (KeyError, ValueError):
+            pass
+
+    def emit(self, event: str, *args):
+        """通知所有订阅者"""
+        for callback in self._listeners[event]:
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"处理事件 {event} 时出错: {e}")
+
+    def log(self, message: str):
+        """发送状态消息"""
+        self.emit('log', message)
@@ -0,0 +1,358 @@
+"""
+增量分帧器
+
+串口驱动按任意大小返回数据，分帧器把连续的字节流切分成完整的协议帧。
+每个分帧器只处理新到达的字节，已扫描过的数据不会重复扫描，整体为O(n)。
+
+usercfg.json 中通过 framing 字段配置，可以对所有串口生效：
+
+    "framing": {"type": "delimiter", "delimiter": "0D 0A"}
+
+也可以按串口分别配置，"*" 为默认：
+
+    "framing": {"/dev/ttyUSB0": {"type": "slip"}, "*": {"type": "gap"}}
+"""
+
+import re
+import logging
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+class Framer:
+    """分帧器基类"""
+
+    def __init__(self, max_frame_size: int = 65536):
+        self.max_frame_size = max_frame_size
+        self.dropped = 0  # 因超长或格式错误丢弃的字节数
+        self._buffer = bytearray()
+
+    @property
+    def pending(self) -> int:
+        """尚未组成完整帧的字节数"""
+        return len(self._buffer)
+
+    def feed(self, data) -> List[bytes]:
+        """输入新收到的数据，返回其中完整的帧"""
+        self._buffer += data
+        frames = self._extract()
+        if len(self._buffer) > self.max_frame_size:
+            # 超过最大帧长仍未组成一帧，丢弃以便重新同步
+            logger.warning(f"{type(self).__name__}: 丢弃 {len(self._buffer)} 字节未完成的数据")
+            self.dropped += len(self._buffer)
+            self._discard(len(self._buffer))
+        return frames
+
+    def reset(self):
+        """清空未完成的数据"""
+        self._discard(len(self._buffer))
+
+    def _discard(self, count: int):
+        """丢弃缓冲区开头的count字节（bytearray头部删除为O(1)）"""
+        del self._buffer[:count]
+
+    def _extract(self) -> List[bytes]:
+        raise NotImplementedError
+
+
+class DelimiterFramer(Framer):
+    """按分隔符分帧，如 \\r\\n 或 0x7E"""
+
+    def __init__(self, delimiter: bytes = b'\r\n', include: bool = True, max_frame_size: int = 65536):
+        super().__init__(max_frame_size)
+        if not delimiter:
+            raise ValueError('分隔符不能为空')
+        self.delimiter = bytes(delimiter)
+        self.include = include
+        self._scanned = 0  # 已确认不含分隔符的前缀长度
+
+    def _extract(self) -> List[bytes]:
+        frames = []
+        buffer = self._buffer
+        size = len(self.delimiter)
+        start = 0
+        pos = buffer.find(self.delimiter, self._scanned)
+        while pos >= 0:
+            end = pos + size
+            frame = bytes(buffer[start:end] if self.include else buffer[start:pos])
+            if frame:
+                frames.append(frame)
+            start = end
+            pos = buffer.find(self.delimiter, start)
+
+        if start:
+            del buffer[:start]
+        # 分隔符可能跨两次输入，保留末尾 size-1 字节下次重新检查
+        self._scanned = max(0, len(buffer) - size + 1)
+        return frames
+
+    def _discard(self, count: int):
+        super()._discard(count)
+        self._scanned = max(0, self._scanned - count)
+
+
+class FixedLengthFramer(Framer):
+    """固定长度分帧"""
+
+    def __init__(self, length: int, max_frame_size: int = 65536):
+        super().__init__(max(max_frame_size, length))
+        if length <= 0:
+            raise ValueError('帧长必须大于0')
+        self.length = length
+
+    def _extract(self) -> List[bytes]:
+        buffer = self._buffer
+        length = self.length
+        count = len(buffer) // length
+        frames = [bytes(buffer[i * length:(i + 1) * length]) for i in range(count)]
+        if count:
+            del buffer[:count * length]
+        return frames
+
+
+class LengthFieldFramer(Framer):
+    """按帧头中的长度字段分帧
+
+    offset -- 长度字段在帧中的偏移
+    width -- 长度字段的字节数
+    byteorder -- 'big' 或 'little'
+    adjust -- 长度修正：帧总长 = offset + width + 长度字段值 + adjust
+    """
+
+    def __init__(self, offset: int = 0, width: int = 1, byteorder: str = 'big', adjust: int = 0,
+                 max_frame_size: int = 65536):
+        super().__init__(max_frame_size)
+        if byteorder not in ('big', 'little'):
+            raise ValueError(f'不支持的字节序: {byteorder}')
+        self.offset = offset
+        self.width = width
+        self.byteorder = byteorder
+        self.adjust = adjust
+
+    def _extract(self) -> List[bytes]:
+        frames = []
+        buffer = self._buffer
+        header = self.offset + self.width
+        start = 0
+        while len(buffer) - start >= header:
+            field = buffer[start + self.offset:start + header]
+            total = header + int.from_bytes(field, self.byteorder) + self.adjust
+            if total <= 0 or total > self.max_frame_size:
+                # 长度字段不合理，丢弃一个字节重新同步
+                self.dropped += 1
+                start += 1
+                continue
+            if len(buffer) - start < total:
+                break
+            frames.append(bytes(buffer[start:start + total]))
+            start += total
+
+        if start:
+            del buffer[:start]
+        return frames
+
+
+class SlipFramer(Framer):
+    """SLIP（RFC 1055）分帧，输出已去除转义的帧内容"""
+
+    END = 0xC0
+    ESC = 0xDB
+    ESC_END = 0xDC
+    ESC_ESC = 0xDD
+
+    def _extract(self) -> List[bytes]:
+        frames = []
+        buffer = self._buffer
+        start = 0
+        pos = buffer.find(self.END)
+        while pos >= 0:
+            if pos > start:
+                frames.append(self.decode(buffer[start:pos]))
+            start = pos + 1
+            pos = buffer.find(self.END, start)
+
+        if start:
+            del buffer[:start]
+        return frames
+
+    @classmethod
+    def decode(cls, data) -> bytes:
+        """还原转义字符"""
+        data = bytes(data)
+        if cls.ESC not in data:
+            return data
+        return data.replace(b'\xdb\xdc', b'\xc0').replace(b'\xdb\xdd', b'\xdb')
+
+    @classmethod
+    def encode(cls, data: bytes) -> bytes:
+        """转义并加上帧结束符"""
+        return bytes(data).replace(b'\xdb', b'\xdb\xdd').replace(b'\xc0', b'\xdb\xdc') + b'\xc0'
+
+
+class CobsFramer(Framer):
+    """COBS分帧，以0x00为帧结束符，输出解码后的帧内容"""
+
+    def _extract(self) -> List[bytes]:
+        frames = []
+        buffer = self._buffer
+        start = 0
+        pos = buffer.find(0)
+        while pos >= 0:
+            if pos > start:
+                try:
+                    frames.append(self.decode(buffer[start:pos]))
+                except ValueError as e:
+                    logger.warning(f"COBS解码失败: {e}")
+                    self.dropped += pos - start
+            start = pos + 1
+            pos = buffer.find(0, start)
+
+        if start:
+            del buffer[:start]
+        return frames
+
+    @staticmethod
+    def decode(data) -> bytes:
+        """COBS解码（不含结尾的0x00）"""
+        data = memoryview(data)
+        out = bytearray()
+        index = 0
+        size = len(data)
+        while index < size:
+            code = data[index]
+            end = index + code
+            if code == 0 or end > size:
+                raise ValueError('编码长度越界')
+            out += data[index + 1:end]
+            index = end
+            if code < 0xFF and index < size:
+                out.append(0)
+        return bytes(out)
+
+    @staticmethod
+    def encode(data: bytes) -> bytes:
+        """COBS编码并加上帧结束符"""
+        out = bytearray()
+        for block in bytes(data).split(b'\x00'):
+            while len(block) >= 0xFE:
+                out.append(0xFF)
+                out += block[:0xFE]
+                block = block[0xFE:]
+            out.append(len(block) + 1)
+            out += block
+        out.append(0)
+        return bytes(out)
+
+
+class RegexFramer(Framer):
+    """按正则表达式匹配帧结束标记分帧
+
+    pattern 描述的是帧的结束标记（例如 rb'\\r?\\n' 或 rb'\\x03.'），不能匹配空串。
+    每次输入新数据后，只从上次未匹配部分的最后 lookback 字节开始搜索（结束标记可能跨两次输入）。
+    lookback 默认按正则能匹配的最大长度确定；长度不定或包含前瞻断言时为64，此时应显式给出不小于
+    结束标记最大长度的值。
+    """
+
+    def __init__(self, pattern, include: bool = True, lookback: Optional[int] = None,
+                 max_frame_size: int = 65536):
+        super().__init__(max_frame_size)
+        if isinstance(pattern, str):
+            pattern = pattern.encode('latin-1')
+        self.pattern = re.compile(pattern, re.DOTALL)
+        if self.pattern.fullmatch(b'') is not None:
+            raise ValueError('分帧正则不能匹配空串')
+        self.include = include
+        self.lookback = lookback if lookback is not None else _max_width(self.pattern, 64)
+        self._scanned = 0  # 下一次搜索的起点，之前的数据已确认不含结束标记
+
+    def _extract(self) -> List[bytes]:
+        frames = []
+        buffer = self._buffer
+        search = self.pattern.search
+        start = 0
+        match = search(buffer, self._scanned)
+        while match is not None:
+            if match.end() == match.start():
+                # 只在特定上下文中才匹配空串（如单独的断言），不作为帧边界
+                match = search(buffer, match.end() + 1)
+                continue
+            end = match.end() if self.include else match.start()
+            frame = bytes(buffer[start:end])
+            if frame:
+                frames.append(frame)
+            start = match.end()
+            match = search(buffer, start)
+
+        if start:
+            del buffer[:start]
+        self._scanned = max(0, len(buffer) - self.lookback)
+        return frames
+
+    def _discard(self, count: int):
+        super()._discard(count)
+        self._scanned = max(0, self._scanned - count)
+
+
+def _max_width(pattern, default: int) -> int:
+    """正则能匹配的最大字节数，长度不定、包含前瞻断言或无法分析时返回 default"""
+    if b'(?=' in pattern.pattern or b'(?!' in pattern.pattern:
+        return default
+    try:
+        try:
+            from re import _parser as sre_parse  # Python 3.11+
+        except ImportError:
+            import sre_parse
+        low, high = sre_parse.parse(pattern.pattern, pattern.flags).getwidth()
+    except Exception:
+        return default
+    return high if high < 65536 else default
+
+
+def _parse_bytes(value) -> bytes:
+    """配置中的字节串：'0D 0A' 按HEX解析，其他字符串按原样编码"""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, int):
+        return bytes([value])
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        return value.encode('latin-1')
+
+
+def create_framer(spec: Optional[Dict[str, Any]], max_frame_size: int = 65536) -> Optional[Framer]:
+    """根据配置创建分帧器，返回None表示按时间间隔分帧"""
+    if not spec:
+        return None
+
+    kind = spec.get('type', 'gap')
+    limit = int(spec.get('max', max_frame_size))
+    if kind == 'gap':
+        return None
+    if kind == 'delimiter':
+        return DelimiterFramer(_parse_bytes(spec.get('delimiter', '0D 0A')),
+                               bool(spec.get('include', True)), limit)
+    if kind == 'fixed':
+        return FixedLengthFramer(int(spec['length']), limit)
+    if kind == 'length':
+        return LengthFieldFramer(int(spec.get('offset', 0)), int(spec.get('width', 1)),
+                                 spec.get('byteorder', 'big'), int(spec.get('adjust', 0)), limit)
+    if kind == 'slip':
+        return SlipFramer(limit)
+    if kind == 'cobs':
+        return CobsFramer(limit)
+    if kind == 'regex':
+        lookback = spec.get('lookback')
+        return RegexFramer(spec['pattern'], bool(spec.get('include', True)),
+                           int(lookback) if lookback is not None else None, limit)
+    raise ValueError(f'未知的分帧方式: {kind}')
+
+
+def framing_for_port(config: Optional[Dict[str, Any]], port: Optional[str]) -> Optional[Dict[str, Any]]:
+    """从usercfg的framing字段中找出指定串口的分帧配置"""
+    if not config:
+        return None
+    if 'type' in config:
+        return config
+    return config.get(port) or config.get('*')
@@ -0,0 +1,54 @@
+"""
+十六进制格式化
+
+基于 bytes.hex 在C层完成转换，避免逐字节拼接Python字符串。
+"""
+
+from functools import lru_cache
+from typing import List
+
+# 小写转大写的转换表（比 str.upper 略快）
+_UPPER = str.maketrans('abcdef', 'ABCDEF')
+
+# hexdump 右侧ASCII栏：不可打印字符显示为'.'
+_ASCII = bytes(b if 0x20 <= b < 0x7F else 0x2E for b in range(256))
+
+
+def tohex(data: bytes, sep: str = ' ', group: int = 1, upper: bool = True) -> str:
+    """将字节数据转换为十六进制字符串
+
+    group -- 每组字节数，组之间以sep分隔
+    """
+    if not data:
+        return ''
+    text = data.hex(sep, -group) if sep else data.hex()  # 负数表示从左侧开始分组
+    return text.translate(_UPPER) if upper else text
+
+
+def hex_preview(data: bytes, limit: int = 32) -> str:
+    """只转换前limit个字节，用于状态栏等只显示开头的场合"""
+    if len(data) <= limit:
+        return tohex(data)
+    return tohex(data[:limit]) + ' ...'
+
+
+@lru_cache(maxsize=8)
+def _dump_format(width: int) -> str:
+    """hexdump 每行的格式串，按宽度缓存"""
+    return '{:08X}  {:<%d}  |{}|' % (width * 3 - 1)
+
+
+def hexdump_lines(data: bytes, width: int = 16, upper: bool = True) -> List[str]:
+    """偏移量 + 十六进制 + ASCII 形式的多行输出"""
+    fmt = _dump_format(width)
+    # 整块转换一次，再按行切片，避免每行单独调用
+    hex_text = tohex(data, upper=upper)
+    ascii_text = bytes(data).translate(_ASCII).decode('ascii')
+    step = width * 3
+    return [fmt.format(offset, hex_text[i * step:i * step + step - 1], ascii_text[offset:offset + width])
+            for i, offset in enumerate(range(0, len(data), width))]
+
+
+def hexdump(data: bytes, width: int = 16, upper: bool = True) -> str:
+    """hexdump 形式的字符串"""
+    return '\n'.join(hexdump_lines(data, width, upper))
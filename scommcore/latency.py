@@ -0,0 +1,193 @@
+"""
+请求/应答往返时间（RTT）统计
+
+RttMeter 订阅引擎的收发事件，把每个发送的数据包登记为待应答的请求，收到的帧按匹配规则
+找到最早的一个待应答请求，记录两者的时间差：
+
+- 'next'：任何收到的帧都是最早一个待应答请求的应答
+- 'address' / 'address:N'：应答第N个字节（默认第0个，如Modbus从站地址）与请求相同
+
+    meter = RttMeter(engine, match='address')
+    ...
+    print(meter.report())  # p50/p95/p99
+    meter.write('rtt.json')
+
+发送时刻取数据写入驱动之后；接收时刻取该帧第一个数据块到达的时刻，不含分帧间隔的等待。
+"""
+
+import json
+import time
+import threading
+from array import array
+from collections import deque
+from typing import Optional, Dict, Any, Deque, Tuple
+
+from .metrics import Histogram
+
+
+def parse_match(rule: str) -> Tuple[str, int]:
+    """解析匹配规则 'next'、'address' 或 'address:N'，返回 (规则名, 字节偏移)"""
+    name, _, offset = rule.partition(':')
+    if name not in ('next', 'address'):
+        raise ValueError(f'未知的匹配规则: {rule}')
+    return name, int(offset) if offset else 0
+
+
+class RttMeter:
+    """请求/应答往返时间统计
+
+    timeout 秒内没有收到应答的请求计为丢失；待应答的请求超过 max_pending 个时，最早的一个也计为丢失。
+    没有对应请求的帧计为未匹配。最近 max_samples 个往返时间保留原始值，只在 report、write 或
+    as_dict(exact=True) 时排序计算精确的分位数；定期刷新的 as_dict() 使用直方图的近似分位数。
+    """
+
+    def __init__(self, engine=None, match: str = 'next', timeout: float = 1.0, max_samples: int = 100000,
+                 max_pending: int = 10000):
+        self.rule, self.offset = parse_match(match)
+        self.match = match
+        self.timeout = timeout
+        self.max_pending = max(1, max_pending)
+        self.count = 0
+        self.lost = 0  # 超时未收到应答的请求数
+        self.unmatched = 0  # 没有对应请求的接收帧数
+        self.histogram = Histogram()  # 微秒
+        self.by_key: Dict[int, Histogram] = {}  # 按地址统计（address 规则）
+        self._samples = array('d', bytes(8 * max_samples))  # 秒，环形
+        self._sample_count = 0
+        self._pending: Deque[Tuple[float, bytes]] = deque()  # (发送时刻, 请求)
+        self._frame_start: Optional[float] = None  # 正在接收的帧第一个数据块到达的时刻
+        self._lock = threading.Lock()
+        self._clock = time.perf_counter
+
+        self.engine = engine
+        if engine is not None:
+            engine.subscribe('send', self.on_send)
+            engine.subscribe('rx', self.on_rx)
+            engine.subscribe('recv', self.on_recv)
+
+    def close(self):
+        """取消订阅"""
+        if self.engine is not None:
+            self.engine.unsubscribe('send', self.on_send)
+            self.engine.unsubscribe('rx', self.on_rx)
+            self.engine.unsubscribe('recv', self.on_recv)
+
+    def on_send(self, data: bytes, ts: Optional[float] = None):
+        """登记一个请求（发送线程）"""
+        if ts is None:
+            ts = self._clock()
+        with self._lock:
+            self._expire(ts)
+            pending = self._pending
+            pending.append((ts, data))
+            if len(pending) > self.max_pending:
+                pending.popleft()
+                self.lost += 1
+
+    def on_rx(self, chunk: bytes):
+        """记录帧第一个数据块到达的时刻（接收线程）"""
+        if self._frame_start is None:
+            self._frame_start = self._clock()
+
+    def on_recv(self, frame: bytes, ts: Optional[float] = None):
+        """为收到的帧匹配请求并记录往返时间（接收线程）"""
+        if ts is None:
+            ts = self._frame_start if self._frame_start is not None else self._clock()
+        self._frame_start = None
+
+        with self._lock:
+            self._expire(ts)
+            pending = self._pending
+            index = -1
+            if self.rule == 'next':
+                index = 0 if pending else -1
+            elif len(frame) > self.offset:
+                key = frame[self.offset]
+                for i, (_, request) in enumerate(pending):
+                    if len(request) > self.offset and request[self.offset] == key:
+                        index = i
+                        break
+            if index < 0:
+                self.unmatched += 1
+                return
+
+            sent, request = pending[index]
+            del pending[index]
+            rtt = max(0.0, ts - sent)
+            self._record(rtt, request[self.offset] if self.rule == 'address' else None)
+
+    def _expire(self, now: float):
+        """丢弃超时的请求，计为丢失（持有锁时调用）"""
+        pending = self._pending
+        while pending and now - pending[0][0] > self.timeout:
+            pending.popleft()
+            self.lost += 1
+
+    def _record(self, rtt: float, key: Optional[int]):
+        self.count += 1
+        micros = rtt * 1e6
+        self.histogram.add(micros)
+        if key is not None:
+            histogram = self.by_key.get(key)
+            if histogram is None:
+                histogram = self.by_key[key] = Histogram()
+            histogram.add(micros)
+        samples = self._samples
+        samples[self._sample_count % len(samples)] = rtt
+        self._sample_count += 1
+
+    def percentiles(self, qs=(50, 95, 99)) -> Dict[str, float]:
+        """最近 max_samples 个往返时间的精确分位数（毫秒）"""
+        with self._lock:
+            n = min(self._sample_count, len(self._samples))
+            values = sorted(self._samples[:n])
+        if not values:
+            return {f'p{q}': 0.0 for q in qs}
+        return {f'p{q}': values[min(n - 1, int(n * q / 100.0))] * 1000 for q in qs}
+
+    def reset(self):
+        """清空统计，保留匹配规则"""
+        with self._lock:
+            self.count = self.lost = self.unmatched = 0
+            self.histogram = Histogram()
+            self.by_key = {}
+            self._sample_count = 0
+            self._pending.clear()
+
+    def as_dict(self, exact: bool = False) -> Dict[str, Any]:
+        """导出统计结果，往返时间单位为毫秒，直方图单位为微秒
+
+        exact 为False时分位数取直方图所在桶的上界（不排序，适合定期刷新），为True时排序原始值。
+        """
+        with self._lock:
+            self._expire(self._clock())
+            pending = len(self._pending)
+        histogram = self.histogram
+        result: Dict[str, Any] = {
+            'match': self.match,
+            'count': self.count,
+            'lost': self.lost,
+            'unmatched': self.unmatched,
+            'pending': pending,
+            'mean_ms': histogram.total / histogram.count / 1000 if histogram.count else 0.0,
+            'max_ms': histogram.max / 1000,
+        }
+        if exact:
+            result.update({key + '_ms': value for key, value in self.percentiles().items()})
+        else:
+            result.update({f'p{q}_ms': histogram.percentile(q) / 1000 for q in (50, 95, 99)})
+        result['histogram_us'] = histogram.buckets()
+        if self.by_key:
+            result['by_address'] = {f'{key:02X}': h.as_dict() for key, h in sorted(self.by_key.items())}
+        return result
+
+    def report(self) -> str:
+        """一行文字汇总"""
+        d = self.as_dict(exact=True)
+        return (f"RTT {d['count']} 次  p50 {d['p50_ms']:.3f} ms  p95 {d['p95_ms']:.3f} ms  "
+                f"p99 {d['p99_ms']:.3f} ms  最大 {d['max_ms']:.3f} ms  丢失 {d['lost']}  未匹配 {d['unmatched']}")
+
+    def write(self, path: str):
+        """把统计结果写入JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(exact=True), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,229 @@
+"""
+收发统计：速率、帧长分布、显示延迟、丢弃字节数
+
+Metrics 订阅引擎事件累计计数，snapshot() 生成一份统计快照，速率按与上一次快照的差值计算。
+快照可以显示在状态栏，也可以由 MetricsExporter 定期追加到 JSON Lines 文件：
+
+    python -m scommcore /dev/ttyUSB0 --metrics metrics.jsonl
+"""
+
+import json
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """按2的幂分桶的直方图
+
+    值为非负整数，第i个桶统计 bit_length 为i的值，即 [2^(i-1), 2^i)。
+    分位数返回所在桶的上界，是近似值，但记录一次只需一次整数运算。
+    """
+
+    def __init__(self, buckets: int = 33):
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value: int, count: int = 1):
+        """记录一个值（count 次）"""
+        value = int(value)
+        index = value.bit_length()
+        counts = self.counts
+        counts[index if index < len(counts) else -1] += count
+        self.count += count
+        self.total += value * count
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'Histogram'):
+        """累加另一个直方图的计数"""
+        for index, n in enumerate(other.counts):
+            self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> int:
+        """第q百分位数（桶上界）"""
+        if not self.count:
+            return 0
+        rank = self.count * q / 100.0
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(self.max, (1 << index) - 1)
+        return self.max
+
+    def buckets(self) -> Dict[str, int]:
+        """非空的桶，键为桶上界"""
+        return {str((1 << i) - 1): n for i, n in enumerate(self.counts) if n}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0,
+            'p50': self.percentile(50), 'p95': self.percentile(95), 'p99': self.percentile(99),
+            'max': self.max, 'buckets': self.buckets(),
+        }
+
+
+class Metrics:
+    """一个串口的收发统计
+
+    engine 为 SerialEngine 或 PortSession，收发字节数直接读取引擎的计数。
+    界面等其他组件通过 add_gauge 注册在快照时读取的数值（如队列深度、淘汰字节数），
+    通过 observe_render 记录从入队到显示的延迟。
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.rx_frames = 0
+        self.tx_frames = 0
+        self.frame_sizes = Histogram()
+        self.render_latency = Histogram()  # 微秒
+        self.gauges: Dict[str, Callable[[], Any]] = {}
+        self._last: Optional[Dict[str, Any]] = None
+
+        if engine is not None:
+            engine.subscribe('recv', self._on_recv)
+            engine.subscribe('send', self._on_send)
+
+    def close(self):
+        """取消订阅"""
+        if self.engine is not None:
+            self.engine.unsubscribe('recv', self._on_recv)
+            self.engine.unsubscribe('send', self._on_send)
+
+    def _on_recv(self, data: bytes):
+        self.rx_frames += 1
+        self.frame_sizes.add(len(data))
+
+    def _on_send(self, data: bytes):
+        self.tx_frames += 1
+
+    def add_gauge(self, name: str, getter: Callable[[], Any]):
+        """注册快照时读取的数值"""
+        self.gauges[name] = getter
+
+    def observe_render(self, latency: float):
+        """记录一次从入队到显示的延迟（秒）"""
+        self.render_latency.add(max(0.0, latency) * 1e6)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """生成统计快照，速率与直方图都只统计距上一次快照的这段时间"""
+        now = time.monotonic()
+        engine = self.engine
+        # 直方图整体替换，工作线程此刻记录到旧对象中的少量数据会计入下一次或丢失，不影响趋势
+        sizes, self.frame_sizes = self.frame_sizes, Histogram()
+        latency, self.render_latency = self.render_latency, Histogram()
+
+        snap: Dict[str, Any] = {
+            'ts': time.time(),
+            'rx_bytes': engine.recv_count if engine is not None else 0,
+            'tx_bytes': engine.send_count if engine is not None else 0,
+            'rx_frames': self.rx_frames,
+            'tx_frames': self.tx_frames,
+            'framing_dropped': getattr(engine, 'framing_dropped', 0),
+            'capture_dropped': getattr(getattr(engine, 'capture', None), 'dropped_bytes', 0),
+        }
+        for name, getter in self.gauges.items():
+            try:
+                snap[name] = getter()
+            except Exception as e:
+                logger.error(f"读取统计项 {name} 出错: {e}")
+
+        last = self._last
+        elapsed = now - last['_mono'] if last is not None else 0.0
+        for key in ('rx_bytes', 'tx_bytes', 'rx_frames', 'tx_frames'):
+            delta = snap[key] - last[key] if last is not None else 0
+            snap[key + '_per_s'] = delta / elapsed if elapsed > 0 else 0.0
+        snap['interval'] = elapsed
+        snap['frame_size'] = sizes.as_dict()
+        snap['render_latency_ms'] = {
+            'count': latency.count,
+            'p50': latency.percentile(50) / 1000.0,
+            'p99': latency.percentile(99) / 1000.0,
+            'max': latency.max / 1000.0,
+        }
+
+        self._last = dict(snap, _mono=now)
+        return snap
+
+
+def format_status(snap: Dict[str, Any]) -> str:
+    """把快照格式化为一行状态文字"""
+    text = (f"RX {snap['rx_bytes_per_s'] / 1024:.1f} KB/s {snap['rx_frames_per_s']:.0f} 帧/s  "
+            f"TX {snap['tx_bytes_per_s'] / 1024:.1f} KB/s  "
+            f"帧长p99 {snap['frame_size']['p99']} B")
+    latency = snap['render_latency_ms']
+    if latency['count']:
+        text += f"  显示延迟p99 {latency['p99']:.0f} ms"
+    if 'queue_depth' in snap:
+        text += f"  队列 {snap['queue_depth']}"
+    schedule = snap.get('schedule')
+    if schedule:
+        late = max(job['late_us']['p99'] for job in schedule.values())
+        missed = sum(job['missed'] for job in schedule.values())
+        text += f"  周期延迟p99 {late / 1000:.2f} ms"
+        if missed:
+            text += f" 跳过 {missed}"
+    rtt = snap.get('rtt')
+    if rtt and rtt['count']:
+        text += f"  RTT p50 {rtt['p50_ms']:.2f} p99 {rtt['p99_ms']:.2f} ms"
+        if rtt['lost']:
+            text += f" 丢失 {rtt['lost']}"
+    dropped = snap['framing_dropped'] + snap['capture_dropped'] + snap.get('evicted_bytes', 0)
+    if dropped:
+        text += f"  丢弃 {dropped} B"
+    return text
+
+
+class MetricsExporter:
+    """把统计快照追加写入 JSON Lines 文件
+
+    可以由调用方在已有的定时器中调用 write，也可以 start() 启动后台线程按 interval 定期写入。
+    """
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 1.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._file = open(path, 'a', encoding='utf-8')
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, snap: Dict[str, Any]):
+        """写入一条快照"""
+        self._file.write(json.dumps(snap, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def start(self) -> 'MetricsExporter':
+        """启动后台线程定期生成并写入快照"""
+        self.metrics.snapshot()  # 建立速率计算的起点
+        self._thread = threading.Thread(target=self._export_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _export_loop(self):
+        # 按绝对时刻调度，写入耗时不会累积成漂移
+        deadline = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, deadline - time.monotonic())):
+            deadline += self.interval
+            try:
+                self.write(self.metrics.snapshot())
+            except Exception as e:
+                logger.error(f"写入统计文件出错: {e}")
+
+    def close(self):
+        """停止后台线程并关闭文件"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._file.close()
@@ -0,0 +1,441 @@
+"""
+多串口会话：一个I/O线程通过 selector 同时处理多个串口
+
+    python -m scommcore.multiport /dev/ttyUSB0 /dev/ttyUSB1@9600 --hex
+
+每个串口的接收缓冲、分帧器、分帧间隔和发送队列保存在各自的 PortSession 中，
+所有串口描述符注册到同一个 selector 上。空闲时I/O线程阻塞等待，
+只有收到数据或到达某个串口的分帧时刻才被唤醒，线程数不随串口数量增加。
+仅支持可以取得文件描述符的平台（Mac/Linux）。
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import logging
+import selectors
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable, Set, Deque, Union
+
+import serial
+
+from .hexfmt import hex_preview
+from .settings import Settings
+from .receiver import FrameReceiver
+from .capture import CaptureWriter
+from .events import EventSource
+from .engine import Packet
+from .store import SEND
+from .utils import strnow, human_string
+
+logger = logging.getLogger(__name__)
+
+
+class PortSession(EventSource):
+    """多串口会话中的一个串口
+
+    事件与 SerialEngine 相同（'recv'、'send'、'log'、'open'、'close'、'rx'），其中 'rx' 的回调
+    收到从串口读到的原始数据块（bytes，分帧前），没有订阅者时不产生开销。
+    回调在 PortHub 的I/O线程中执行，不应长时间阻塞。
+    """
+
+    EVENTS = ('recv', 'send', 'log', 'open', 'close', 'rx')
+
+    def __init__(self, hub: 'PortHub', port: str, baudrate: int,
+                 framing: Optional[Dict[str, Any]] = None, settings: Settings = Settings(), **kwargs):
+        super().__init__()
+        self.hub = hub
+        self.com = serial.Serial()
+        self.com.port = port
+        self.com.baudrate = baudrate
+        self.com.bytesize = kwargs.get('bytesize', 8)
+        self.com.parity = kwargs.get('parity', 'N')
+        self.com.stopbits = kwargs.get('stopbits', 1)
+        self.com.timeout = 0  # 读写都由I/O线程按描述符事件驱动
+
+        self.settings = settings
+        self.framing = framing
+        self.capture: Optional[CaptureWriter] = None
+
+        # 以下状态只在I/O线程中访问
+        self._fd = -1
+        self._receiver: Optional[FrameReceiver] = None
+        self._writing: Optional[memoryview] = None  # 正在发送的数据包剩余部分
+        self._writing_packet: Optional[Packet] = None
+        self._out: Deque[Packet] = deque()  # 其他线程通过send放入，I/O线程取出
+
+        # 统计信息
+        self.send_count = 0
+        self.recv_count = 0
+
+    @property
+    def port(self) -> str:
+        return self.com.port
+
+    @property
+    def is_open(self) -> bool:
+        return self.com.is_open
+
+    @property
+    def framing_dropped(self) -> int:
+        """分帧器因超长或格式错误丢弃的字节数"""
+        return self._receiver.dropped if self._receiver is not None else 0
+
+    def configure(self, **changes):
+        """修改部分设置，生成新的设置快照"""
+        self.settings = self.settings._replace(**changes)
+
+    def open(self) -> bool:
+        """打开串口并加入I/O线程"""
+        try:
+            self.com.open()
+            self._fd = self.com.fileno()
+            os.set_blocking(self._fd, False)
+        except Exception as e:
+            logger.error(f"打开串口失败: {e}")
+            self.com.close()
+            self.emit('close')
+            self.log(f'{self.port}: 打开失败 - {e}')
+            return False
+
+        self._receiver = FrameReceiver(self, self.framing)
+        self.hub.call(self.hub._attach, self)
+        self.emit('open')
+        self.log(f'{self.port}: 打开成功')
+        return True
+
+    def close(self):
+        """从I/O线程中移除并关闭串口"""
+        if self.is_open:
+            self.hub.call(self.hub._detach, self)
+
+    def send(self, data: bytes, rts: Optional[bool] = None, dtr: Optional[bool] = None):
+        """将数据放入发送队列"""
+        if not self.is_open:
+            self.log('串口未打开')
+            return
+        self._out.append(Packet(data, rts, dtr))
+        self.hub.call(self._write_pending, wait=False)
+
+    # ---- 以下方法在I/O线程中执行 ----
+
+    def _flush_frame(self, data: bytes):
+        """输出一帧接收数据"""
+        self.emit('recv', data)
+        self.log(f'{self.port}: 接收 {len(data)} 字节: {hex_preview(data)}')
+
+    def _deadline(self) -> float:
+        """按时间间隔分帧时，缓冲区中的数据应输出的时刻"""
+        return self._receiver.deadline
+
+    def _read(self) -> bool:
+        """描述符可读时读入数据，返回缓冲区中是否留有待分帧的数据"""
+        fd = self._fd
+        if self._receiver.read(lambda view: os.readv(fd, [view])) == 0:
+            raise serial.SerialException('串口已断开或无数据可读')
+        return bool(len(self._receiver))
+
+    def _expire(self):
+        """到达分帧时刻，输出缓冲区中的数据"""
+        if self._receiver is not None:
+            self._receiver.expire()
+
+    def _write_pending(self) -> bool:
+        """尽量写出发送队列中的数据，返回是否还有数据等待描述符可写"""
+        while self.is_open:
+            if self._writing is None:
+                if not self._out:
+                    return False
+                packet = self._writing_packet = self._out.popleft()
+                if packet.rts is not None:
+                    self.com.rts = packet.rts
+                    self.log(f'{self.port}: RTS = {packet.rts}')
+                if packet.dtr is not None:
+                    self.com.dtr = packet.dtr
+                    self.log(f'{self.port}: DTR = {packet.dtr}')
+                if not packet.data:
+                    continue
+                self._writing = memoryview(packet.data)
+
+            try:
+                n = os.write(self._fd, self._writing)
+            except BlockingIOError:
+                n = 0
+            if n < len(self._writing):
+                self._writing = self._writing[n:]
+                self.hub._want_write(self, True)
+                return True
+
+            data = self._writing_packet.data
+            self._writing = self._writing_packet = None
+            self.send_count += len(data)
+            if self.capture is not None:
+                self.capture.record(SEND, data, self.port)
+            self.log(f'{self.port}: 发送 {len(data)} 字节')
+            self.emit('send', data)
+        return False
+
+
+class PortHub:
+    """用一个I/O线程驱动多个串口会话
+
+        hub = PortHub()
+        session = hub.add('/dev/ttyUSB0', 115200)
+        session.subscribe('recv', print)
+        session.open()
+        ...
+        hub.close()
+    """
+
+    def __init__(self):
+        self.sessions: List[PortSession] = []
+        self.capture: Optional[CaptureWriter] = None
+        self.running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wakeup: Optional[tuple] = None
+        self._calls: Deque[Callable[[], Any]] = deque()
+        self._pending: Set[PortSession] = set()  # 缓冲区中有待分帧数据的会话
+        self._lock = threading.Lock()
+
+    def add(self, port: str, baudrate: int, framing: Optional[Dict[str, Any]] = None,
+            settings: Settings = Settings(), **kwargs) -> PortSession:
+        """创建串口会话，订阅事件后调用 session.open() 开始收发"""
+        session = PortSession(self, port, baudrate, framing, settings, **kwargs)
+        session.capture = self.capture
+        self.sessions.append(session)
+        return session
+
+    def open(self, port: str, baudrate: int, **kwargs) -> Optional[PortSession]:
+        """创建并打开串口会话，失败时返回None"""
+        session = self.add(port, baudrate, **kwargs)
+        return session if session.open() else None
+
+    def close(self):
+        """关闭所有串口并停止I/O线程"""
+        for session in list(self.sessions):
+            session.close()
+        self.sessions.clear()
+        self._stop()
+
+    def __enter__(self) -> 'PortHub':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start_capture(self, target: Union[str, CaptureWriter]) -> CaptureWriter:
+        """所有串口共用一个抓包文件，按串口名区分记录"""
+        self.stop_capture()
+        writer = target if isinstance(target, CaptureWriter) else CaptureWriter(target)
+        self.capture = writer
+        for session in self.sessions:
+            session.capture = writer
+        return writer
+
+    def stop_capture(self):
+        """停止抓包并关闭文件"""
+        writer, self.capture = self.capture, None
+        for session in self.sessions:
+            session.capture = None
+        if writer is not None:
+            writer.close()
+
+    def call(self, func: Callable[..., Any], *args, wait: bool = True):
+        """在I/O线程中执行func，wait为True时等待执行完成"""
+        if threading.current_thread() is self._thread:
+            func(*args)
+            return
+        self._start()
+        done = threading.Event() if wait else None
+
+        def run():
+            try:
+                func(*args)
+            finally:
+                if done is not None:
+                    done.set()
+
+        self._calls.append(run)
+        self._wake()
+        if done is not None:
+            done.wait()
+
+    def _start(self):
+        """首次使用时创建selector并启动I/O线程"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._selector = selectors.DefaultSelector()
+            self._wakeup = os.pipe()
+            for fd in self._wakeup:
+                os.set_blocking(fd, False)
+            self._selector.register(self._wakeup[0], selectors.EVENT_READ)
+            self.running.set()
+            self._thread = threading.Thread(target=self._io_loop, daemon=True)
+            self._thread.start()
+
+    def _stop(self):
+        """停止I/O线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self.running.clear()
+            self._wake()
+        thread.join(timeout=1.0)
+        self._selector.close()
+        for fd in self._wakeup:
+            os.close(fd)
+        self._selector = self._wakeup = None
+
+    def _wake(self):
+        """唤醒I/O线程；管道已满时I/O线程必然会被唤醒，不需要再写入"""
+        try:
+            os.write(self._wakeup[1], b'\0')
+        except BlockingIOError:
+            pass
+
+    def _attach(self, session: PortSession):
+        """把会话的描述符注册到selector（I/O线程）"""
+        self._selector.register(session._fd, selectors.EVENT_READ, session)
+
+    def _detach(self, session: PortSession):
+        """输出剩余数据，注销描述符并关闭串口（I/O线程）"""
+        self._pending.discard(session)
+        session._expire()
+        try:
+            self._selector.unregister(session._fd)
+        except (KeyError, ValueError):
+            pass
+        try:
+            session.com.close()
+        except Exception as e:
+            logger.error(f"关闭串口时出错: {e}")
+        session._writing = session._writing_packet = None
+        session._out.clear()
+        session.emit('close')
+        session.log(f'{session.port}: 已关闭')
+
+    def _want_write(self, session: PortSession, enable: bool):
+        """按需关注描述符可写事件"""
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if enable else 0)
+        if self._selector.get_key(session._fd).events != events:
+            self._selector.modify(session._fd, events, session)
+
+    def _next_timeout(self) -> Optional[float]:
+        """距离最近一个分帧时刻的时间，没有待分帧的数据时无限等待"""
+        if not self._pending:
+            return None
+        return max(0.0, min(session._deadline() for session in self._pending) - time.monotonic())
+
+    def _io_loop(self):
+        """I/O线程：等待任一串口可读/可写、跨线程调用或分帧时刻"""
+        selector = self._selector
+        wakeup = self._wakeup[0]
+        while self.running.is_set():
+            try:
+                events = selector.select(self._next_timeout())
+
+                for key, mask in events:
+                    if key.fd == wakeup:
+                        try:
+                            os.read(wakeup, 4096)
+                        except BlockingIOError:
+                            pass
+                        continue
+                    session: PortSession = key.data
+                    try:
+                        if mask & selectors.EVENT_READ:
+                            if session._read():
+                                self._pending.add(session)
+                            else:
+                                self._pending.discard(session)
+                        if mask & selectors.EVENT_WRITE and session.is_open:
+                            if not session._write_pending():
+                                self._want_write(session, False)
+                    except Exception as e:
+                        logger.error(f"{session.port}: 收发错误: {e}")
+                        session.log(f'{session.port}: 收发错误 - {e}')
+                        self._detach(session)
+
+                while self._calls:
+                    self._calls.popleft()()
+
+                if self._pending:
+                    now = time.monotonic()
+                    for session in [s for s in self._pending if s._deadline() <= now]:
+                        self._pending.discard(session)
+                        session._expire()
+
+            except Exception as e:
+                logger.error(f"I/O线程错误: {e}")
+                self.running.wait(0.1)
+
+        # 退出前执行剩余的调用，避免调用方一直等待
+        while self._calls:
+            self._calls.popleft()()
+
+
+def _parse_port(text: str, baudrate: int):
+    """解析 PORT 或 PORT@BAUD"""
+    port, _, baud = text.rpartition('@')
+    if port and baud.isdigit():
+        return port, int(baud)
+    return text, baudrate
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog='scommcore.multiport', description='同时监视多个串口（无界面模式）')
+    parser.add_argument('ports', nargs='+', help='串口设备，可写作 PORT@BAUD 单独指定波特率')
+    parser.add_argument('-b', '--baud', type=int, default=9600, help='默认波特率')
+    parser.add_argument('--split', type=float, default=99, help='分帧间隔（毫秒）')
+    parser.add_argument('--max-frame', type=int, default=1024, help='最大帧长（字节）')
+    parser.add_argument('--framing', type=json.loads, default=None, help='协议分帧配置（JSON），对所有串口生效')
+    parser.add_argument('--hex', action='store_true', help='HEX显示')
+    parser.add_argument('--encoding', default='utf-8', help='数据编码')
+    parser.add_argument('--capture', metavar='FILE', help='把所有串口收发的原始数据写入同一个抓包文件')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出状态消息')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    settings = Settings(split_interval=args.split / 1000.0, max_frame_size=args.max_frame)
+    hub = PortHub()
+    if args.capture:
+        hub.start_capture(args.capture)
+
+    def printer(port: str):
+        def on_recv(data: bytes):
+            sys.stdout.write(f"[{strnow()}] {port} < {human_string(data, args.hex, args.encoding)}\n")
+            sys.stdout.flush()
+        return on_recv
+
+    opened = 0
+    for text in args.ports:
+        port, baudrate = _parse_port(text, args.baud)
+        session = hub.add(port, baudrate, framing=args.framing, settings=settings)
+        session.subscribe('recv', printer(port))
+        if args.verbose:
+            session.subscribe('log', logging.getLogger('scommcore').info)
+        opened += session.open()
+
+    try:
+        # 所有串口都断开后退出
+        while any(session.is_open for session in hub.sessions):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.close()
+        hub.stop_capture()
+    return 0 if opened else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
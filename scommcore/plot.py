@@ -0,0 +1,150 @@
+"""
+实时波形：解析结果中数值字段的环形缓冲与按像素列的最大/最小值抽取
+
+解析脚本或帧结构的输出形如 ' temp=25.3 counter=17'，其中每个 name=数值 作为一个通道。
+每个通道保存最近 capacity 个采样，同时按当前的时间分辨率（每像素列对应的秒数）增量维护
+每一列的最小值和最大值。绘制时只读取不超过画布宽度的列，开销与采样率和历史长度无关；
+只有画布宽度或时间窗口变化时才从环形缓冲重新计算一次。
+"""
+
+import re
+import threading
+from array import array
+from collections import deque
+from typing import Optional, Dict, List, Tuple, Iterator, Deque
+
+# name=数值，数值为整数、小数或科学计数法（%g 的输出）
+_VALUE = re.compile(r'(?<![\w.])([^\W\d]\w*)=([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?![\w.])')
+
+
+def parse_values(note: str) -> Dict[str, float]:
+    """从解析结果中提取 name=数值 字段"""
+    return {name: float(value) for name, value in _VALUE.findall(note)}
+
+
+class Channel:
+    """一个通道的采样
+
+    原始采样保存在定长的环形缓冲中；列缓冲中每项为 [列号, 最小值, 最大值]，
+    列号为 int(时间 // 列宽)，随采样追加增量更新。
+    """
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.count = 0  # 累计追加的采样数
+        self.last = 0.0  # 最新的值
+        self._ts = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self._bin_width = 0.0
+        self._bins: Deque[List[float]] = deque()
+
+    def append(self, ts: float, value: float):
+        """追加一个采样"""
+        i = self.count % self.capacity
+        self._ts[i] = ts
+        self._values[i] = value
+        self.count += 1
+        self.last = value
+        if self._bin_width:
+            self._add_bin(ts, value)
+
+    def _add_bin(self, ts: float, value: float):
+        index = int(ts // self._bin_width)
+        bins = self._bins
+        if bins and bins[-1][0] == index:
+            last = bins[-1]
+            if value < last[1]:
+                last[1] = value
+            if value > last[2]:
+                last[2] = value
+        else:
+            bins.append([index, value, value])
+
+    def samples(self, since: float = float('-inf')) -> Iterator[Tuple[float, float]]:
+        """按追加顺序遍历环形缓冲中时间不早于 since 的 (时间, 值)，采样时间应单调递增"""
+        capacity = self.capacity
+        start = self.count - min(self.count, capacity)
+        # 二分查找第一个不早于 since 的采样
+        low, high = start, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._ts[middle % capacity] < since:
+                low = middle + 1
+            else:
+                high = middle
+        for k in range(low, self.count):
+            i = k % capacity
+            yield self._ts[i], self._values[i]
+
+    def set_resolution(self, bin_width: float, columns: int):
+        """设置列宽（秒）和保留的列数，变化时从环形缓冲重新计算最近 columns 列"""
+        if bin_width == self._bin_width and self._bins.maxlen == columns:
+            return
+        self._bin_width = bin_width
+        self._bins = deque(maxlen=columns)
+        if not self.count:
+            return
+        latest = self._ts[(self.count - 1) % self.capacity]
+        since = (int(latest // bin_width) - columns + 1) * bin_width
+        for ts, value in self.samples(since):
+            self._add_bin(ts, value)
+
+    def columns(self, first: int) -> List[Tuple[int, float, float]]:
+        """列号不小于 first 的各列 (列号 - first, 最小值, 最大值)"""
+        return [(index - first, low, high) for index, low, high in self._bins if index >= first]
+
+
+class PlotData:
+    """各通道的采样，可以在接收线程中追加，在界面线程中读取"""
+
+    def __init__(self, capacity: int = 100000, max_channels: int = 16):
+        self.capacity = capacity
+        self.max_channels = max_channels
+        self.channels: Dict[str, Channel] = {}
+        self.latest = 0.0  # 最新采样的时间
+        self._lock = threading.Lock()
+
+    def add(self, ts: float, values: Dict[str, float]):
+        """追加一组同一时刻的采样，超出通道数上限的新字段被忽略"""
+        if not values:
+            return
+        with self._lock:
+            channels = self.channels
+            for name, value in values.items():
+                channel = channels.get(name)
+                if channel is None:
+                    if len(channels) >= self.max_channels:
+                        continue
+                    channel = channels[name] = Channel(name, self.capacity)
+                channel.append(ts, value)
+            if ts > self.latest:
+                self.latest = ts
+
+    def add_note(self, ts: float, note: str):
+        """从解析结果中提取数值并追加"""
+        if note:
+            self.add(ts, parse_values(note))
+
+    def clear(self):
+        with self._lock:
+            self.channels.clear()
+            self.latest = 0.0
+
+    def columns(self, window: float, width: int,
+                end: Optional[float] = None) -> Dict[str, List[Tuple[int, float, float]]]:
+        """最近 window 秒内各通道按 width 列抽取的 (列, 最小值, 最大值)，第0列在最左
+
+        end 为窗口右端的时间，默认为最新采样的时间。
+        """
+        width = max(1, int(width))
+        bin_width = window / width
+        with self._lock:
+            if end is None:
+                end = self.latest
+            first = int(end // bin_width) - width + 1
+            result = {}
+            for name, channel in self.channels.items():
+                channel.set_resolution(bin_width, width + 1)
+                result[name] = channel.columns(first)
+        return result
@@ -0,0 +1,190 @@
+"""
+在工作线程池或进程池中执行解析脚本，按接收顺序输出结果
+
+接收线程只调用 submit 把帧放入队列，不执行任何脚本。分发线程把连续的帧打包成批次交给执行器，
+收集线程按提交顺序等待每个批次的结果并交给 sink，因此输出顺序与接收顺序一致。
+
+进程池（mode='process'）中每个进程各自编译脚本，多个耗时的脚本可以同时利用多个CPU核；
+线程池（mode='thread'）受GIL限制，只适合脚本中有释放GIL的操作（如 struct、zlib）的情况。
+打包为可执行文件（py2exe）运行时默认使用线程池，主程序入口需调用 multiprocessing.freeze_support()
+才能使用进程池。
+"""
+
+import sys
+import queue
+import logging
+import threading
+import concurrent.futures
+from typing import Optional, Dict, Any, List, Callable, Tuple, Sequence
+
+from .unpack import UnpackScript, ScriptBudget, ScriptStats, run_scripts_batch
+
+logger = logging.getLogger(__name__)
+
+MODES = ('thread', 'process')
+# 打包后的可执行文件不能直接作为进程池的子进程启动，默认使用线程池
+DEFAULT_MODE = 'thread' if getattr(sys, 'frozen', False) else 'process'
+
+# 工作线程/进程中按 (脚本类, 名称, 源码) 缓存编译好的脚本
+_local = threading.local()
+
+
+def _run_batch(specs: Tuple[Tuple[type, str, str], ...], frames: List[bytes],
+               budget: Optional[ScriptBudget]) -> Tuple[List[str], List[ScriptStats]]:
+    """在工作线程/进程中解析一批帧，返回每帧的输出和本批次的脚本统计"""
+    cache: Dict[Tuple[type, str, str], UnpackScript] = getattr(_local, 'scripts', None)
+    if cache is None:
+        cache = _local.scripts = {}
+    scripts = []
+    for spec in specs:
+        script = cache.get(spec)
+        if script is None:
+            cls, name, source = spec
+            script = cache[spec] = cls(name, source)
+            # 工作者中只计数，是否标记或停用由收集线程合并统计后判断
+            script.slow = True
+        # 每个批次单独统计，由收集线程合并；连续超出预算的次数跨批次保留
+        strikes = script.stats.strikes
+        script.stats = ScriptStats()
+        script.stats.strikes = strikes
+        scripts.append(script)
+
+    notes = run_scripts_batch(scripts, frames, budget)
+    return notes, [script.stats for script in scripts]
+
+
+def parse_pool_config(config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """usercfg中的 unpack_pool 字段，如 {"mode": "process", "workers": 4}"""
+    if not config:
+        return None
+    mode = config.get('mode', DEFAULT_MODE)
+    if mode not in MODES:
+        raise ValueError(f'未知的解析执行方式: {mode}')
+    workers = config.get('workers')
+    return {'mode': mode, 'workers': int(workers) if workers else None,
+            'batch_size': int(config.get('batch', 256))}
+
+
+class UnpackPool:
+    """按顺序输出结果的解析脚本执行池
+
+    sink(data, note, ts) 在收集线程中按 submit 的顺序调用。
+    """
+
+    def __init__(self, sink: Callable[[bytes, str, Any], None], mode: str = DEFAULT_MODE,
+                 workers: Optional[int] = None, batch_size: int = 256,
+                 budget: Optional[ScriptBudget] = None, max_inflight: Optional[int] = None):
+        if mode not in MODES:
+            raise ValueError(f'未知的解析执行方式: {mode}')
+        self.sink = sink
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.budget = budget
+        self.submitted = 0
+        self.completed = 0
+
+        if mode == 'process':
+            self._executor = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='unpack')
+        self.workers = self._executor._max_workers
+        # 同时在执行中的批次数，保持所有工作者忙碌，同时限制结果积压
+        self._inflight = threading.Semaphore(max_inflight or self.workers * 2)
+
+        self._queue: 'queue.SimpleQueue[Optional[tuple]]' = queue.SimpleQueue()
+        self._pending: 'queue.SimpleQueue[Optional[tuple]]' = queue.SimpleQueue()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._collector = threading.Thread(target=self._collect_loop, daemon=True)
+        self._dispatcher.start()
+        self._collector.start()
+
+    @property
+    def backlog(self) -> int:
+        """已提交但尚未输出的帧数"""
+        return self.submitted - self.completed
+
+    def submit(self, data: bytes, scripts: Sequence[Optional[UnpackScript]], ts: Any = None):
+        """提交一帧（不阻塞），scripts 为该帧要执行的脚本"""
+        self.submitted += 1
+        self._queue.put((data, tuple(scripts), ts))
+
+    def close(self, wait: bool = True):
+        """输出全部已提交的帧后关闭"""
+        self._queue.put(None)
+        if wait:
+            self._dispatcher.join()
+            self._collector.join()
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch_loop(self):
+        """把连续、脚本相同的帧打包提交给执行器"""
+        closing = False
+        item = self._queue.get()
+        while item is not None:
+            batch = [item]
+            scripts = item[1]
+            item = None  # 下一批的第一帧
+            while len(batch) < self.batch_size:
+                try:
+                    next_item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if next_item is None:
+                    closing = True
+                    break
+                if next_item[1] != scripts:
+                    item = next_item
+                    break
+                batch.append(next_item)
+
+            self._submit_batch(batch, scripts)
+            if item is None and not closing:
+                item = self._queue.get()
+        self._pending.put(None)
+
+    def _submit_batch(self, batch: List[tuple], scripts: Tuple[Optional[UnpackScript], ...]):
+        """提交一个批次，没有启用的脚本时不经过执行器"""
+        active = tuple(s for s in scripts if s and not s.disabled)
+        future = None
+        self._inflight.acquire()
+        if active:
+            specs = tuple((type(s), s.name, s.source) for s in active)
+            try:
+                future = self._executor.submit(_run_batch, specs, [frame[0] for frame in batch], self.budget)
+            except RuntimeError as e:  # 执行器已关闭
+                logger.error(f"提交解析任务出错: {e}")
+        self._pending.put((batch, active, future))
+
+    def _collect_loop(self):
+        """按提交顺序等待结果并输出"""
+        while True:
+            entry = self._pending.get()
+            if entry is None:
+                break
+            batch, active, future = entry
+            notes: List[str] = [''] * len(batch)
+            if future is not None:
+                try:
+                    notes, stats = future.result()
+                    self._merge_stats(active, stats)
+                except Exception as e:
+                    logger.error(f"执行解析脚本出错: {e}")
+            self._inflight.release()
+
+            for (data, _, ts), note in zip(batch, notes):
+                try:
+                    self.sink(data, note, ts)
+                except Exception as e:
+                    logger.error(f"输出解析结果出错: {e}")
+            self.completed += len(batch)
+
+    def _merge_stats(self, scripts: Tuple[UnpackScript, ...], stats: List[ScriptStats]):
+        """合并工作者的统计，并按预算标记或停用脚本"""
+        budget = self.budget
+        for script, batch_stats in zip(scripts, stats):
+            script.stats.merge(batch_stats)
+            if budget is not None and not script.slow and script.stats.strikes >= budget.strikes:
+                script.slow = True
+                script.disabled = budget.action == 'disable'
+                logger.warning(f"解析脚本 {script.name} 连续 {script.stats.strikes} 帧超出预算 "
+                               f"{budget.limit * 1000:g}ms" + ('，已停用' if script.disabled else ''))
@@ -0,0 +1,97 @@
+"""
+预置数据（btn-dataNN）到发送数据包的转换
+
+预置数据的 value 先作为表达式求值（用户变量以列表 data 传入），结果可以是字符串，
+也可以是 {"text", "encoding", "hex", "rts", "dtr"} 字典；求值失败时按原文发送。
+
+PresetCache 缓存求值和编码的结果，点击按钮或周期发送时直接使用编码好的数据包。
+"""
+
+from typing import Optional, Dict, Any, Sequence, Tuple
+
+from .engine import Packet
+from .settings import Settings
+
+
+def eval_preset(config: Dict[str, Any], user_vars: Sequence[str]) -> Dict[str, Any]:
+    """对预置数据求值，返回 {'text', 'encoding', 'hex_flag', 'rts', 'dtr'}，未指定的项为None"""
+    value = config.get('value', '')
+    try:
+        value = eval(value, {"data": list(user_vars)})
+    except:  # 与原先一样，不是合法表达式时按原文发送
+        pass
+
+    if isinstance(value, dict):
+        return {
+            'text': value.get('text', ''),
+            'encoding': value.get('encoding'),
+            'hex_flag': value.get('hex'),
+            'rts': value.get('rts'),
+            'dtr': value.get('dtr'),
+        }
+    return {'text': str(value), 'encoding': None, 'hex_flag': config.get('hex'), 'rts': None, 'dtr': None}
+
+
+def encode_text(text: str, hex_flag: bool, encoding: str,
+                append_cr: bool = False, append_lf: bool = False) -> bytes:
+    """把发送文本编码为字节，HEX格式无效时抛出 ValueError"""
+    if hex_flag:
+        data = bytes.fromhex(text) if text.strip() else b''
+    else:
+        data = text.encode(encoding, 'ignore')
+    if append_cr:
+        data += b'\r'
+    if append_lf:
+        data += b'\n'
+    return data
+
+
+def pack_to_packet(pack: Dict[str, Any], settings: Settings) -> Packet:
+    """把 eval_preset 的结果编码为数据包，未指定编码和HEX格式时使用 settings 中的设置"""
+    hex_flag = pack['hex_flag'] if pack['hex_flag'] is not None else settings.send_hex
+    data = encode_text(pack['text'], hex_flag, pack['encoding'] or settings.encoding,
+                       settings.append_cr, settings.append_lf)
+    return Packet(data, pack['rts'], pack['dtr'])
+
+
+def build_packet(config: Dict[str, Any], user_vars: Sequence[str], settings: Settings) -> Packet:
+    """把预置数据转换为数据包"""
+    return pack_to_packet(eval_preset(config, user_vars), settings)
+
+
+class PresetCache:
+    """预置数据编译结果的缓存
+
+    以 (预置数据内容, HEX标志, 用户变量, 发送编码设置) 为键，任何一项变化时重新求值和编码。
+    预置数据中设置 "dynamic": 1 时不缓存，每次重新求值（如表达式中用到了时间或随机数）。
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[tuple, Dict[str, Any], Packet]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, config: Dict[str, Any], user_vars: Sequence[str],
+            settings: Settings) -> Tuple[Dict[str, Any], Packet]:
+        """返回 (eval_preset 的结果, 编码好的数据包)，HEX格式无效时抛出 ValueError"""
+        user_vars = tuple(user_vars)
+        key = (config.get('value', ''), config.get('hex'), user_vars,
+               settings.send_hex, settings.encoding, settings.append_cr, settings.append_lf)
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1], entry[2]
+
+        self.misses += 1
+        pack = eval_preset(config, user_vars)
+        packet = pack_to_packet(pack, settings)
+        if not config.get('dynamic'):
+            self._entries[name] = (key, pack, packet)
+        return pack, packet
+
+    def invalidate(self, name: Optional[str] = None):
+        """删除某个预置数据的缓存，name为None时全部删除"""
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
@@ -0,0 +1,95 @@
+"""
+接收一侧的公共流程：读入预分配的缓冲区 → 抓包 → 'rx' 事件 → 分帧 → 输出帧
+
+SerialEngine（独立线程）、PortHub（selector I/O线程）和 AsyncSerialPort（事件循环）
+读取串口的方式不同，读到数据之后的处理都由 FrameReceiver 完成。
+"""
+
+import time
+import logging
+from typing import Optional, Dict, Any, Callable
+
+from .buffer import ReceiveBuffer
+from .framing import Framer, create_framer
+from .store import RECV
+
+logger = logging.getLogger(__name__)
+
+
+class FrameReceiver:
+    """一个串口的接收缓冲与分帧
+
+    owner 为 SerialEngine、PortSession 或 AsyncSerialPort，需要提供 settings、capture、port、
+    recv_count、emit、log 和 _flush_frame(data)。配置了协议分帧时由分帧器切分；
+    否则数据留在缓冲区中，由调用方在分帧时刻（deadline）调用 expire 输出，缓冲区满时立即输出。
+    """
+
+    def __init__(self, owner, framing: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.owner = owner
+        self.clock = clock
+        self.buffer = ReceiveBuffer(owner.settings.max_frame_size)
+        self.last_data_time = 0.0
+        try:
+            self.framer: Optional[Framer] = create_framer(framing, owner.settings.max_frame_size)
+        except Exception as e:
+            logger.error(f"分帧配置错误: {e}")
+            owner.log(f'分帧配置错误，按时间间隔分帧: {e}')
+            self.framer = None
+
+    def __len__(self) -> int:
+        """缓冲区中待分帧的字节数"""
+        return len(self.buffer)
+
+    @property
+    def dropped(self) -> int:
+        """分帧器因超长或格式错误丢弃的字节数"""
+        return self.framer.dropped if self.framer is not None else 0
+
+    @property
+    def deadline(self) -> float:
+        """按时间间隔分帧时，缓冲区中的数据应输出的时刻"""
+        return self.last_data_time + self.owner.settings.split_interval
+
+    def read(self, readinto: Callable[[memoryview], int], count: Optional[int] = None) -> Optional[int]:
+        """调用 readinto 读入最多 count 字节（默认为缓冲区剩余空间）并处理
+
+        返回读到的字节数；非阻塞描述符暂时无数据（BlockingIOError）时返回None。
+        对描述符而言返回0表示已断开，由调用方处理。
+        """
+        buffer = self.buffer
+        owner = self.owner
+        # 在帧边界处应用新的最大帧长
+        max_frame_size = owner.settings.max_frame_size
+        if not len(buffer) and buffer.size != max_frame_size:
+            buffer.resize(max_frame_size)
+
+        try:
+            n = buffer.fill(readinto, buffer.free if count is None else count)
+        except BlockingIOError:
+            return None
+        if not n:
+            return n
+
+        owner.recv_count += n
+        if owner.capture is not None:
+            owner.capture.record(RECV, buffer.peek()[-n:], owner.port)
+        if owner._listeners['rx']:
+            owner.emit('rx', bytes(buffer.peek()[-n:]))
+        self.last_data_time = self.clock()
+
+        framer = self.framer
+        if framer is not None:
+            try:
+                for frame in framer.feed(buffer.peek()):
+                    owner._flush_frame(frame)
+            finally:
+                buffer.clear()  # 分帧器出错时也不能把同一批数据再输入一次
+        elif buffer.full:
+            owner._flush_frame(buffer.take())
+        return n
+
+    def expire(self):
+        """到达分帧时刻（或关闭前），输出缓冲区中的数据"""
+        if len(self.buffer):
+            self.owner._flush_frame(self.buffer.take())
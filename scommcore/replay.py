@@ -0,0 +1,307 @@
+"""
+回放录制的接收数据，离线评估分帧与解析脚本的处理能力：
+
+    python -m scommcore.replay capture.scap --usercfg usercfg.json
+    python -m scommcore.replay scommlog.txt --framing '{"type": "slip"}' --realtime
+
+数据源可以是二进制抓包文件（.scap），也可以是"保存文件"导出的文本记录或每行一段HEX的日志。
+"""
+
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+from typing import Optional, Dict, Any, Iterator, Iterable, List, Callable, Tuple
+
+from .capture import CaptureReader, MAGIC
+from .framing import create_framer, framing_for_port
+from .buffer import ReceiveBuffer
+from .settings import Settings
+from .store import RECV
+from .unpack import UnpackScript, run_scripts_batch, load_scripts
+from .pool import UnpackPool, MODES
+
+logger = logging.getLogger(__name__)
+
+# 文本记录中的一行：[时间] < 内容
+_LOG_LINE = re.compile(r'^(?:\[(?P<ts>[^\]]+)\]\s*)?(?:(?P<dir>[<>])\s)?(?P<body>.*)$')
+# 开头连续的HEX字节，如 '01 02 03 04' 或 '01020304'，之后为空白或行尾
+_HEX_RUN = re.compile(r'\s*((?:[0-9A-Fa-f]{2})+(?:[ \t]+(?:[0-9A-Fa-f]{2})+)*)(?=\s|$)')
+
+
+def iter_capture(path: str, port: Optional[str] = None) -> Iterator[Tuple[float, bytes]]:
+    """从抓包文件中读取接收数据块 (时间戳秒, 数据)"""
+    for record in CaptureReader(path):
+        if record.direction == RECV and (port is None or record.port == port):
+            yield record.mono_ns / 1e9, record.data
+
+
+def _parse_body(body: str, is_hex: Optional[bool], encoding: str, hex_before: bool = False) -> Tuple[bytes, bool]:
+    """解析文本记录中的数据部分，返回 (数据, 是否按HEX解析)
+
+    HEX模式下"保存文件"会在数据后附加解析脚本的输出（如 '01 02 03 04 v=1027'），
+    只取开头连续的HEX字节，其余部分作为解析结果忽略。
+    is_hex 为None时自动判断：整行为HEX，或开头的HEX字节后跟着解析结果且至少两个字节
+    （上一行为HEX时一个字节也可以），按HEX解析，否则按文本编码。
+    is_hex 为True而开头没有HEX字节时返回空数据。
+    """
+    if is_hex is not False:
+        match = _HEX_RUN.match(body)
+        if match is not None:
+            data = bytes.fromhex(match.group(1))
+            if is_hex or hex_before or len(data) >= 2 or not body[match.end():].strip():
+                return data, True
+        elif is_hex:
+            return b'', True
+    return body.encode(encoding, 'ignore'), False
+
+
+def iter_text_log(path: str, is_hex: Optional[bool] = None, encoding: str = 'utf-8') -> Iterator[Tuple[float, bytes]]:
+    """从文本记录中读取接收数据，每行一段
+
+    带 [时间] 前缀的行按该时间回放；发送方向（>）的行被跳过。
+    is_hex 为None时自动判断每行是否为HEX；同一文件中既有HEX行又有按文本解析的行时输出警告。
+    """
+    last_ts = 0.0
+    hex_lines = 0
+    hex_before = False
+    text_lines: List[int] = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+            match = _LOG_LINE.match(line)
+            if match.group('dir') == '>':
+                continue
+            if match.group('ts'):
+                try:
+                    stamp = datetime.datetime.strptime(match.group('ts'), '%Y-%m-%d %H:%M:%S.%f')
+                    last_ts = stamp.timestamp()
+                except ValueError:
+                    pass
+            data, parsed_hex = _parse_body(match.group('body'), is_hex, encoding, hex_before)
+            hex_before = parsed_hex
+            if parsed_hex:
+                hex_lines += 1
+                if not data:
+                    logger.warning(f'{path}:{lineno}: 不是HEX数据，已跳过')
+            else:
+                text_lines.append(lineno)
+            if data:
+                yield last_ts, data
+    if hex_lines and text_lines:
+        shown = ', '.join(map(str, text_lines[:5])) + (' ...' if len(text_lines) > 5 else '')
+        logger.warning(f'{path}: {len(text_lines)} 行不是HEX数据，已按文本编码回放（第 {shown} 行）')
+
+
+def open_source(path: str, **kwargs) -> Iterator[Tuple[float, bytes]]:
+    """按文件内容选择数据源"""
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return iter_capture(path, kwargs.get('port'))
+    return iter_text_log(path, kwargs.get('is_hex'), kwargs.get('encoding', 'utf-8'))
+
+
+class ReplayStats:
+    """回放统计"""
+
+    STAGES = ('source', 'framing', 'unpack', 'sink')
+
+    def __init__(self):
+        self.chunks = 0
+        self.bytes = 0
+        self.frames = 0
+        self.elapsed = 0.0
+        self.stage_time: Dict[str, float] = {stage: 0.0 for stage in self.STAGES}
+
+    def report(self) -> str:
+        """生成可读的统计报告"""
+        elapsed = self.elapsed or 1e-9
+        lines = [
+            f'数据块 {self.chunks}  帧 {self.frames}  字节 {self.bytes}  耗时 {self.elapsed:.3f} s',
+            f'{self.frames / elapsed:,.0f} 帧/秒  {self.bytes / elapsed:,.0f} 字节/秒'
+            f'（约合 {self.bytes * 10 / elapsed:,.0f} 波特）',
+        ]
+        for stage in self.STAGES:
+            spent = self.stage_time[stage]
+            lines.append(f'  {stage:8s} {spent * 1000:10.1f} ms  {spent / elapsed * 100:5.1f}%')
+        return '\n'.join(lines)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed or 1e-9
+        return {
+            'chunks': self.chunks, 'bytes': self.bytes, 'frames': self.frames,
+            'elapsed': self.elapsed, 'frames_per_s': self.frames / elapsed,
+            'bytes_per_s': self.bytes / elapsed, 'stage_time': dict(self.stage_time),
+        }
+
+
+class Replayer:
+    """把录制的接收数据送入与实时接收相同的分帧、解析流程"""
+
+    def __init__(self, settings: Settings = Settings(), framing: Optional[Dict[str, Any]] = None,
+                 scripts: Iterable[UnpackScript] = (), sink: Optional[Callable[[bytes, str], None]] = None,
+                 pool: Optional[Dict[str, Any]] = None):
+        self.settings = settings
+        self.framing = framing
+        self.scripts = list(scripts)
+        self.sink = sink  # (frame, note) -> None
+        self.pool = pool  # UnpackPool 的参数（mode、workers、batch_size），None 表示在回放线程中执行脚本
+        self.stats = ReplayStats()
+        self._pool: Optional[UnpackPool] = None
+
+    def run(self, source: Iterable[Tuple[float, bytes]], realtime: bool = False) -> ReplayStats:
+        """回放数据源，realtime为True时按原始时间间隔回放，否则尽快处理"""
+        stats = self.stats = ReplayStats()
+        stage = stats.stage_time
+        clock = time.perf_counter
+
+        framer = create_framer(self.framing, self.settings.max_frame_size)
+        buffer = ReceiveBuffer(self.settings.max_frame_size)
+        split = self.settings.split_interval
+        last_ts = None
+        origin = None  # (录制时间, 回放开始时间)
+
+        if self.pool is not None:
+            self._pool = UnpackPool(self._pool_sink, **self.pool)
+
+        start = clock()
+        iterator = iter(source)
+        while True:
+            t0 = clock()
+            try:
+                ts, data = next(iterator)
+            except StopIteration:
+                stage['source'] += clock() - t0
+                break
+            stage['source'] += clock() - t0
+
+            if realtime:
+                if origin is None:
+                    origin = (ts, time.monotonic())
+                delay = origin[1] + (ts - origin[0]) - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            stats.chunks += 1
+            stats.bytes += len(data)
+
+            t0 = clock()
+            frames = []
+            if framer is not None:
+                frames = framer.feed(data)
+            else:
+                # 按录制时间戳模拟分帧间隔与最大帧长
+                if len(buffer) and last_ts is not None and ts - last_ts >= split:
+                    frames.append(buffer.take())
+                view = memoryview(data)
+                while view:
+                    n = buffer.extend(view)
+                    view = view[n:]
+                    if buffer.full:
+                        frames.append(buffer.take())
+            last_ts = ts
+            stage['framing'] += clock() - t0
+
+            self._deliver(frames)
+
+        if framer is None and len(buffer):
+            self._deliver([buffer.take()])
+
+        if self._pool is not None:
+            # 等待执行池输出全部结果，计入解析阶段
+            t0 = clock()
+            self._pool.close()
+            self._pool = None
+            stage['unpack'] += clock() - t0
+
+        stats.elapsed = clock() - start
+        return stats
+
+    def _deliver(self, frames: List[bytes]):
+        """对每帧执行解析脚本并交给sink"""
+        stage = self.stats.stage_time
+        clock = time.perf_counter
+        if self._pool is not None:
+            t0 = clock()
+            for frame in frames:
+                self._pool.submit(frame, self.scripts)
+            stage['unpack'] += clock() - t0
+            return
+        if not frames:
+            return
+        # 同一数据块切出的帧一起解析，帧结构脚本整批解码
+        t0 = clock()
+        notes = run_scripts_batch(self.scripts, frames)
+        t1 = clock()
+        if self.sink is not None:
+            for frame, note in zip(frames, notes):
+                self.sink(frame, note)
+        stage['unpack'] += t1 - t0
+        stage['sink'] += clock() - t1
+        self.stats.frames += len(frames)
+
+    def _pool_sink(self, frame: bytes, note: str, ts):
+        """执行池的收集线程按顺序输出结果"""
+        if self.sink is not None:
+            self.sink(frame, note)
+        self.stats.frames += 1
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog='scommcore.replay', description='回放录制的接收数据并统计处理能力')
+    parser.add_argument('file', help='抓包文件（.scap）或文本记录')
+    parser.add_argument('--usercfg', help='从usercfg.json读取解析脚本、分帧配置和最大帧长')
+    parser.add_argument('--script', action='append', help='只使用指定的解析脚本，如 btn-unpack01，可重复')
+    parser.add_argument('--framing', type=json.loads, help='协议分帧配置（JSON），覆盖usercfg中的设置')
+    parser.add_argument('--port', help='只回放抓包文件中指定串口的数据')
+    parser.add_argument('--split', type=float, default=99, help='分帧间隔（毫秒）')
+    parser.add_argument('--max-frame', type=int, help='最大帧长（字节）')
+    parser.add_argument('--pool', choices=MODES, help='在进程池或线程池中执行解析脚本')
+    parser.add_argument('--workers', type=int, help='执行池的工作者数量，默认为CPU核数')
+    parser.add_argument('--realtime', action='store_true', help='按原始时间间隔回放')
+    parser.add_argument('--print', dest='show', action='store_true', help='输出每帧的解析结果')
+    parser.add_argument('--json', action='store_true', help='以JSON输出统计结果')
+    args = parser.parse_args(argv)
+
+    usercfg: Dict[str, Any] = {}
+    if args.usercfg:
+        with open(args.usercfg, 'r', encoding='utf-8') as f:
+            usercfg = json.load(f)
+
+    max_frame = args.max_frame or int(usercfg.get('maxframe', 1024))
+    settings = Settings(split_interval=args.split / 1000.0, max_frame_size=max_frame)
+    framing = args.framing
+    if framing is None:
+        framing = framing_for_port(usercfg.get('framing'), args.port)
+
+    sink = None
+    if args.show:
+        sink = lambda frame, note: sys.stdout.write(f'{frame.hex(" ").upper()}{note}\n')
+
+    pool = {'mode': args.pool, 'workers': args.workers} if args.pool else None
+    replayer = Replayer(settings, framing, load_scripts(usercfg, args.script), sink, pool)
+    stats = replayer.run(open_source(args.file, port=args.port), realtime=args.realtime)
+
+    if args.json:
+        result = stats.as_dict()
+        result['scripts'] = {script.name: script.stats.as_dict() for script in replayer.scripts}
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print(stats.report())
+        for script in replayer.scripts:
+            s = script.stats
+            print(f'  {script.name:14s} 平均 {s.mean * 1e6:8.1f} us  p99 {s.p99 * 1e6:8.0f} us  错误 {s.errors}')
+            if s.last_error:
+                print('    ' + s.last_error.strip().splitlines()[-1])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+周期发送的调度：按单调时钟上的绝对时刻触发
+
+每个任务第k次的触发时刻为 start + k * period，发送耗时和线程唤醒延迟不会累积成漂移。
+落后超过一个周期时跳过错过的触发（计入 missed），按原来的节拍继续，不会补发一串。
+每次触发记录实际时刻相对计划时刻的延迟（抖动），用于评估周期是否准确。
+
+    engine.add_schedule('poll-01', Packet(bytes.fromhex('01 03 00 00 00 0A C5 CD')), 0.005)
+    engine.scheduler.stats()  # {'poll-01': {'count': ..., 'missed': ..., 'late_us': {...}}}
+"""
+
+import time
+import threading
+from typing import Optional, Dict, Any, List, Callable
+
+from .metrics import Histogram
+
+MIN_PERIOD = 0.001  # 最小周期1ms
+
+
+class Job:
+    """一个周期任务"""
+
+    def __init__(self, name: str, packet, period: float, deadline: float):
+        self.name = name
+        self.packet = packet
+        self.period = max(MIN_PERIOD, period)
+        self.deadline = deadline  # 下一次触发的计划时刻
+        self.count = 0  # 触发次数
+        self.missed = 0  # 因落后超过一个周期而跳过的次数
+        self.lateness = Histogram()  # 实际触发时刻相对计划时刻的延迟（微秒）
+
+    def stats(self) -> Dict[str, Any]:
+        late = self.lateness
+        return {
+            'period_ms': self.period * 1000,
+            'count': self.count,
+            'missed': self.missed,
+            'late_us': {
+                'mean': late.total / late.count if late.count else 0,
+                'p50': late.percentile(50), 'p99': late.percentile(99), 'max': late.max,
+            },
+        }
+
+
+class Scheduler:
+    """按绝对时刻触发的周期任务集合
+
+    add/remove 可以在任意线程调用；due 和 next_deadline 由发送线程调用。
+    spin 大于0时，发送线程在计划时刻前 spin 秒结束等待并忙等到计划时刻，
+    可以消除大部分线程唤醒延迟，代价是占用CPU，适合1ms级的周期。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, spin: float = 0.0):
+        self.clock = clock
+        self.spin = spin
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, packet, period: float, phase: float = 0.0):
+        """添加或更新任务，首次触发在 phase 秒之后
+
+        同名任务已存在且周期不变时只替换数据包，保持原来的节拍。
+        """
+        with self._lock:
+            job = self.jobs.get(name)
+            if job is not None and job.period == max(MIN_PERIOD, period):
+                job.packet = packet
+                return
+            self.jobs[name] = Job(name, packet, period, self.clock() + phase)
+
+    def remove(self, name: str):
+        with self._lock:
+            self.jobs.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self.jobs.clear()
+
+    def restart(self):
+        """从当前时刻重新开始各任务的节拍并清空统计（串口重新打开时调用）"""
+        with self._lock:
+            now = self.clock()
+            for name, job in self.jobs.items():
+                self.jobs[name] = Job(name, job.packet, job.period, now + job.period)
+
+    def next_deadline(self) -> Optional[float]:
+        """最近的计划时刻，没有任务时返回None"""
+        with self._lock:
+            return min((job.deadline for job in self.jobs.values()), default=None)
+
+    def spin_until(self, deadline: float):
+        """忙等到指定时刻"""
+        clock = self.clock
+        while clock() < deadline:
+            pass
+
+    def due(self, now: Optional[float] = None) -> List[Job]:
+        """取出已到时刻的任务（按计划时刻排序），并推进各自的下一次时刻"""
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            jobs = sorted((job for job in self.jobs.values() if job.deadline <= now),
+                          key=lambda job: job.deadline)
+            for job in jobs:
+                late = now - job.deadline
+                job.lateness.add(late * 1e6)
+                job.count += 1
+                job.deadline += job.period
+                if job.deadline <= now:
+                    # 落后超过一个周期：跳到当前时刻之后的下一个节拍
+                    skipped = int((now - job.deadline) // job.period) + 1
+                    job.missed += skipped
+                    job.deadline += skipped * job.period
+        return jobs
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各任务的触发次数、跳过次数和延迟统计"""
+        with self._lock:
+            return {name: job.stats() for name, job in self.jobs.items()}
@@ -0,0 +1,486 @@
+"""
+收发序列：按步骤发送数据并等待应答，用于产线检测和自动化测试
+
+    python -m scommcore.sequence /dev/ttyUSB0 -b 115200 check.json --usercfg usercfg.json
+
+序列文件是步骤列表（或 {"steps": [...]}），每一步可以发送、等待应答，或跳转：
+
+    [
+        {"name": "握手", "text": "AT\\r\\n", "expect": {"bytes": "4F 4B"}, "timeout": 200, "retry": 2},
+        {"name": "读版本", "preset": "btn-data01", "expect": {"regex": "V\\\\d+\\\\.\\\\d+"}},
+        {"label": "poll", "name": "读温度", "send": "01 03 00 00 00 01 84 0A",
+         "expect": {"layout": "btn-unpack03", "where": "temp < 60"}, "on_fail": "cool"},
+        {"goto": "poll", "times": 9},
+        {"end": "pass"},
+        {"label": "cool", "name": "降温", "send": "01 06 00 01 00 00 D8 0A", "delay": 100},
+        {"end": "fail"}
+    ]
+
+- send / text / preset：HEX数据、文本（按 encoding 编码）或 usercfg 中的预置数据
+- expect：收到的帧包含 bytes（HEX）、匹配 regex，或按帧结构解码后满足 where 表达式
+- timeout：等待应答的毫秒数；retry：超时后重新发送的次数；delay：发送前等待的毫秒数
+- on_pass / on_fail：成功或失败后跳转的标签，on_fail 默认为 "abort"（结束并判定失败），"next" 表示继续
+- goto / times：跳转到标签，指定 times 时最多跳转这么多次后继续向下执行；
+  不带 times 的循环中至少要有一步等待应答或 delay，否则编译时报错
+- end："pass" 或 "fail"，结束序列
+
+应答的判断在引擎的接收线程中进行，匹配后立即发出下一步的数据，不经过其他线程。
+"""
+
+import re
+import sys
+import json
+import time
+import struct
+import logging
+import argparse
+import threading
+from typing import Optional, Dict, Any, List, NamedTuple, Callable, Sequence
+
+from .engine import SerialEngine, Packet
+from .settings import Settings, parse_ms
+from .decoder import FrameLayout
+from .framing import framing_for_port
+from .preset import build_packet
+
+logger = logging.getLogger(__name__)
+
+# 判断一帧是否为期望的应答
+Matcher = Callable[[bytes], bool]
+
+
+class Step(NamedTuple):
+    """编译好的一个步骤"""
+    name: str
+    label: Optional[str] = None
+    packet: Optional[Packet] = None
+    expect: Optional[Matcher] = None
+    timeout: float = 1.0
+    retry: int = 0
+    delay: float = 0.0
+    on_pass: Optional[str] = None
+    on_fail: str = 'abort'
+    goto: Optional[str] = None
+    times: Optional[int] = None
+    end: Optional[str] = None
+
+
+class StepResult(NamedTuple):
+    """一个步骤一次执行的结果"""
+    index: int
+    name: str
+    ok: bool
+    attempts: int  # 发送次数（含重试）
+    elapsed: float  # 从（最后一次）发送到收到应答或超时的秒数
+    start: float  # 相对序列开始的秒数
+    frame: Optional[bytes] = None
+    error: str = ''
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.index, 'name': self.name, 'ok': self.ok, 'attempts': self.attempts,
+            'elapsed_ms': self.elapsed * 1000, 'start_ms': self.start * 1000,
+            'frame': self.frame.hex(' ').upper() if self.frame is not None else None,
+            'error': self.error,
+        }
+
+
+class SequenceResult(NamedTuple):
+    """整个序列的执行结果"""
+    ok: bool
+    steps: List[StepResult]
+    elapsed: float
+    error: str = ''
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'ok': self.ok, 'elapsed_ms': self.elapsed * 1000, 'error': self.error,
+                'steps': [step.as_dict() for step in self.steps]}
+
+    def report(self) -> str:
+        lines = []
+        for step in self.steps:
+            line = (f"{'PASS' if step.ok else 'FAIL'}  {step.name:16s} {step.elapsed * 1000:9.3f} ms"
+                    f"  发送 {step.attempts} 次")
+            if step.error:
+                line += f'  {step.error}'
+            lines.append(line)
+        lines.append(f"{'通过' if self.ok else '失败'}，共 {self.elapsed * 1000:.1f} ms"
+                     + (f'：{self.error}' if self.error else ''))
+        return '\n'.join(lines)
+
+
+def compile_expect(spec: Any, usercfg: Optional[Dict[str, Any]] = None) -> Matcher:
+    """把 expect 配置转换为判断函数
+
+    spec 可以是 {"bytes": HEX}、{"regex": 正则}、{"layout": 帧结构或btn-unpackNN, "where": 表达式}，
+    在Python中使用时也可以直接传入 bytes、已编译的正则或函数。
+    """
+    if callable(spec):
+        return spec
+    if isinstance(spec, (bytes, bytearray)):
+        pattern = bytes(spec)
+        return lambda frame: pattern in frame
+    if isinstance(spec, re.Pattern):
+        return lambda frame: spec.search(frame) is not None
+    if not isinstance(spec, dict):
+        raise ValueError(f'不支持的expect配置: {spec!r}')
+
+    if 'bytes' in spec:
+        pattern = bytes.fromhex(spec['bytes'])
+        return lambda frame: pattern in frame
+    if 'regex' in spec:
+        regex = re.compile(spec['regex'].encode('utf-8'))
+        return lambda frame: regex.search(frame) is not None
+    if 'layout' in spec:
+        layout_config = spec['layout']
+        if isinstance(layout_config, str):  # 引用解析脚本按钮中的帧结构
+            layout_config = (usercfg or {}).get(layout_config, {}).get('layout')
+            if layout_config is None:
+                raise ValueError(f"找不到帧结构: {spec['layout']}")
+        layout = FrameLayout.from_config(layout_config)
+        where = compile(spec.get('where', 'True'), '<where>', 'eval')
+
+        def match(frame: bytes) -> bool:
+            if len(frame) < layout.size:
+                return False
+            try:
+                return bool(eval(where, {}, layout.decode(frame)))
+            except (struct.error, ArithmeticError, NameError, TypeError):
+                return False
+        return match
+    raise ValueError(f'不支持的expect配置: {spec!r}')
+
+
+def compile_steps(config: Sequence[Dict[str, Any]], usercfg: Optional[Dict[str, Any]] = None,
+                  settings: Settings = Settings()) -> List[Step]:
+    """编译序列配置，预置数据和帧结构从 usercfg 中查找，配置错误时抛出 ValueError"""
+    usercfg = usercfg or {}
+    user_vars = str(usercfg.get('uservar', '')).split(',')
+    steps = []
+    for index, item in enumerate(config):
+        packet = None
+        if 'send' in item:
+            packet = Packet(bytes.fromhex(item['send']))
+        elif 'text' in item:
+            packet = Packet(item['text'].encode(settings.encoding, 'ignore'))
+        elif 'preset' in item:
+            preset = usercfg.get(item['preset'])
+            if not preset:
+                raise ValueError(f"找不到预置数据: {item['preset']}")
+            packet = build_packet(preset, user_vars, settings)
+        if packet is not None and ('rts' in item or 'dtr' in item):
+            packet = packet._replace(rts=item.get('rts'), dtr=item.get('dtr'))
+
+        end = item.get('end')
+        if end not in (None, 'pass', 'fail'):
+            raise ValueError(f'第{index + 1}步: end 只能是 pass 或 fail')
+        steps.append(Step(
+            name=str(item.get('name', item.get('label') or f'step{index + 1}')),
+            label=item.get('label'),
+            packet=packet,
+            expect=compile_expect(item['expect'], usercfg) if 'expect' in item else None,
+            timeout=parse_ms(item.get('timeout', 1000), 1.0),
+            retry=int(item.get('retry', 0)),
+            delay=parse_ms(item.get('delay', 0), 0.0),
+            on_pass=item.get('on_pass'),
+            on_fail=item.get('on_fail', 'abort'),
+            goto=item.get('goto'),
+            times=int(item['times']) if item.get('times') is not None else None,
+            end=end,
+        ))
+
+    labels = {step.label for step in steps if step.label}
+    for index, step in enumerate(steps):
+        if step.goto is not None and step.goto not in labels:
+            raise ValueError(f'第{index + 1}步: 找不到标签 {step.goto}')
+        for target in (step.on_pass, step.on_fail):
+            if target is not None and target not in labels and target not in ('abort', 'next'):
+                raise ValueError(f'第{index + 1}步: 找不到标签 {target}')
+    check_loops(steps)
+    return steps
+
+
+def check_loops(steps: Sequence[Step]):
+    """检查跳转是否会形成不等待的无限循环，有则抛出 ValueError
+
+    执行器在一次推进中连续执行不需要等待的步骤，只有等待应答或 delay 时才释放锁、检查序列超时。
+    如果存在一个环，环上没有等待的步骤，也不经过带 times 的 goto 的跳转，序列会一直占用接收线程。
+    """
+    labels = {step.label: index for index, step in enumerate(steps) if step.label}
+
+    def successors(index: int) -> List[int]:
+        step = steps[index]
+        if step.end is not None or step.expect is not None or step.delay > 0:
+            return []  # 结束或等待，不会在一次推进中继续
+        if step.goto is not None:
+            # 有次数限制的跳转最终会向下执行，只有向下的一支可能无限循环
+            return [index + 1] if step.times is not None else [labels[step.goto]]
+        if step.on_pass in (None, 'next'):
+            return [index + 1]
+        if step.on_pass == 'abort':
+            return []
+        return [labels[step.on_pass]]
+
+    state = [0] * len(steps)  # 0 未访问，1 正在访问，2 已完成
+    for first in range(len(steps)):
+        if state[first]:
+            continue
+        state[first] = 1
+        stack = [(first, iter(successors(first)))]
+        while stack:
+            index, nexts = stack[-1]
+            for target in nexts:
+                if target >= len(steps) or state[target] == 2:
+                    continue
+                if state[target] == 1:
+                    raise ValueError(f'第{index + 1}步: 跳转到第{target + 1}步形成不等待应答或延时的无限循环')
+                state[target] = 1
+                stack.append((target, iter(successors(target))))
+                break
+            else:
+                state[index] = 2
+                stack.pop()
+
+
+class SequenceRunner:
+    """在 SerialEngine 上执行收发序列
+
+    应答在引擎的接收线程中判断，匹配后在同一线程中推进到下一步并放入发送队列；
+    调用 run 的线程只负责超时和 delay 计时。
+    """
+
+    def __init__(self, engine: SerialEngine, steps: List[Step]):
+        self.engine = engine
+        self.steps = steps
+        check_loops(steps)
+        self._labels = {step.label: index for index, step in enumerate(steps) if step.label}
+        self._cond = threading.Condition(threading.RLock())
+        self._clock = time.perf_counter
+
+    def run(self, timeout: Optional[float] = None) -> SequenceResult:
+        """执行序列直到结束，timeout 为整个序列的超时秒数"""
+        clock = self._clock
+        self._results: List[StepResult] = []
+        self._loops: Dict[int, int] = {}  # goto 步骤已跳转的次数
+        self._pc = 0
+        self._state = ''  # 'delay' 或 'expect' 表示正在等待
+        self._deadline: Optional[float] = None
+        self._attempts = 0
+        self._sent_at = 0.0
+        self._done: Optional[bool] = None
+        self._error = ''
+        self._start = clock()
+        limit = self._start + timeout if timeout is not None else None
+
+        self.engine.subscribe('recv', self._on_recv)
+        try:
+            with self._cond:
+                self._advance()
+                while self._done is None:
+                    now = clock()
+                    if limit is not None and now >= limit:
+                        self._finish(False, '序列超时')
+                        break
+                    if self._deadline is not None and now >= self._deadline:
+                        self._on_deadline(now)
+                        continue
+                    wait = None if self._deadline is None else self._deadline - now
+                    if limit is not None:
+                        wait = limit - now if wait is None else min(wait, limit - now)
+                    self._cond.wait(wait)
+        finally:
+            self.engine.unsubscribe('recv', self._on_recv)
+        return SequenceResult(bool(self._done), self._results, clock() - self._start, self._error)
+
+    # ---- 以下方法在持有锁时调用 ----
+
+    def _finish(self, ok: bool, error: str = ''):
+        self._done = ok
+        self._error = error
+        self._state = ''
+        self._deadline = None
+        self._cond.notify_all()
+
+    def _jump(self, target: Optional[str], default: int):
+        """按跳转目标设置下一步"""
+        if target is None or target == 'next':
+            self._pc = default
+        elif target == 'abort':
+            self._pc = -1
+        else:
+            self._pc = self._labels[target]
+
+    def _record(self, ok: bool, elapsed: float, frame: Optional[bytes] = None, error: str = ''):
+        step = self.steps[self._pc]
+        self._results.append(StepResult(self._pc, step.name, ok, self._attempts, elapsed,
+                                        self._sent_at - self._start, frame, error))
+
+    def _send(self, step: Step):
+        self._attempts += 1
+        self._sent_at = self._clock()
+        if step.packet is not None:
+            self.engine.send(step.packet.data, step.packet.rts, step.packet.dtr)
+
+    def _advance(self):
+        """从当前步骤开始执行，直到需要等待或序列结束"""
+        while self._done is None:
+            if self._pc < 0:
+                self._finish(False, f'{self._results[-1].name} 失败' if self._results else '')
+                return
+            if self._pc >= len(self.steps):
+                self._finish(True)
+                return
+            step = self.steps[self._pc]
+            if step.end is not None:
+                self._finish(step.end == 'pass', '' if step.end == 'pass' else f'{step.name} 判定失败')
+                return
+            if step.goto is not None:
+                count = self._loops.get(self._pc, 0)
+                if step.times is None or count < step.times:
+                    self._loops[self._pc] = count + 1
+                    self._pc = self._labels[step.goto]
+                else:
+                    self._loops[self._pc] = 0
+                    self._pc += 1
+                continue
+
+            self._attempts = 0
+            if step.delay > 0 and self._state != 'delay':
+                self._state = 'delay'
+                self._deadline = self._clock() + step.delay
+                self._cond.notify_all()
+                return
+            self._send(step)
+            if step.expect is not None:
+                self._state = 'expect'
+                self._deadline = self._sent_at + step.timeout
+                self._cond.notify_all()
+                return
+            self._state = ''
+            self._deadline = None
+            self._record(True, 0.0)
+            self._jump(step.on_pass, self._pc + 1)
+
+    def _on_deadline(self, now: float):
+        """delay 结束或等待应答超时"""
+        step = self.steps[self._pc]
+        if self._state == 'delay':
+            self._state = ''
+            self._send(step)
+            if step.expect is not None:
+                self._state = 'expect'
+                self._deadline = self._sent_at + step.timeout
+                return
+            self._deadline = None
+            self._record(True, 0.0)
+            self._jump(step.on_pass, self._pc + 1)
+        elif self._attempts <= step.retry:
+            self._send(step)  # 重试
+            self._deadline = self._sent_at + step.timeout
+            return
+        else:
+            self._state = ''
+            self._deadline = None
+            self._record(False, now - self._sent_at, error='超时')
+            self._jump(step.on_fail, self._pc + 1)
+        self._advance()
+
+    # ---- 接收线程 ----
+
+    def _on_recv(self, frame: bytes):
+        with self._cond:
+            if self._state != 'expect':
+                return
+            step = self.steps[self._pc]
+            try:
+                matched = step.expect(frame)
+            except Exception as e:
+                logger.error(f"判断应答出错: {e}")
+                matched = False
+            if not matched:
+                return
+            self._state = ''
+            self._deadline = None
+            self._record(True, self._clock() - self._sent_at, frame)
+            self._jump(step.on_pass, self._pc + 1)
+            self._advance()
+            self._cond.notify_all()
+
+
+def load_sequence(path: str) -> List[Dict[str, Any]]:
+    """读取序列文件：步骤列表或 {"steps": [...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if isinstance(config, dict):
+        config = config.get('steps', [])
+    if not isinstance(config, list):
+        raise ValueError('序列文件应为步骤列表')
+    return config
+
+
+def main(argv=None) -> int:
+    """命令行入口，全部通过时返回0"""
+    parser = argparse.ArgumentParser(prog='scommcore.sequence', description='执行收发序列（产线检测、自动化测试）')
+    parser.add_argument('port', help='串口设备')
+    parser.add_argument('sequence', help='序列文件（JSON）')
+    parser.add_argument('-b', '--baud', type=int, default=9600, help='波特率')
+    parser.add_argument('--usercfg', help='从usercfg.json读取预置数据、帧结构和分帧配置')
+    parser.add_argument('--split', type=float, default=20, help='分帧间隔（毫秒）')
+    parser.add_argument('--max-frame', type=int, default=1024, help='最大帧长（字节）')
+    parser.add_argument('--framing', type=json.loads, default=None, help='协议分帧配置（JSON），覆盖usercfg中的设置')
+    parser.add_argument('--encoding', default='utf-8', help='text 步骤的编码')
+    parser.add_argument('--repeat', type=int, default=1, help='重复执行的次数')
+    parser.add_argument('--timeout', type=float, help='每次执行的总超时（秒）')
+    parser.add_argument('--report', metavar='FILE', help='把每次执行的结果追加写入JSON Lines文件')
+    parser.add_argument('-q', '--quiet', action='store_true', help='只输出汇总')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出状态消息')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    usercfg: Dict[str, Any] = {}
+    if args.usercfg:
+        with open(args.usercfg, 'r', encoding='utf-8') as f:
+            usercfg = json.load(f)
+    settings = Settings(split_interval=args.split / 1000.0, max_frame_size=args.max_frame, encoding=args.encoding)
+    try:
+        steps = compile_steps(load_sequence(args.sequence), usercfg, settings)
+    except (OSError, ValueError, KeyError, SyntaxError) as e:
+        sys.stderr.write(f'序列配置错误: {e}\n')
+        return 2
+
+    engine = SerialEngine()
+    engine.settings = settings
+    if args.verbose:
+        engine.subscribe('log', logging.getLogger('scommcore').info)
+    framing = args.framing
+    if framing is None:
+        framing = framing_for_port(usercfg.get('framing'), args.port)
+    if not engine.open(args.port, args.baud, framing=framing):
+        return 2
+
+    report = open(args.report, 'a', encoding='utf-8') if args.report else None
+    passed = 0
+    try:
+        for i in range(args.repeat):
+            result = SequenceRunner(engine, steps).run(args.timeout)
+            passed += result.ok
+            if not args.quiet:
+                print(result.report())
+            if report is not None:
+                report.write(json.dumps(dict(result.as_dict(), run=i + 1), ensure_ascii=False) + '\n')
+                report.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+        if report is not None:
+            report.close()
+    if args.repeat > 1:
+        print(f'通过 {passed}/{args.repeat}')
+    return 0 if passed == args.repeat else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
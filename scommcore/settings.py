@@ -0,0 +1,29 @@
+from typing import NamedTuple
+
+
+class Settings(NamedTuple):
+    """收发设置快照
+
+    不可变对象，设置变化时整体替换。工作线程每次只读取一次引用，
+    不需要加锁，也不会读到改了一半的设置。
+    """
+    split_interval: float = 0.099  # 分帧间隔（秒）
+    max_frame_size: int = 1024  # 最大帧长（字节）
+    cycle: bool = False  # 循环发送
+    cycle_interval: float = 1.0  # 循环发送间隔（秒）
+    send_hex: bool = False  # HEX发送
+    recv_hex: bool = False  # HEX显示
+    show_send: bool = True  # 发送显示
+    show_time: bool = True  # 收发时间
+    encoding: str = 'utf-8'  # 数据编码
+    append_cr: bool = False  # 追送\r
+    append_lf: bool = False  # 追送\n
+    tx_gap: float = 0.0  # 发送帧间隔（秒），大于0时每包发出后至少间隔这么久再发下一包
+
+
+def parse_ms(text: str, default: float, minimum: float = 0.0) -> float:
+    """解析'99ms'形式的毫秒数，返回秒"""
+    try:
+        return max(minimum, float(str(text).replace('ms', '')) / 1000.0)
+    except ValueError:
+        return default
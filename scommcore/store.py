@@ -0,0 +1,118 @@
+import time
+import array
+import threading
+from typing import Optional, Dict, List, NamedTuple
+
+# 收发方向
+RECV = 0
+SEND = 1
+
+# 每帧除数据本身外的大致内存开销（bytes对象头、列表槽位、时间戳、方向）
+FRAME_OVERHEAD = 56
+
+
+class Frame(NamedTuple):
+    """一帧收发记录"""
+    ts: float
+    direction: int
+    data: bytes
+    note: str = ''
+
+
+class FrameStore:
+    """收发帧的环形存储
+
+    时间戳、方向、数据分别保存在紧凑的并行数组中，按字节预算淘汰最旧的帧。
+    帧按追加顺序编号，get/slice 的下标从当前最旧的一帧开始计数。
+    """
+
+    def __init__(self, budget: int = 64 * 1024 * 1024):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._ts = array.array('d')
+        self._dir = bytearray()
+        self._data: List[bytes] = []
+        self._notes: Dict[int, str] = {}  # 绝对序号 -> 解析脚本输出，大多数帧没有
+        self._head = 0  # 数组中第一个有效帧的位置
+        self._base = 0  # 数组位置0对应的绝对序号
+
+        self.total_bytes = 0
+        self.evicted_frames = 0
+        self.evicted_bytes = 0
+        self.version = 0  # 每次修改递增，供界面判断是否需要刷新
+
+    def __len__(self) -> int:
+        return len(self._data) - self._head
+
+    @property
+    def first_seq(self) -> int:
+        """当前最旧一帧的绝对序号"""
+        return self._base + self._head
+
+    def append(self, direction: int, data: bytes, note: str = '', ts: Optional[float] = None) -> int:
+        """追加一帧，返回其绝对序号"""
+        data = bytes(data)
+        cost = len(data) + len(note) + FRAME_OVERHEAD
+        with self._lock:
+            seq = self._base + len(self._data)
+            self._ts.append(time.time() if ts is None else ts)
+            self._dir.append(direction)
+            self._data.append(data)
+            if note:
+                self._notes[seq] = note
+            self.total_bytes += cost
+            if self.total_bytes > self.budget:
+                self._evict()
+            self.version += 1
+        return seq
+
+    def _evict(self):
+        """淘汰最旧的帧直到满足字节预算（调用方持有锁）"""
+        while self.total_bytes > self.budget and len(self._data) - self._head > 1:
+            seq = self._base + self._head
+            data = self._data[self._head]
+            self._data[self._head] = b''
+            cost = len(data) + len(self._notes.pop(seq, '')) + FRAME_OVERHEAD
+            self.total_bytes -= cost
+            self.evicted_bytes += len(data)
+            self.evicted_frames += 1
+            self._head += 1
+
+        # 已淘汰部分过半时压缩数组，均摊O(1)
+        if self._head > 1024 and self._head * 2 > len(self._data):
+            del self._ts[:self._head]
+            del self._dir[:self._head]
+            del self._data[:self._head]
+            self._base += self._head
+            self._head = 0
+
+    def get(self, index: int) -> Frame:
+        """按下标获取一帧"""
+        with self._lock:
+            if not 0 <= index < len(self._data) - self._head:
+                raise IndexError(index)
+            return self._frame(self._head + index)
+
+    def slice(self, start: int, stop: int) -> List[Frame]:
+        """获取[start, stop)范围内的帧"""
+        with self._lock:
+            count = len(self._data) - self._head
+            start = max(0, start)
+            stop = min(count, stop)
+            return [self._frame(self._head + i) for i in range(start, stop)]
+
+    def _frame(self, pos: int) -> Frame:
+        return Frame(self._ts[pos], self._dir[pos], self._data[pos],
+                     self._notes.get(self._base + pos, ''))
+
+    def clear(self):
+        """清空所有帧"""
+        with self._lock:
+            self._base += len(self._data)
+            self._ts = array.array('d')
+            self._dir = bytearray()
+            self._data = []
+            self._notes.clear()
+            self._head = 0
+            self.total_bytes = 0
+            self.version += 1
@@ -0,0 +1,267 @@
+import json
+import time
+import logging
+import traceback
+from typing import Optional, Dict, Any, Iterable, List, NamedTuple
+
+from .utils import uint16, int16
+from .metrics import Histogram
+from .decoder import FrameLayout, parse_layout
+
+logger = logging.getLogger(__name__)
+
+# 解析脚本中可直接使用的辅助函数
+SCRIPT_HELPERS: Dict[str, Any] = {
+    'uint16': uint16,
+    'int16': int16,
+}
+
+
+class ScriptBudget(NamedTuple):
+    """解析脚本每帧的耗时预算
+
+    limit -- 每帧允许的执行时间（秒）
+    action -- 连续超出预算 strikes 次后的处理：'flag' 只标记为慢，'disable' 停用该脚本
+    """
+    limit: float
+    action: str = 'flag'
+    strikes: int = 3
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional['ScriptBudget']:
+        """usercfg中的 unpack_budget 字段，如 {"ms": 2, "action": "disable"}"""
+        if not config:
+            return None
+        action = config.get('action', 'flag')
+        if action not in ('flag', 'disable'):
+            raise ValueError(f'未知的超时处理方式: {action}')
+        return cls(float(config['ms']) / 1000.0, action, max(1, int(config.get('strikes', 3))))
+
+
+class ScriptStats:
+    """解析脚本的执行统计"""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.errors = 0
+        self.last_error = ''  # 最近一次异常的traceback
+        self.over_budget = 0  # 超出预算的次数
+        self.strikes = 0  # 连续超出预算的次数
+        self.durations = Histogram()  # 微秒
+
+    @property
+    def mean(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+    @property
+    def p99(self) -> float:
+        """执行时间p99（秒，按2的幂分桶的近似值）"""
+        return self.durations.percentile(99) / 1e6
+
+    def merge(self, other: 'ScriptStats'):
+        """累加在其他线程或进程中统计的结果，连续超出预算次数取最新值"""
+        self.calls += other.calls
+        self.total_time += other.total_time
+        self.errors += other.errors
+        if other.last_error:
+            self.last_error = other.last_error
+        self.over_budget += other.over_budget
+        self.strikes = other.strikes
+        self.durations.merge(other.durations)
+
+    def summary(self) -> str:
+        """简短的统计文字"""
+        if not self.calls:
+            return ''
+        text = f'{self.p99 * 1000:.2g}ms'
+        if self.errors:
+            text += f' 错{self.errors}'
+        return text
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls, 'total_time': self.total_time, 'mean': self.mean, 'p99': self.p99,
+            'errors': self.errors, 'over_budget': self.over_budget, 'last_error': self.last_error,
+        }
+
+
+class UnpackScript:
+    """预编译的解析脚本
+
+    脚本源码只在创建时编译一次，之后每帧只执行编译好的代码对象。
+    run_scripts 会记录每个脚本的耗时和异常（stats），超出预算时标记 slow 或设置 disabled。
+    """
+
+    def __init__(self, name: str, source: str, title: Optional[str] = None):
+        self.name = name
+        self.source = source
+        self.title = title or name
+        self._compile(source)
+        self.stats = ScriptStats()
+        self.slow = False  # 曾连续超出预算
+        self.disabled = False  # 因超出预算被停用
+
+    def _compile(self, source: str):
+        self.code = compile(source, f'<{self.name}>', 'eval')
+        self.globals = dict(SCRIPT_HELPERS, __builtins__=__builtins__)
+
+    def reset(self):
+        """清除统计并重新启用"""
+        self.stats = ScriptStats()
+        self.slow = self.disabled = False
+
+    def __call__(self, data: bytes) -> Any:
+        """解析一帧数据"""
+        # 复制预置的全局字典，避免并发调用时互相覆盖data
+        scope = self.globals.copy()
+        scope['data'] = data
+        return eval(self.code, scope)
+
+
+class LayoutScript(UnpackScript):
+    """按声明的帧结构解码（usercfg中带 layout 字段的脚本配置），source 为结构的JSON文本"""
+
+    def _compile(self, source: str):
+        try:
+            self.layout: FrameLayout = parse_layout(source)
+        except (KeyError, TypeError, ValueError) as e:
+            raise SyntaxError(f'帧结构配置错误: {e}') from e
+
+    def values(self, data: bytes) -> Dict[str, Any]:
+        """解码为 {字段名: 值}"""
+        return self.layout.decode(data)
+
+    def __call__(self, data: bytes) -> str:
+        return self.layout.note(data)
+
+
+def script_source(config: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    """脚本配置对应的 (脚本类, 源码)，未配置时返回None"""
+    if not config:
+        return None
+    if config.get('layout'):
+        return LayoutScript, json.dumps(config['layout'], sort_keys=True, ensure_ascii=False)
+    source = config.get('value', '')
+    return (UnpackScript, source) if source.strip() else None
+
+
+class ScriptCache:
+    """按名称缓存已编译的解析脚本，源码变化时自动重新编译"""
+
+    def __init__(self):
+        self._scripts: Dict[str, UnpackScript] = {}
+
+    def get(self, name: str, config: Optional[Dict[str, Any]]) -> Optional[UnpackScript]:
+        """获取编译好的脚本，config为usercfg中的脚本配置"""
+        spec = script_source(config)
+        if spec is None:
+            return None
+
+        cls, source = spec
+        script = self._scripts.get(name)
+        if script is None or type(script) is not cls or script.source != source:
+            try:
+                script = cls(name, source, config.get('title'))
+            except SyntaxError as e:
+                logger.error(f"编译解析脚本 {name} 出错: {e}")
+                self._scripts.pop(name, None)
+                return None
+            self._scripts[name] = script
+        return script
+
+    def cached(self, name: str) -> Optional[UnpackScript]:
+        """已编译的脚本（不触发编译）"""
+        return self._scripts.get(name)
+
+    def invalidate(self, name: Optional[str] = None):
+        """使缓存失效，name为None时清空全部"""
+        if name is None:
+            self._scripts.clear()
+        else:
+            self._scripts.pop(name, None)
+
+
+def run_scripts(scripts: Iterable[Optional[UnpackScript]], data: bytes,
+                budget: Optional[ScriptBudget] = None) -> str:
+    """依次执行解析脚本，拼接输出（与界面显示的处理方式相同）
+
+    脚本出错时忽略其输出，异常记录在 script.stats 中；已停用的脚本跳过。
+    """
+    note = ''
+    clock = time.perf_counter
+    for script in scripts:
+        if not script or script.disabled:
+            continue
+        stats = script.stats
+        start = clock()
+        try:
+            note += script(data) or ''
+        except:  # 与原先一样吞掉脚本中的任何异常（包括exit()），但记录下来
+            stats.errors += 1
+            stats.last_error = traceback.format_exc()
+        elapsed = clock() - start
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.durations.add(elapsed * 1e6)
+
+        if budget is not None:
+            if elapsed > budget.limit:
+                stats.over_budget += 1
+                stats.strikes += 1
+                if stats.strikes >= budget.strikes and not script.slow:
+                    script.slow = True
+                    script.disabled = budget.action == 'disable'
+                    logger.warning(f"解析脚本 {script.name} 连续 {stats.strikes} 帧超出预算 "
+                                   f"{budget.limit * 1000:g}ms" + ('，已停用' if script.disabled else ''))
+            else:
+                stats.strikes = 0
+    return note
+
+
+def run_scripts_batch(scripts: Iterable[Optional[UnpackScript]], frames: List[bytes],
+                      budget: Optional[ScriptBudget] = None) -> List[str]:
+    """对一批帧执行解析脚本，返回每帧的输出，结果与逐帧调用 run_scripts 相同
+
+    全部是帧结构脚本且未设置预算时，每个结构整批解码一次（FrameLayout.notes），
+    耗时按帧平均计入统计；否则逐帧执行。
+    """
+    scripts = [script for script in scripts if script and not script.disabled]
+    if budget is not None or not all(isinstance(script, LayoutScript) for script in scripts):
+        return [run_scripts(scripts, frame, budget) for frame in frames]
+
+    results = [''] * len(frames)
+    if not frames:
+        return results
+    clock = time.perf_counter
+    for script in scripts:
+        stats = script.stats
+        start = clock()
+        notes = script.layout.notes(frames)
+        for index, note in enumerate(notes):
+            if note is None:
+                try:
+                    note = script(frames[index])
+                except:  # 与 run_scripts 相同
+                    stats.errors += 1
+                    stats.last_error = traceback.format_exc()
+                    continue
+            results[index] += note
+        elapsed = clock() - start
+        stats.calls += len(frames)
+        stats.total_time += elapsed
+        stats.durations.add(elapsed * 1e6 / len(frames), len(frames))
+    return results
+
+
+def load_scripts(usercfg: Dict[str, Any], names: Optional[Iterable[str]] = None) -> List[UnpackScript]:
+    """从usercfg中加载解析脚本，names为None时加载全部 btn-unpackNN"""
+    if names is None:
+        names = sorted(key for key in usercfg if key.startswith('btn-unpack'))
+    cache = ScriptCache()
+    scripts = []
+    for name in names:
+        script = cache.get(name, usercfg.get(name))
+        if script is not None:
+            scripts.append(script)
+    return scripts
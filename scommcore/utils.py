@@ -0,0 +1,30 @@
+import time
+import datetime
+
+from .hexfmt import tohex
+
+
+def tsnow() -> int:
+    """获取当前时间戳（毫秒）"""
+    return int(time.time() * 1000)
+
+def strnow() -> str:
+    """获取当前时间字符串"""
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def strtime(ts: float) -> str:
+    """将时间戳（秒）转换为时间字符串"""
+    return datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def human_string(data: bytes, is_hex: bool = False, encoding: str = 'utf-8') -> str:
+    """将字节数据转换为可读字符串"""
+    return tohex(data) if is_hex else data.decode('utf-8', 'backslashreplace').replace('\x00', '\\x00')
+
+def uint16(b: bytes) -> int:
+    """从字节读取无符号16位整数"""
+    return b[0] * 256 + b[1]
+
+def int16(b: bytes) -> int:
+    """从字节读取有符号16位整数"""
+    d = b[0] * 256 + b[1]
+    return d - 0x10000 if d >= 0x8000 else d
@@ -0,0 +1,88 @@
+"""
+测试共用的虚拟串口：用 pty 的一端作为被测串口，另一端模拟设备
+"""
+
+import os
+import sys
+import time
+import threading
+from typing import Callable, Optional
+
+import pytest
+
+# 直接运行 pytest 时也能导入仓库根目录下的 scommcore
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pty = pytest.importorskip('pty')
+tty = pytest.importorskip('tty')
+
+
+class Device:
+    """pty 主端上的模拟设备
+
+    后台线程读取发往设备的数据并累积在 received 中；设置了 reply 时，对每次读到的数据块
+    调用 reply(chunk)，返回的字节写回串口。
+    """
+
+    def __init__(self, fd: int, reply: Optional[Callable[[bytes], Optional[bytes]]] = None):
+        self.fd = fd
+        self.reply = reply
+        self.received = bytearray()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                chunk = os.read(self.fd, 4096)
+            except OSError:
+                return
+            if not chunk:
+                return
+            self.received += chunk
+            if self.reply is not None:
+                answer = self.reply(chunk)
+                if answer:
+                    os.write(self.fd, answer)
+
+    def write(self, data: bytes):
+        os.write(self.fd, data)
+
+    def wait_for(self, size: int, timeout: float = 2.0) -> bytes:
+        """等待设备累计收到 size 字节"""
+        deadline = time.monotonic() + timeout
+        while len(self.received) < size and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return bytes(self.received)
+
+
+@pytest.fixture
+def pty_port():
+    """(设备端描述符, 被测串口路径)"""
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    yield master, os.ttyname(slave)
+    for fd in (master, slave):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def device(pty_port):
+    """不应答的模拟设备，返回 (Device, 被测串口路径)"""
+    master, port = pty_port
+    return Device(master), port
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float = 2.0) -> bool:
+    """轮询等待条件成立"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
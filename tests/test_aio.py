@@ -0,0 +1,100 @@
+import os
+import asyncio
+
+import pytest
+import serial
+
+from scommcore.aio import AsyncSerialPort, _matcher
+from scommcore.settings import Settings
+
+from conftest import Device
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5.0))
+
+
+def test_matcher():
+    import re
+    assert _matcher(None)(b'x')
+    assert _matcher(b'OK')(b'+OK\r\n')
+    assert _matcher(re.compile(rb'\d+'))(b'v12')
+    assert not _matcher(lambda frame: frame.startswith(b'A'))(b'B')
+    with pytest.raises(TypeError):
+        _matcher(1)
+
+
+def test_frames_split_on_idle_gap(device):
+    dev, port = device
+
+    async def main():
+        async with AsyncSerialPort(port, 115200, settings=Settings(split_interval=0.03)) as com:
+            frames = com.frames().__aiter__()
+            dev.write(b'abc')
+            first = await frames.__anext__()
+            await asyncio.sleep(0.1)
+            dev.write(b'def')
+            return [first, await frames.__anext__()]
+
+    assert run(main()) == [b'abc', b'def']
+
+
+def test_request_waits_for_matching_reply(pty_port):
+    master, port = pty_port
+    Device(master, reply=lambda chunk: b'busy\n+OK\n' if chunk.endswith(b'\r\n') else None)
+
+    async def main():
+        framing = {'type': 'delimiter', 'delimiter': '0A'}
+        async with AsyncSerialPort(port, 115200, framing=framing) as com:
+            return await com.request(b'AT\r\n', until=b'OK', timeout=1.0)
+
+    assert run(main()) == b'+OK\n'
+
+
+def test_close_ends_full_bounded_iterator(device):
+    dev, port = device
+
+    async def main():
+        com = await AsyncSerialPort(port, 115200, settings=Settings(split_interval=0.01)).open()
+        received = []
+
+        async def consume():
+            async for frame in com.frames(maxsize=1):
+                received.append(frame)
+                await started.wait()  # 第一帧之后暂停消费，让队列保持满
+
+        started = asyncio.Event()
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0)
+        dev.write(b'one')
+        while not received:
+            await asyncio.sleep(0.01)
+        dev.write(b'two')
+        while com.recv_count < 6:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        await com.close()  # 队列已满时也不能抛出 QueueFull
+        started.set()
+        await task
+        return received, com.dropped_frames
+
+    received, dropped = run(main())
+    assert received == [b'one']
+    assert dropped == 1
+
+
+def test_close_fails_pending_write(pty_port):
+    _, port = pty_port  # 设备端不读取，写满后 write 一直等待
+
+    async def main():
+        com = await AsyncSerialPort(port, 115200).open()
+        writer = asyncio.ensure_future(com.write(b'x' * (1 << 20)))
+        while com._write_waiter is None:
+            await asyncio.sleep(0.01)
+        await com.close()
+        with pytest.raises(serial.SerialException):
+            await writer
+        with pytest.raises(serial.SerialException):
+            await com.write(b'y')
+
+    run(main())
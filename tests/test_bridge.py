@@ -0,0 +1,123 @@
+import socket
+from typing import Optional
+
+import pytest
+
+from scommcore import SerialEngine
+from scommcore.bridge import TcpBridge, parse_address
+
+from conftest import wait_until
+
+
+def test_parse_address():
+    assert parse_address('7000') == ('127.0.0.1', 7000)
+    assert parse_address('0.0.0.0:7000') == ('0.0.0.0', 7000)
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        TcpBridge(SerialEngine(), policy='block')
+
+
+def test_bridge_forwards_both_directions(device):
+    dev, port = device
+    engine = SerialEngine()
+    assert engine.open(port, 115200)
+    try:
+        with TcpBridge(engine) as bridge:
+            clients = [socket.create_connection(bridge.address, timeout=2.0) for _ in range(2)]
+            assert wait_until(lambda: len(bridge.clients) == 2)
+            dev.write(b'from device')
+            for client in clients:
+                data = b''
+                while len(data) < 11:
+                    data += client.recv(100)
+                assert data == b'from device'
+            clients[0].sendall(b'from client')
+            assert dev.wait_for(11) == b'from client'
+            for client in clients:
+                client.close()
+    finally:
+        engine.close()
+
+
+def test_slow_client_disconnect_policy():
+    bridge = TcpBridge(SerialEngine(), max_buffer=4, policy='disconnect').start()
+    try:
+        client = socket.create_connection(bridge.address, timeout=2.0)
+        assert wait_until(lambda: bridge.clients)
+        remote = bridge.clients[0]
+        bridge._on_recv(b'12345')  # 超过缓冲区上限
+        assert remote.dropped_bytes == 5
+        assert wait_until(lambda: not bridge.clients)
+        assert client.recv(100) == b''
+        client.close()
+    finally:
+        bridge.stop()
+
+
+class WakeupProbe:
+    """包装转发线程读取的唤醒socket，在 recv 时模拟接收线程恰好在此刻调用 _on_recv"""
+
+    def __init__(self, bridge, sock):
+        self.bridge = bridge
+        self.sock = sock
+        self.inject: Optional[bytes] = None
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def recv(self, size):
+        data, self.inject = self.inject, None
+        if data is not None:
+            self.bridge._on_recv(data)
+        return self.sock.recv(size)
+
+    def close(self):
+        self.sock.close()
+
+
+class ProbedBridge(TcpBridge):
+    def _serve_loop(self):
+        self.probe = WakeupProbe(self, self._wakeup[0])
+        self._wakeup = (self.probe, self._wakeup[1])
+        super()._serve_loop()
+
+
+def recv_exactly(client, size):
+    data = b''
+    while len(data) < size:
+        part = client.recv(65536)
+        assert part, '连接被关闭'
+        data += part
+    return data
+
+
+def test_wakeup_during_drain_is_not_lost():
+    bridge = ProbedBridge(SerialEngine()).start()
+    try:
+        client = socket.create_connection(bridge.address, timeout=2.0)
+        assert wait_until(lambda: bridge.clients)
+        bridge.probe.inject = b'late'
+        bridge._on_recv(b'first')  # 转发线程读唤醒socket时又收到数据
+        assert recv_exactly(client, 9) == b'firstlate'
+        for i in range(100):  # 之后连续的回调仍能唤醒转发线程
+            bridge._on_recv(b'%03d' % i)
+        assert recv_exactly(client, 300) == b''.join(b'%03d' % i for i in range(100))
+        client.close()
+    finally:
+        bridge.stop()
+
+
+def test_back_to_back_rx_chunks_all_reach_client():
+    bridge = TcpBridge(SerialEngine()).start()
+    try:
+        client = socket.create_connection(bridge.address, timeout=2.0)
+        assert wait_until(lambda: bridge.clients)
+        chunks = [b'%05d' % i for i in range(5000)]
+        for chunk in chunks:
+            bridge._on_recv(chunk)
+        assert recv_exactly(client, 25000) == b''.join(chunks)
+        client.close()
+    finally:
+        bridge.stop()
@@ -0,0 +1,60 @@
+from scommcore import SerialEngine
+from scommcore.capture import CaptureWriter, CaptureReader
+from scommcore.store import RECV, SEND
+
+from conftest import wait_until
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'a.scap')
+    writer = CaptureWriter(path)
+    writer.record(RECV, b'\x00\x01', 'COM1', mono_ns=1000)
+    writer.record(SEND, b'hello', 'COM2', mono_ns=2000)
+    writer.record(RECV, memoryview(b'xyz'), 'COM1', mono_ns=3000)
+    writer.close()
+
+    records = list(CaptureReader(path))
+    assert [(r.mono_ns, r.direction, r.port, r.data) for r in records] == [
+        (1000, RECV, 'COM1', b'\x00\x01'), (2000, SEND, 'COM2', b'hello'), (3000, RECV, 'COM1', b'xyz')]
+    assert writer.records == 5  # 包括两条串口名称记录
+
+
+def test_truncated_last_record_is_ignored(tmp_path):
+    path = str(tmp_path / 'b.scap')
+    writer = CaptureWriter(path)
+    writer.record(RECV, b'complete', 'p')
+    writer.record(RECV, b'truncated', 'p')
+    writer.close()
+    with open(path, 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 3)
+    assert [r.data for r in CaptureReader(path)] == [b'complete']
+
+
+def test_pending_limit_drops_and_counts(tmp_path):
+    writer = CaptureWriter(str(tmp_path / 'c.scap'), max_pending=4)
+    writer.record(RECV, b'0123456789', 'p')
+    writer.close()
+    assert writer.dropped_bytes == 10
+
+
+def test_engine_records_both_directions(tmp_path, device):
+    dev, port = device
+    path = str(tmp_path / 'd.scap')
+    engine = SerialEngine()
+    engine.configure(split_interval=0.01)
+    assert engine.open(port, 115200)
+    engine.start_capture(path)
+    frames = []
+    engine.subscribe('recv', frames.append)
+    try:
+        engine.send(b'ping')
+        assert engine.flush(1.0)
+        dev.write(b'pong')
+        assert wait_until(lambda: frames)
+    finally:
+        engine.close()
+        engine.stop_capture()
+    records = list(CaptureReader(path))
+    assert [(r.direction, r.data) for r in records] == [(SEND, b'ping'), (RECV, b'pong')]
+    assert all(r.port == port for r in records)
+    assert records[0].mono_ns <= records[1].mono_ns
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import signal
+import socket
+import subprocess
+
+import pytest
+
+from conftest import wait_until
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_cli(port, *args, stdin=subprocess.DEVNULL):
+    return subprocess.Popen([sys.executable, '-m', 'scommcore', port, '-b', '115200', *args],
+                            cwd=ROOT, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_stdin_lines_sent_before_exit(device):
+    dev, port = device
+    proc = run_cli(port, stdin=subprocess.PIPE)
+    proc.communicate(b'a\nb\n' + b'x' * 100, timeout=10)
+    assert proc.returncode == 0
+    assert dev.wait_for(104) == b'a\nb\n' + b'x' * 100
+
+
+def test_listen_keeps_running_after_stdin_eof(device):
+    dev, port = device
+    tcp_port = free_port()
+    proc = run_cli(port, '--listen', f'127.0.0.1:{tcp_port}')
+    try:
+        client = None
+
+        def connect():
+            nonlocal client
+            try:
+                client = socket.create_connection(('127.0.0.1', tcp_port), timeout=2.0)
+            except OSError:
+                return False
+            return True
+
+        assert wait_until(connect, timeout=10)
+        time.sleep(0.5)  # 标准输入早已结束
+        assert proc.poll() is None
+        client.sendall(b'ping')
+        assert dev.wait_for(4) == b'ping'
+        client.close()
+    finally:
+        proc.send_signal(signal.SIGINT)
+        proc.communicate(timeout=10)
+    assert proc.returncode == 0
+
+
+@pytest.mark.parametrize('option', [['--rtt', 'next'], ['--capture', 'cli.scap']])
+def test_long_running_options_wait_for_ctrl_c(device, tmp_path, option):
+    dev, port = device
+    option = [str(tmp_path / arg) if arg.endswith('.scap') else arg for arg in option]
+    proc = run_cli(port, *option)
+    try:
+        time.sleep(1.0)
+        assert proc.poll() is None
+    finally:
+        proc.send_signal(signal.SIGINT)
+        proc.communicate(timeout=10)
+    assert proc.returncode == 0
+
+
+@pytest.mark.parametrize('spec', ['100:zz', 'fast:01', '100ms'])
+def test_bad_every_spec_rejected_before_opening_port(device, spec):
+    dev, port = device
+    proc = run_cli(port, '--every', spec)
+    _, err = proc.communicate(timeout=10)
+    assert proc.returncode == 2
+    assert '--every' in err.decode('utf-8', 'replace')
+
+
+def test_every_sends_periodically_until_ctrl_c(device):
+    dev, port = device
+    proc = run_cli(port, '--every', '20ms:41 42')
+    try:
+        assert wait_until(lambda: len(dev.received) >= 6, timeout=10)
+        assert proc.poll() is None
+    finally:
+        proc.send_signal(signal.SIGINT)
+        proc.communicate(timeout=10)
+    assert proc.returncode == 0
+    assert bytes(dev.received).startswith(b'ABABAB')
@@ -0,0 +1,117 @@
+import time
+import threading
+
+import pytest
+
+from scommcore import SerialEngine, Packet
+
+from conftest import wait_until
+
+
+def open_engine(port, receive_mode='auto', **settings):
+    engine = SerialEngine()
+    engine.configure(**settings)
+    engine.receive_mode = receive_mode
+    assert engine.open(port, 115200)
+    return engine
+
+
+def test_flush_writes_queued_data_before_close(device):
+    dev, port = device
+    engine = open_engine(port)
+    lines = [b'line %d\n' % i for i in range(200)]
+    for line in lines:
+        engine.send(line)
+    assert engine.flush(timeout=2.0)
+    engine.close()
+    assert dev.wait_for(sum(map(len, lines))) == b''.join(lines)
+
+
+@pytest.mark.parametrize('mode', ['select', 'poll'])
+def test_receive_splits_frames_on_idle_gap(device, mode):
+    dev, port = device
+    engine = open_engine(port, mode, split_interval=0.03)
+    frames = []
+    engine.subscribe('recv', frames.append)
+    try:
+        dev.write(b'abc')
+        time.sleep(0.15)
+        dev.write(b'defg')
+        assert wait_until(lambda: len(frames) == 2)
+    finally:
+        engine.close()
+    assert frames == [b'abc', b'defg']
+
+
+def test_select_mode_flushes_frame_soon_after_gap(device):
+    dev, port = device
+    engine = open_engine(port, 'select', split_interval=0.02)
+    arrived = []
+    engine.subscribe('recv', lambda frame: arrived.append(time.monotonic()))
+    try:
+        start = time.monotonic()
+        dev.write(b'x' * 10)
+        assert wait_until(lambda: arrived)
+    finally:
+        engine.close()
+    # 事件驱动的接收在分帧间隔到期后立即输出，不会再等一个轮询周期以上
+    assert 0.02 <= arrived[0] - start < 0.2
+
+
+def test_frame_cap_splits_long_bursts(device):
+    dev, port = device
+    engine = open_engine(port, split_interval=0.05, max_frame_size=16)
+    frames = []
+    engine.subscribe('recv', frames.append)
+    try:
+        dev.write(bytes(range(40)))
+        assert wait_until(lambda: sum(map(len, frames)) == 40)
+    finally:
+        engine.close()
+    assert b''.join(frames) == bytes(range(40))
+    assert max(map(len, frames)) <= 16
+
+
+def test_coalesced_writes_keep_order(device):
+    dev, port = device
+    engine = open_engine(port)
+    sent, logs = [], []
+    gate = threading.Event()
+
+    def on_send(data):
+        sent.append(data)
+        gate.wait(2.0)  # 第一包发出后暂停发送线程，让后面的包在队列中积压
+
+    engine.subscribe('send', on_send)
+    engine.subscribe('log', logs.append)
+    packets = [Packet(b'first')] + [Packet(b'%02d' % i) for i in range(20)]
+    try:
+        engine.send(packets[0].data)
+        assert wait_until(lambda: sent)
+        for packet in packets[1:]:
+            engine.send(packet.data, packet.rts, packet.dtr)
+        gate.set()
+        assert engine.flush(timeout=2.0)
+    finally:
+        engine.close()
+
+    expected = b''.join(packet.data for packet in packets)
+    assert dev.wait_for(len(expected)) == expected
+    assert sent == [packet.data for packet in packets]
+    # 积压的20包合并为一次写入，'send' 事件仍按包逐个产生
+    assert [line for line in logs if '合并写入' in line] == [f'{port}: 发送 40 字节（20 包合并写入）']
+
+
+def test_tx_gap_disables_coalescing(device):
+    dev, port = device
+    engine = open_engine(port, tx_gap=0.005)
+    logs = []
+    engine.subscribe('log', logs.append)
+    try:
+        for i in range(5):
+            engine.send(b'%d' % i)
+        assert engine.flush(timeout=2.0)
+    finally:
+        engine.close()
+    assert dev.wait_for(5) == b'01234'
+    assert not any('合并写入' in line for line in logs)
@@ -0,0 +1,141 @@
+import pytest
+
+from scommcore.framing import (DelimiterFramer, FixedLengthFramer, LengthFieldFramer, SlipFramer,
+                               CobsFramer, RegexFramer, create_framer, framing_for_port)
+
+
+def feed_bytewise(framer, data):
+    """逐字节输入，检查跨输入边界的处理"""
+    frames = []
+    for i in range(len(data)):
+        frames += framer.feed(data[i:i + 1])
+    return frames
+
+
+def test_delimiter_across_chunks():
+    framer = DelimiterFramer(b'\r\n')
+    assert feed_bytewise(framer, b'ab\r\ncd\r\nef') == [b'ab\r\n', b'cd\r\n']
+    assert framer.pending == 2
+
+
+def test_delimiter_exclude():
+    framer = DelimiterFramer(b'\n', include=False)
+    assert framer.feed(b'a\n\nb\n') == [b'a', b'b']
+
+
+def test_fixed_length():
+    framer = FixedLengthFramer(3)
+    assert framer.feed(b'abcdefg') == [b'abc', b'def']
+    assert framer.feed(b'hi') == [b'ghi']
+
+
+def test_length_field_resyncs_on_bad_length():
+    framer = LengthFieldFramer(offset=1, width=1, max_frame_size=16)
+    frame = b'\xaa\x03xyz'
+    assert feed_bytewise(framer, frame + frame) == [frame, frame]
+    assert framer.feed(b'\x00\xff' + frame) == [frame]
+    assert framer.dropped == 2
+
+
+def test_slip_round_trip():
+    payloads = [b'\xc0\xdbplain', b'', b'x']
+    stream = b''.join(SlipFramer.encode(p) for p in payloads)
+    assert feed_bytewise(SlipFramer(), stream) == [p for p in payloads if p]
+
+
+def test_cobs_round_trip():
+    payloads = [b'\x00\x01\x00', bytes(range(1, 256)) * 2, b'abc']
+    stream = b''.join(CobsFramer.encode(p) for p in payloads)
+    assert feed_bytewise(CobsFramer(), stream) == payloads
+
+
+def test_oversized_frame_is_dropped():
+    framer = DelimiterFramer(b'\n', max_frame_size=8)
+    assert framer.feed(b'0123456789') == []
+    assert framer.dropped == 10
+    assert framer.feed(b'ok\n') == [b'ok\n']
+
+
+def test_regex_marker_split_across_chunks():
+    framer = RegexFramer(rb'\x03.')
+    assert framer.lookback == 2
+    assert feed_bytewise(framer, b'\x02ab\x03Z\x02cd\x03Y') == [b'\x02ab\x03Z', b'\x02cd\x03Y']
+
+
+def test_regex_rejects_empty_match_at_construction():
+    with pytest.raises(ValueError):
+        RegexFramer(rb'\n*')
+    with pytest.raises(ValueError):
+        create_framer({'type': 'regex', 'pattern': 'x?'})
+
+
+def test_regex_skips_context_only_empty_matches():
+    framer = RegexFramer(rb'(?<=;)|\n', lookback=4)
+    assert framer.feed(b'a;b\nc') == [b'a;b\n']
+
+
+def test_regex_unbounded_pattern_uses_default_lookback():
+    assert RegexFramer(rb'END\d+').lookback == 64
+    assert RegexFramer(rb'\n(?=\x02)').lookback == 64
+    assert RegexFramer(rb'\n', lookback=8).lookback == 8
+
+
+def test_create_framer_and_port_lookup():
+    assert create_framer(None) is None
+    assert create_framer({'type': 'gap'}) is None
+    assert isinstance(create_framer({'type': 'delimiter', 'delimiter': '0D 0A'}), DelimiterFramer)
+    with pytest.raises(ValueError):
+        create_framer({'type': 'nope'})
+    config = {'/dev/ttyUSB0': {'type': 'slip'}, '*': {'type': 'cobs'}}
+    assert framing_for_port(config, '/dev/ttyUSB0') == {'type': 'slip'}
+    assert framing_for_port(config, 'COM3') == {'type': 'cobs'}
+
+
+def test_receiver_does_not_refeed_data_after_framer_error():
+    from scommcore import SerialEngine
+    from scommcore.receiver import FrameReceiver
+
+    class Failing(DelimiterFramer):
+        def _extract(self):
+            raise ValueError('boom')
+
+    engine = SerialEngine()
+    receiver = FrameReceiver(engine)
+    receiver.framer = Failing(b'\n')
+
+    def readinto(view):
+        view[:3] = b'abc'
+        return 3
+
+    with pytest.raises(ValueError):
+        receiver.read(readinto)
+    assert len(receiver) == 0
+    assert engine.recv_count == 3
+
+
+def test_receiver_gap_framing():
+    from scommcore import SerialEngine
+    from scommcore.receiver import FrameReceiver
+
+    now = [0.0]
+    engine = SerialEngine()
+    engine.configure(split_interval=0.1, max_frame_size=4)
+    frames = []
+    engine.subscribe('recv', frames.append)
+    receiver = FrameReceiver(engine, clock=lambda: now[0])
+
+    def chunk(data):
+        def readinto(view):
+            view[:len(data)] = data
+            return len(data)
+        return readinto
+
+    assert receiver.read(chunk(b'ab')) == 2
+    assert receiver.deadline == pytest.approx(0.1)
+    now[0] = 0.05
+    receiver.read(chunk(b'cd'))  # 缓冲区满，立即输出
+    assert frames == [b'abcd']
+    receiver.read(chunk(b'e'))
+    assert receiver.deadline == pytest.approx(0.15)
+    receiver.expire()
+    assert frames == [b'abcd', b'e']
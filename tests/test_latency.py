@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from scommcore.latency import RttMeter, parse_match
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_meter(**kwargs):
+    meter = RttMeter(**kwargs)
+    clock = meter._clock = FakeClock()
+    return meter, clock
+
+
+def test_parse_match():
+    assert parse_match('next') == ('next', 0)
+    assert parse_match('address:2') == ('address', 2)
+    with pytest.raises(ValueError):
+        parse_match('first')
+
+
+def test_next_rule_pairs_in_order():
+    meter, _ = make_meter()
+    meter.on_send(b'a', ts=0.0)
+    meter.on_send(b'b', ts=0.001)
+    meter.on_recv(b'A', ts=0.002)
+    meter.on_recv(b'B', ts=0.004)
+    meter.on_recv(b'?', ts=0.005)
+    assert meter.count == 2
+    assert meter.unmatched == 1
+    assert meter.percentiles((50, 100)) == {'p50': pytest.approx(3.0), 'p100': pytest.approx(3.0)}
+
+
+def test_address_rule_matches_by_byte():
+    meter, _ = make_meter(match='address')
+    meter.on_send(b'\x01\x03', ts=0.0)
+    meter.on_send(b'\x02\x03', ts=0.0)
+    meter.on_recv(b'\x02\x83', ts=0.010)
+    meter.on_recv(b'\x01\x83', ts=0.020)
+    assert sorted(meter.as_dict()['by_address']) == ['01', '02']
+
+
+def test_expired_requests_counted_without_replies():
+    meter, clock = make_meter(timeout=0.5)
+    meter.on_send(b'a', ts=0.0)
+    meter.on_send(b'b', ts=1.0)  # 发送时也清理超时的请求
+    assert meter.lost == 1
+    clock.now = 2.0
+    result = meter.as_dict()  # 导出时也清理
+    assert result['lost'] == 2
+    assert result['pending'] == 0
+
+
+def test_pending_is_bounded():
+    meter, _ = make_meter(max_pending=3)
+    for i in range(10):
+        meter.on_send(bytes([i]), ts=0.0)
+    assert meter.lost == 7
+    assert meter.as_dict()['pending'] == 3
+
+
+def test_periodic_export_uses_histogram(monkeypatch, tmp_path):
+    meter, clock = make_meter()
+    for i in range(100):
+        meter.on_send(b'x', ts=float(i))
+        meter.on_recv(b'y', ts=i + 0.001 * (i + 1))
+    clock.now = 100.0
+
+    def no_sort(*args):
+        raise AssertionError('定期导出不应排序原始值')
+
+    monkeypatch.setattr(meter, 'percentiles', no_sort)
+    approx = meter.as_dict()
+    # 直方图分位数为桶上界，不小于精确值
+    assert approx['p50_ms'] >= 50.0
+    assert approx['p99_ms'] <= approx['max_ms']
+    monkeypatch.undo()
+
+    exact = meter.as_dict(exact=True)
+    assert exact['p50_ms'] == pytest.approx(51.0)
+    path = tmp_path / 'rtt.json'
+    meter.write(str(path))
+    assert json.loads(path.read_text(encoding='utf-8'))['p99_ms'] == pytest.approx(100.0)
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+
+import pytest
+
+from scommcore.capture import CaptureReader
+from scommcore.multiport import PortHub, _parse_port
+from scommcore.settings import Settings
+from scommcore.store import RECV, SEND
+
+from conftest import Device, wait_until
+
+
+@pytest.fixture
+def second_device():
+    pty = pytest.importorskip('pty')
+    tty = pytest.importorskip('tty')
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    yield Device(master), os.ttyname(slave)
+    for fd in (master, slave):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def test_parse_port():
+    assert _parse_port('/dev/ttyUSB0@9600', 115200) == ('/dev/ttyUSB0', 9600)
+    assert _parse_port('COM3', 115200) == ('COM3', 115200)
+
+
+def test_sessions_share_one_io_thread(device, second_device):
+    dev_a, port_a = device
+    dev_b, port_b = second_device
+    frames = {port_a: [], port_b: []}
+    with PortHub() as hub:
+        for port in (port_a, port_b):
+            session = hub.add(port, 115200, settings=Settings(split_interval=0.03))
+            session.subscribe('recv', frames[port].append)
+            assert session.open()
+
+        dev_a.write(b'from a')
+        dev_b.write(b'from b')
+        assert wait_until(lambda: frames[port_a] and frames[port_b])
+        hub.sessions[0].send(b'to a')
+        hub.sessions[1].send(b'to b')
+        assert dev_a.wait_for(4) == b'to a'
+        assert dev_b.wait_for(4) == b'to b'
+    assert frames == {port_a: [b'from a'], port_b: [b'from b']}
+
+
+def test_session_gap_and_protocol_framing(device):
+    dev, port = device
+    frames = []
+    with PortHub() as hub:
+        session = hub.open(port, 115200, framing={'type': 'delimiter', 'delimiter': '0A'},
+                           settings=Settings(split_interval=0.03))
+        session.subscribe('recv', frames.append)
+        dev.write(b'one\ntw')
+        time.sleep(0.1)  # 协议分帧时不按时间间隔输出半帧
+        dev.write(b'o\n')
+        assert wait_until(lambda: len(frames) == 2)
+    assert frames == [b'one\n', b'two\n']
+
+
+def test_hub_capture_records_both_directions(device, tmp_path):
+    dev, port = device
+    path = str(tmp_path / 'hub.scap')
+    frames = []
+    with PortHub() as hub:
+        hub.start_capture(path)
+        session = hub.open(port, 115200, settings=Settings(split_interval=0.02))
+        session.subscribe('recv', frames.append)
+        session.send(b'ping')
+        assert dev.wait_for(4) == b'ping'
+        dev.write(b'pong')
+        assert wait_until(lambda: frames)
+        hub.stop_capture()
+
+    records = [(r.direction, r.data, r.port) for r in CaptureReader(path)]
+    assert records == [(SEND, b'ping', port), (RECV, b'pong', port)]
+
+
+def test_wakeup_pipe_never_blocks_callers(device):
+    _, port = device
+    with PortHub() as hub:
+        session = hub.open(port, 115200)
+        gate = threading.Event()
+        hub.call(gate.wait, wait=False)  # I/O线程忙，不读唤醒管道
+        # 写满唤醒管道的调用也不能阻塞调用方
+        for _ in range(100000):
+            hub.call(lambda: None, wait=False)
+        gate.set()
+        hub.call(lambda: None)
+        assert session.is_open
@@ -0,0 +1,68 @@
+import logging
+
+from scommcore.capture import CaptureWriter
+from scommcore.replay import Replayer, iter_text_log, open_source
+from scommcore.settings import Settings
+from scommcore.store import RECV, SEND
+from scommcore.unpack import load_scripts
+
+
+def write_lines(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_hex_log_with_unpack_notes(tmp_path, caplog):
+    path = write_lines(tmp_path, 'hex.txt', [
+        '[2024-01-02 03:04:05.100] < 01 02 03 04 v=1027',
+        '[2024-01-02 03:04:05.200] > AA BB',
+        '[2024-01-02 03:04:05.300] < 05 06',
+        '[2024-01-02 03:04:05.400] < 07 temp=25.5',
+    ])
+    with caplog.at_level(logging.WARNING):
+        chunks = list(iter_text_log(path))
+    assert [data for ts, data in chunks] == [b'\x01\x02\x03\x04', b'\x05\x06', b'\x07']
+    assert round(chunks[1][0] - chunks[0][0], 3) == 0.2
+    assert not caplog.records
+
+
+def test_text_log_and_mixed_warning(tmp_path, caplog):
+    path = write_lines(tmp_path, 'text.txt', ['hello', 'be ok'])
+    assert [data for ts, data in iter_text_log(path)] == [b'hello', b'be ok']
+
+    path = write_lines(tmp_path, 'mixed.txt', ['01 02', 'not hex'])
+    with caplog.at_level(logging.WARNING):
+        assert [data for ts, data in iter_text_log(path)] == [b'\x01\x02', b'not hex']
+    assert '按文本编码' in caplog.text
+
+
+def test_forced_hex_skips_non_hex_lines(tmp_path, caplog):
+    path = write_lines(tmp_path, 'forced.txt', ['AB v=1', 'garbage'])
+    with caplog.at_level(logging.WARNING):
+        assert [data for ts, data in iter_text_log(path, is_hex=True)] == [b'\xab']
+    assert 'forced.txt:2' in caplog.text
+
+
+def test_capture_replay_through_framer_and_scripts(tmp_path):
+    path = str(tmp_path / 'rx.scap')
+    writer = CaptureWriter(path)
+    writer.record(SEND, b'ignored', 'p')
+    for chunk in (b'\x01\x02\n\x03', b'\x04\n'):
+        writer.record(RECV, chunk, 'p')
+    writer.close()
+
+    usercfg = {'btn-unpack01': {'value': '" n=%d" % len(data)'}}
+    out = []
+    replayer = Replayer(framing={'type': 'delimiter', 'delimiter': '0A'},
+                        scripts=load_scripts(usercfg), sink=lambda frame, note: out.append((frame, note)))
+    stats = replayer.run(open_source(path))
+    assert out == [(b'\x01\x02\n', ' n=3'), (b'\x03\x04\n', ' n=3')]
+    assert (stats.chunks, stats.frames) == (2, 2)
+
+
+def test_gap_framing_uses_recorded_timestamps():
+    source = [(0.0, b'ab'), (0.01, b'cd'), (0.5, b'ef')]
+    out = []
+    Replayer(Settings(split_interval=0.1), sink=lambda frame, note: out.append(frame)).run(source)
+    assert out == [b'abcd', b'ef']
@@ -0,0 +1,75 @@
+import pytest
+
+from scommcore import SerialEngine
+from scommcore.sequence import SequenceRunner, compile_steps, compile_expect
+
+from conftest import Device
+
+
+def open_engine(port):
+    engine = SerialEngine()
+    engine.configure(split_interval=0.01)
+    assert engine.open(port, 115200)
+    return engine
+
+
+@pytest.mark.parametrize('config', [
+    [{'label': 'x', 'goto': 'x'}],
+    [{'label': 'x', 'send': '01'}, {'goto': 'x'}],
+    [{'label': 'x', 'send': '01', 'on_pass': 'x'}],
+    [{'label': 'outer', 'send': '01'}, {'label': 'inner', 'send': '02'},
+     {'goto': 'inner', 'times': 3}, {'goto': 'outer'}],
+])
+def test_rejects_loops_that_never_wait(config):
+    with pytest.raises(ValueError, match='无限循环'):
+        compile_steps(config)
+
+
+@pytest.mark.parametrize('config', [
+    [{'label': 'x', 'send': '01', 'expect': {'bytes': '01'}}, {'goto': 'x'}],
+    [{'label': 'x', 'send': '01', 'delay': 10}, {'goto': 'x'}],
+    [{'label': 'x', 'send': '01'}, {'goto': 'x', 'times': 3}, {'end': 'pass'}],
+])
+def test_accepts_bounded_or_waiting_loops(config):
+    compile_steps(config)
+
+
+def test_rejects_unknown_label():
+    with pytest.raises(ValueError):
+        compile_steps([{'goto': 'missing'}])
+
+
+def test_expect_matchers():
+    assert compile_expect({'bytes': '4F 4B'})(b'+OK')
+    assert compile_expect({'regex': r'V\d+'})(b'V12')
+    assert not compile_expect({'regex': r'V\d+'})(b'Vx')
+
+
+def test_runner_follows_replies_and_loops(pty_port):
+    master, port = pty_port
+    Device(master, reply=lambda chunk: b'OK' if chunk == b'AT' else None)
+    steps = compile_steps([
+        {'label': 'poll', 'name': '握手', 'text': 'AT', 'expect': {'bytes': '4F 4B'}, 'timeout': 500},
+        {'goto': 'poll', 'times': 2},
+        {'end': 'pass'},
+    ])
+    engine = open_engine(port)
+    try:
+        result = SequenceRunner(engine, steps).run(timeout=5.0)
+    finally:
+        engine.close()
+    assert result.ok
+    assert [step.name for step in result.steps] == ['握手'] * 3
+
+
+def test_runner_retries_then_fails(device):
+    dev, port = device
+    steps = compile_steps([{'name': '无应答', 'send': '01', 'expect': {'bytes': '02'}, 'timeout': 50, 'retry': 2}])
+    engine = open_engine(port)
+    try:
+        result = SequenceRunner(engine, steps).run(timeout=5.0)
+    finally:
+        engine.close()
+    assert not result.ok
+    assert result.steps[0].attempts == 3
+    assert dev.wait_for(3) == b'\x01' * 3
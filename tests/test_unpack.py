@@ -0,0 +1,59 @@
+import json
+
+from scommcore.decoder import parse_layout
+from scommcore.pool import UnpackPool
+from scommcore.unpack import LayoutScript, UnpackScript, ScriptBudget, run_scripts, run_scripts_batch
+
+LAYOUT = {
+    'byteorder': 'little', 'size': 6,
+    'fields': [
+        {'name': 'id', 'offset': 0, 'type': 'u8'},
+        {'name': 'temp', 'offset': 2, 'type': 'i16', 'scale': 0.1},
+        {'name': 'counter', 'offset': 4, 'type': 'u16', 'byteorder': 'big'},
+    ],
+}
+
+FRAMES = [bytes([i, 0, 250 - i, 0, 0, i]) for i in range(20)] + [b'\x01\x02', b'\x07\x00\x10\x00\x00\x01tail']
+
+
+def layout_script(name='btn-unpack01'):
+    return LayoutScript(name, json.dumps(LAYOUT))
+
+
+def test_layout_notes_match_single_frame_note():
+    layout = parse_layout(LAYOUT)
+    notes = layout.notes(FRAMES)
+    for frame, note in zip(FRAMES, notes):
+        if len(frame) == layout.size:
+            assert note == layout.note(frame)
+        else:
+            assert note is None
+
+
+def test_batch_matches_per_frame_scripts():
+    expected = [run_scripts([layout_script(), layout_script('b')], frame) for frame in FRAMES]
+    scripts = [layout_script(), None, layout_script('b')]
+    assert run_scripts_batch(scripts, FRAMES) == expected
+    stats = scripts[0].stats
+    assert stats.calls == len(FRAMES)
+    assert stats.errors == 1  # 过短的帧逐帧解码出错
+    assert stats.durations.count == len(FRAMES)
+
+
+def test_batch_falls_back_for_eval_scripts_and_budget():
+    scripts = [layout_script(), UnpackScript('btn-unpack02', "' n=%d' % len(data)")]
+    expected = [run_scripts(scripts, frame) for frame in FRAMES]
+    assert run_scripts_batch(scripts, FRAMES) == expected
+    assert run_scripts_batch([layout_script()], FRAMES, ScriptBudget(1.0)) == \
+        [run_scripts([layout_script()], frame) for frame in FRAMES]
+
+
+def test_pool_outputs_layout_notes_in_order():
+    results = []
+    pool = UnpackPool(lambda data, note, ts: results.append((data, note)), mode='thread', batch_size=8)
+    script = layout_script()
+    for frame in FRAMES:
+        pool.submit(frame, (script,))
+    pool.close()
+    assert results == [(frame, run_scripts([layout_script()], frame)) for frame in FRAMES]
+    assert script.stats.calls == len(FRAMES)